@@ -3,7 +3,16 @@ from .intent_classifier import IntentClassifier
 from .order_handler import OrderHandler
 from .booking_handler import BookingHandler
 from .response_generator import ResponseGenerator
+from .menu_snapshot import MenuSnapshot, MenuState
+from .conversation_store import MemoryConversationStore
+from .conversation_log import ConversationLogWriter
+from .session_locks import SessionLockTable
+from .idempotency import IdempotencyCache
+from .unit_of_work import UnitOfWork
+from .popularity import PopularityRanking
+from .conversation_state import HISTORY_SIZE, BookingDraft, Cart, ConversationState, MessageHistory
 import json
+import threading
 import uuid
 
 class RestaurantAgent:
@@ -11,62 +20,217 @@ class RestaurantAgent:
     Main restaurant AI agent that coordinates between components
     """
     
-    def __init__(self, session, restaurant_info):
+    def __init__(self, session, restaurant_info, booking_days_ahead=7, availability_cache=None,
+                 conversation_store=None, log_writer=None, session_locks=None, idempotency_cache=None,
+                 popularity=None, booking_max_days_ahead=366):
+        # A scoped_session registry in the app, so each request thread uses
+        # its own session; the app removes it when the request ends
         self.session = session
         self.restaurant_info = restaurant_info
         
         # Initialize components
-        self.intent_classifier = IntentClassifier()
         self.response_generator = ResponseGenerator(restaurant_info)
         
-        # Load menu items
-        from models import MenuItem
-        self.menu_items = session.query(MenuItem).all()
+        # Sales ranking for menu suggestions, seeded from past orders
+        self.popularity = popularity if popularity is not None else PopularityRanking.from_session(session)
         
-        # Set menu items in the intent classifier for better detection
-        self.intent_classifier.set_menu_items([item.to_dict() for item in self.menu_items])
+        # Load an immutable snapshot of the menu and build the menu-dependent
+        # components from it. Unlike ORM instances the snapshot is never
+        # expired by a commit, so chat turns run no menu queries.
+        self._menu_state = self._build_menu_state(MenuSnapshot.from_session(session))
+        self._reload_lock = threading.Lock()
+        
+        # Menu state pinned by the turn running on the current thread
+        self._turn = threading.local()
         
         # Initialize handlers
-        self.order_handler = OrderHandler(session, self.menu_items)
-        self.booking_handler = BookingHandler(session)
+        self.booking_handler = BookingHandler(session, days_ahead=booking_days_ahead, cache=availability_cache,
+                                              max_days_ahead=booking_max_days_ahead)
+        
+        # Conversation state, bounded; evicted conversations are rebuilt from
+        # the conversations table when the user comes back
+        self.conversations = conversation_store if conversation_store is not None else MemoryConversationStore()
+        if self.conversations.loader is None:
+            self.conversations.loader = self.load_conversation
         
-        # Conversation state
-        self.conversations = {}
+        # Conversation log rows are written in batches by a background thread
+        self.log_writer = log_writer if log_writer is not None else ConversationLogWriter(session.get_bind()).start()
+        
+        # Turns of one session run one at a time; different sessions run in parallel
+        self.session_locks = session_locks if session_locks is not None else SessionLockTable()
+        
+        # Recent responses by idempotency key, so client retries are not processed twice
+        self.idempotency_cache = idempotency_cache if idempotency_cache is not None else IdempotencyCache()
+    
+    def _build_menu_state(self, menu):
+        """Build the intent classifier and order handler for a menu snapshot"""
+        intent_classifier = IntentClassifier()
+        
+        # Set menu items in the intent classifier for better detection
+        intent_classifier.set_menu_items(menu)
+        
+        order_handler = OrderHandler(self.session, menu, intent_classifier.spell_corrector, self.popularity)
+        return MenuState(menu, intent_classifier, order_handler)
+    
+    @property
+    def menu_state(self):
+        """The menu state of the running turn, or the current one outside a turn"""
+        return getattr(self._turn, 'menu_state', None) or self._menu_state
+    
+    @property
+    def menu(self):
+        return self.menu_state.menu
+    
+    @property
+    def menu_items(self):
+        return self.menu_state.menu.items
+    
+    @property
+    def intent_classifier(self):
+        return self.menu_state.intent_classifier
+    
+    @property
+    def order_handler(self):
+        return self.menu_state.order_handler
+    
+    @property
+    def unit_of_work(self):
+        """Transaction of the turn running on the current thread"""
+        return self._turn.unit_of_work
+    
+    def reload_menu(self, session):
+        """
+        Reload the menu from the database and swap it in if it changed
+        
+        The new classifier and order indexes are fully built before a single
+        reference assignment makes them current. Turns already running keep
+        the menu state they started with.
+        
+        Args:
+            session: Database session to read the menu with
+            
+        Returns:
+            bool: True if a new menu version was swapped in
+        """
+        with self._reload_lock:
+            menu = MenuSnapshot.from_session(session)
+            if menu.version == self._menu_state.menu.version:
+                return False
+            
+            self._menu_state = self._build_menu_state(menu)
+            print(f"Menu reloaded: version {menu.version}, {len(menu)} items")
+            return True
+    
+    def reload_menu_in_background(self, session_factory):
+        """
+        Reload the menu on a background thread
+        
+        Args:
+            session_factory (callable): Returns a database session for the thread
+            
+        Returns:
+            threading.Thread: The started thread
+        """
+        def reload():
+            session = session_factory()
+            try:
+                self.reload_menu(session)
+            except Exception as e:
+                print(f"Error reloading menu: {e}")
+            finally:
+                session.close()
+        
+        thread = threading.Thread(target=reload, name='menu-reload', daemon=True)
+        thread.start()
+        return thread
     
     def get_or_create_conversation(self, session_id=None):
         """Get or create a conversation for the session"""
+        conversation = None
         if not session_id:
             session_id = str(uuid.uuid4())
+        else:
+            conversation = self.conversations.get(session_id)
             
-        if session_id not in self.conversations:
-            self.conversations[session_id] = {
-                'session_id': session_id,
-                'state': 'initial',
-                'context': {},
-                'history': []
-            }
+        if conversation is None:
+            conversation = ConversationState(session_id)
+            self.conversations.put(session_id, conversation)
             
-        return self.conversations[session_id]
+        return conversation
+    
+    def load_conversation(self, session_id):
+        """
+        Rebuild a conversation that is no longer in memory from the conversations table
+        
+        Only the messages are stored, so the conversation restarts in the
+        initial state with its most recent user messages.
+        
+        Args:
+            session_id (str): Session ID
+            
+        Returns:
+            ConversationState: The conversation, or None if the session has no logged messages
+        """
+        from models import Conversation as ConversationModel
+        rows = self.session.query(
+            ConversationModel.user_message
+        ).filter(
+            ConversationModel.session_id == session_id
+        ).order_by(ConversationModel.id.desc()).limit(HISTORY_SIZE).all()
+        
+        if not rows:
+            return None
+        
+        history = MessageHistory(messages=[user_message for (user_message,) in reversed(rows)])
+        
+        print(f"Restored conversation {session_id} with its last {len(rows)} messages")
+        return ConversationState(session_id, history=history)
     
-    def process_message(self, message, session_id=None):
+    def process_message(self, message, session_id=None, idempotency_key=None):
         """
         Process a user message and generate a response
         
         Args:
             message (str): User message
             session_id (str): Session ID for conversation tracking
+            idempotency_key (str): Optional key of the message; a retry with the
+                same key gets the stored response without running the turn again
             
         Returns:
             dict: Response with text and any additional data
         """
+        # A retried request can arrive while the first one is still running
+        with self.session_locks.hold(session_id or idempotency_key):
+            if not idempotency_key:
+                return self.process_turn(message, session_id)
+            
+            key = (session_id, idempotency_key)
+            response = self.idempotency_cache.get(key, message)
+            if response is not None:
+                print(f"Duplicate request {idempotency_key}, returning the stored response")
+                return response
+            
+            response = self.process_turn(message, session_id)
+            
+            # Failed turns are not stored, so a retry runs them again
+            if 'error' not in response:
+                self.idempotency_cache.put(key, message, response)
+            return response
+    
+    def process_turn(self, message, session_id=None):
+        """Process a user message while holding the lock of its session"""
         # Get or create conversation
         conversation = self.get_or_create_conversation(session_id)
         
+        # Use the same menu for the whole turn, even if a reload swaps it meanwhile
+        self._turn.menu_state = self._menu_state
+        
+        # Collect the turn's database writes; they are committed once at the end
+        unit_of_work = self._turn.unit_of_work = UnitOfWork(self.session)
+        
         try:
             # Add message to history
-            conversation['history'].append({
-                'user': message
-            })
+            conversation.history.append(message)
             
             # Classify intent
             classification = self.intent_classifier.classify_intent(message)
@@ -77,53 +241,36 @@ class RestaurantAgent:
             print(f"Message: '{message}'")
             print(f"Classified intent: '{intent}'")
             print(f"Entities: {entities}")
-            print(f"Current state: '{conversation['state']}'")
-            
-            # Update history with classification
-            conversation['history'][-1]['classification'] = classification
+            print(f"Current state: '{conversation.state}'")
             
             # Special handling for menu items - direct item selection
-            if conversation['state'] == 'ordering':
+            if conversation.state == 'ordering':
                 # Check if the message might contain menu items
                 items = self.order_handler.identify_menu_items(message)
                 if items:
                     print(f"Items identified: {items}")
-                    # Update the conversation context
-                    ordering = conversation['context'].get('ordering', {'items': [], 'stage': 'item_selection'})
                     # Add to existing items
-                    existing_ids = [item['id'] for item in ordering.get('items', [])]
-                    for item in items:
-                        if item['id'] in existing_ids:
-                            # Update quantity of existing item
-                            for existing_item in ordering['items']:
-                                if existing_item['id'] == item['id']:
-                                    existing_item['quantity'] += item['quantity']
-                        else:
-                            # Add new item
-                            if 'items' not in ordering:
-                                ordering['items'] = []
-                            ordering['items'].append(item)
-                    
-                    # Save the updated ordering context
-                    conversation['context']['ordering'] = ordering
+                    if conversation.ordering is None:
+                        conversation.ordering = Cart()
+                    conversation.ordering.add_items(items)
             
             # Generate response based on intent and state
             response = self.handle_intent(intent, entities, conversation)
             
-            # Add response to history
-            conversation['history'].append({
-                'bot': response['text']
-            })
-            
-            # Store in database
-            from models import Conversation as ConversationModel
-            conv_record = ConversationModel(
-                session_id=conversation['session_id'],
-                user_message=message,
-                bot_response=response['text']
-            )
-            self.session.add(conv_record)
-            self.session.commit()
+            # Log to the database. A turn that wrote an order or booking logs
+            # in the same transaction; other turns are batched in the background.
+            if unit_of_work.writes:
+                from models import Conversation as ConversationModel
+                unit_of_work.add(ConversationModel(
+                    session_id=conversation.session_id,
+                    user_message=message,
+                    bot_response=response['text']
+                ))
+            else:
+                self.log_writer.write(conversation.session_id, message, response['text'])
+            
+            # Commit everything the turn wrote at once
+            unit_of_work.commit()
             
             return response
         except Exception as e:
@@ -131,16 +278,18 @@ class RestaurantAgent:
             print(f"Error processing message: {e}")
             print(traceback.format_exc())
             
-            # Add a friendly error response to history
-            conversation['history'].append({
-                'bot': f"I'm sorry, I encountered an error processing your request. Please try again."
-            })
+            # Nothing the turn wrote is kept
+            unit_of_work.rollback()
             
             # Return error response
             return {
                 'text': f"I'm sorry, I encountered an error processing your request. Please try again.",
                 'error': str(e)
             }
+        finally:
+            self._turn.menu_state = None
+            self._turn.unit_of_work = None
+            self.conversations.save(conversation)
     
     def handle_intent(self, intent, entities, conversation):
         """
@@ -149,13 +298,12 @@ class RestaurantAgent:
         Args:
             intent (str): Classified intent
             entities (dict): Extracted entities
-            conversation (dict): Conversation state
+            conversation (ConversationState): Conversation state
             
         Returns:
             dict: Response with text and any additional data
         """
-        state = conversation['state']
-        context = conversation['context']
+        state = conversation.state
         
         # Handle based on current state
         if state == 'initial':
@@ -170,25 +318,21 @@ class RestaurantAgent:
     
     def handle_initial_state(self, intent, entities, conversation):
         """Handle initial conversation state"""
-        context = conversation['context']
-        
         if intent == 'greeting':
             return {
                 'text': self.response_generator.get_response('greeting')
             }
         elif intent == 'order_food':
-            conversation['state'] = 'ordering'
-            context['ordering'] = {
-                'items': [],
-                'stage': 'item_selection'
-            }
+            conversation.state = 'ordering'
+            conversation.ordering = Cart()
             
             # Check if we already have items in the message
             suggested_items = []
             if entities.get('food_item'):
-                items = self.order_handler.identify_menu_items(" ".join(entities['food_item']))
+                message = conversation.history.last()
+                items = self.order_handler.identify_menu_items(message)
                 if items:
-                    context['ordering']['items'] = items
+                    conversation.ordering.items = items
                     items_text = ', '.join(f"{item['quantity']}x {item['name']}" for item in items)
                     return {
                         'text': f"I've added {items_text} to your order. Would you like anything else?",
@@ -205,29 +349,24 @@ class RestaurantAgent:
             }
             
         elif intent == 'book_table':
-            conversation['state'] = 'booking'
-            context['booking'] = {
-                'stage': 'date_selection'
-            }
+            conversation.state = 'booking'
+            conversation.booking = BookingDraft()
             
             # Process any entities we already have
             if entities.get('processed_date'):
-                context['booking']['date'] = entities['processed_date'][0]
-                context['booking']['stage'] = 'time_selection'
+                conversation.booking.date = entities['processed_date'][0]
+                conversation.booking.stage = 'time_selection'
                 
                 # Get available times for the date
-                available_times = self.booking_handler.get_available_times(context['booking']['date'])
+                available_times = self.booking_handler.get_available_times(conversation.booking.date)
                 
                 if not available_times:
-                    return {
-                        'text': self.response_generator.get_response('no_availability') + " Would you like to try another date?",
-                        'available_dates': self.booking_handler.get_available_dates()
-                    }
+                    return self.no_availability_response(conversation.booking)
                 
                 times_text = self.response_generator.format_available_times(available_times)
                 return {
                     'text': self.response_generator.get_response('suggest_times', 
-                                                              date=context['booking']['date'],
+                                                              date=conversation.booking.date,
                                                               times=times_text),
                     'available_times': available_times
                 }
@@ -240,10 +379,11 @@ class RestaurantAgent:
             }
             
         elif intent == 'check_menu':
-            menu_items = [item.to_dict() for item in self.menu_items]
+            menu = self.menu
             return {
                 'text': self.response_generator.get_response('menu_inquiry'),
-                'menu': menu_items
+                'menu': menu.to_dicts(),
+                'menu_version': menu.version
             }
             
         elif intent == 'check_hours':
@@ -264,30 +404,29 @@ class RestaurantAgent:
     
     def handle_ordering_state(self, intent, entities, conversation):
         """Handle ordering conversation state"""
-        context = conversation['context']
-        ordering = context['ordering']
-        message = conversation['history'][-1]['user'] if conversation['history'] else ""
+        ordering = conversation.ordering
+        message = conversation.history.last()
         
         if intent == 'cancel':
-            conversation['state'] = 'initial'
+            conversation.state = 'initial'
             return {
                 'text': "I've cancelled your order. Is there anything else I can help with?"
             }
             
-        if ordering['stage'] == 'item_selection':
+        if ordering.stage == 'item_selection':
             # Check for order completion phrases first
             completion_phrases = ['that\'s all', 'nothing', 'done', 'complete', 'finish', 'no more', 'that is all']
             
             # Check if the message contains any completion phrase
             if any(phrase in message.lower() for phrase in completion_phrases) or intent == 'affirm' or intent == 'deny':
-                if ordering['items']:
-                    ordering['stage'] = 'confirmation'
-                    total = self.order_handler.calculate_total(ordering['items'])
-                    order_summary = self.response_generator.format_order_summary(ordering['items'], total)
+                if ordering.items:
+                    ordering.stage = 'confirmation'
+                    total = self.order_handler.calculate_total(ordering.items)
+                    order_summary = self.response_generator.format_order_summary(ordering.items, total)
                     
                     return {
                         'text': f"{order_summary}\n\nWould you like to proceed with this order?",
-                        'items': ordering['items'],
+                        'items': ordering.items,
                         'total': total
                     }
                 else:
@@ -301,27 +440,16 @@ class RestaurantAgent:
             
             # Check if trying to add items
             if intent == 'order_food' and entities.get('food_item'):
-                # Add items to the order
-                new_items = self.order_handler.identify_menu_items(" ".join(entities['food_item']))
+                # process_turn has already added the items of a message sent
+                # while ordering; adding them again would double the quantities
+                new_items = self.order_handler.identify_menu_items(message)
                 
                 if new_items:
-                    # Add to existing items
-                    existing_ids = [item['id'] for item in ordering['items']]
-                    for item in new_items:
-                        if item['id'] in existing_ids:
-                            # Update quantity of existing item
-                            for existing_item in ordering['items']:
-                                if existing_item['id'] == item['id']:
-                                    existing_item['quantity'] += item['quantity']
-                        else:
-                            # Add new item
-                            ordering['items'].append(item)
-                    
                     # Generate response
                     items_text = ', '.join(f"{item['quantity']}x {item['name']}" for item in new_items)
                     return {
                         'text': f"{items_text} to your order. Would you like anything else?",
-                        'items': ordering['items']
+                        'items': ordering.items
                     }
                 
             # Otherwise ask for more items
@@ -329,10 +457,10 @@ class RestaurantAgent:
                 'text': "What else would you like to order? Or say 'that's all' if you're done."
             }
             
-        elif ordering['stage'] == 'confirmation':
+        elif ordering.stage == 'confirmation':
             if intent == 'affirm' or any(word in message.lower() for word in ['yes', 'yeah', 'yep', 'sure', 'ok', 'okay']):
                 # Proceed to customer details
-                ordering['stage'] = 'customer_details'
+                ordering.stage = 'customer_details'
                 
                 # Extract any customer details from entities
                 customer_info = {}
@@ -343,7 +471,7 @@ class RestaurantAgent:
                 if entities.get('email'):
                     customer_info['email'] = entities['email'][0]
                 
-                context['ordering']['customer_info'] = customer_info
+                ordering.customer_info = customer_info
                 
                 # If we already have sufficient info, proceed to order creation
                 if customer_info.get('name') and (customer_info.get('phone') or customer_info.get('email')):
@@ -355,20 +483,20 @@ class RestaurantAgent:
                 
             elif intent == 'deny' or any(word in message.lower() for word in ['no', 'nope', 'cancel']):
                 # Back to item selection
-                ordering['stage'] = 'item_selection'
+                ordering.stage = 'item_selection'
                 return {
                     'text': "No problem. What changes would you like to make to your order?"
                 }
             
             # If neither affirm nor deny, assume they want to make changes
-            ordering['stage'] = 'item_selection'
+            ordering.stage = 'item_selection'
             return {
                 'text': "What would you like to change in your order?"
             }
             
-        elif ordering['stage'] == 'customer_details':
+        elif ordering.stage == 'customer_details':
             # Extract customer details
-            customer_info = context['ordering'].get('customer_info', {})
+            customer_info = ordering.customer_info
             
             if entities.get('name') and not customer_info.get('name'):
                 customer_info['name'] = entities['name'][0]
@@ -377,7 +505,7 @@ class RestaurantAgent:
             if entities.get('email') and not customer_info.get('email'):
                 customer_info['email'] = entities['email'][0]
             
-            context['ordering']['customer_info'] = customer_info
+            ordering.customer_info = customer_info
             
             # Check if we have enough info
             if customer_info.get('name') and (customer_info.get('phone') or customer_info.get('email')):
@@ -397,35 +525,62 @@ class RestaurantAgent:
             'text': "Is there anything else you'd like to add to your order?"
         }
     
+    def no_availability_response(self, booking, message=None):
+        """
+        Respond to an unavailable date or slot with concrete alternatives
+        
+        Args:
+            booking (BookingDraft): Booking with the requested date, and the
+                                    time and number of guests if already known
+            message (str): Opening sentence, defaults to a no_availability response
+            
+        Returns:
+            dict: Response offering the closest available slots
+        """
+        message = message or self.response_generator.get_response('no_availability')
+        alternatives = self.booking_handler.find_alternatives(
+            booking.date, booking.time, booking.guests or 1
+        )
+        booking.alternatives = alternatives
+        
+        if not alternatives:
+            return {
+                'text': message + " Would you like to try another date?",
+                'available_dates': self.booking_handler.get_available_dates()
+            }
+        
+        slots_text = self.response_generator.format_alternative_slots(alternatives)
+        return {
+            'text': f"{message} The closest available options are: {slots_text}. Would you like one of these?",
+            'alternatives': alternatives,
+            'available_dates': self.booking_handler.get_available_dates()
+        }
+    
     def handle_booking_state(self, intent, entities, conversation):
         """Handle booking conversation state"""
-        context = conversation['context']
-        booking = context.get('booking', {})
+        booking = conversation.booking
         
         if intent == 'cancel':
-            conversation['state'] = 'initial'
+            conversation.state = 'initial'
             return {
                 'text': "I've cancelled your reservation request. Is there anything else I can help with?"
             }
             
-        if booking['stage'] == 'date_selection':
+        if booking.stage == 'date_selection':
             if entities.get('processed_date'):
-                booking['date'] = entities['processed_date'][0]
-                booking['stage'] = 'time_selection'
+                booking.date = entities['processed_date'][0]
+                booking.stage = 'time_selection'
                 
                 # Get available times for the date
-                available_times = self.booking_handler.get_available_times(booking['date'])
+                available_times = self.booking_handler.get_available_times(booking.date)
                 
                 if not available_times:
-                    return {
-                        'text': self.response_generator.get_response('no_availability') + " Would you like to try another date?",
-                        'available_dates': self.booking_handler.get_available_dates()
-                    }
+                    return self.no_availability_response(booking)
                 
                 times_text = self.response_generator.format_available_times(available_times)
                 return {
                     'text': self.response_generator.get_response('suggest_times', 
-                                                              date=booking['date'],
+                                                              date=booking.date,
                                                               times=times_text),
                     'available_times': available_times
                 }
@@ -437,17 +592,23 @@ class RestaurantAgent:
                 'available_dates': available_dates
             }
             
-        elif booking['stage'] == 'time_selection':
+        elif booking.stage == 'time_selection':
             if entities.get('time'):
                 time_str = entities['time'][0]
                 processed_time = self.booking_handler.parse_time(time_str)
                 
                 if processed_time:
-                    booking['time'] = processed_time
-                    booking['stage'] = 'guests_selection'
+                    # Picking an offered alternative on another date moves the booking there
+                    offered_dates = [slot['date'] for slot in booking.alternatives
+                                     if slot['time'] == processed_time]
+                    if len(offered_dates) == 1:
+                        booking.date = offered_dates[0]
+                    
+                    booking.time = processed_time
+                    booking.stage = 'guests_selection'
                     
                     # Check if we already have number of guests
-                    if booking.get('guests'):
+                    if booking.guests:
                         return self.handle_booking_state(intent, entities, conversation)
                     
                     return {
@@ -455,16 +616,16 @@ class RestaurantAgent:
                     }
                 
                 # Invalid time
-                available_times = self.booking_handler.get_available_times(booking['date'])
+                available_times = self.booking_handler.get_available_times(booking.date)
                 times_text = self.response_generator.format_available_times(available_times)
                 
                 return {
-                    'text': f"I'm sorry, I couldn't understand that time. Available times for {booking['date']} are: {times_text}",
+                    'text': f"I'm sorry, I couldn't understand that time. Available times for {booking.date} are: {times_text}",
                     'available_times': available_times
                 }
             
             # No time found, ask again
-            available_times = self.booking_handler.get_available_times(booking['date'])
+            available_times = self.booking_handler.get_available_times(booking.date)
             times_text = self.response_generator.format_available_times(available_times)
             
             return {
@@ -472,33 +633,30 @@ class RestaurantAgent:
                 'available_times': available_times
             }
             
-        elif booking['stage'] == 'guests_selection':
+        elif booking.stage == 'guests_selection':
             if entities.get('number'):
                 number_str = entities['number'][0]
                 guests = self.booking_handler.parse_guests(number_str)
-                booking['guests'] = guests
-                booking['stage'] = 'confirmation'
+                booking.guests = guests
+                booking.stage = 'confirmation'
                 
                 # Check availability
                 is_available = self.booking_handler.is_table_available(
-                    booking['date'], booking['time'], booking['guests']
+                    booking.date, booking.time, booking.guests
                 )
                 
                 if not is_available:
-                    booking['stage'] = 'time_selection'
-                    available_times = self.booking_handler.get_available_times(booking['date'])
-                    times_text = self.response_generator.format_available_times(available_times)
-                    
-                    return {
-                        'text': f"I'm sorry, we don't have availability for {booking['guests']} guests at {booking['time']} on {booking['date']}. Available times are: {times_text}",
-                        'available_times': available_times
-                    }
+                    booking.stage = 'time_selection'
+                    return self.no_availability_response(
+                        booking,
+                        f"I'm sorry, we don't have availability for {booking.guests} guests at {booking.time} on {booking.date}."
+                    )
                 
                 # Show booking summary
-                booking_summary = self.response_generator.format_booking_summary(booking)
+                booking_summary = self.response_generator.format_booking_summary(booking.to_dict())
                 return {
                     'text': f"{booking_summary}\n\nWould you like to confirm this reservation?",
-                    'booking': booking
+                    'booking': booking.to_dict()
                 }
             
             # No number found, ask again
@@ -506,10 +664,10 @@ class RestaurantAgent:
                 'text': "How many people will be in your party?"
             }
             
-        elif booking['stage'] == 'confirmation':
+        elif booking.stage == 'confirmation':
             if intent == 'affirm':
                 # Proceed to customer details
-                booking['stage'] = 'customer_details'
+                booking.stage = 'customer_details'
                 
                 # Extract any customer details from entities
                 customer_info = {}
@@ -520,7 +678,7 @@ class RestaurantAgent:
                 if entities.get('email'):
                     customer_info['email'] = entities['email'][0]
                 
-                context['booking']['customer_info'] = customer_info
+                booking.customer_info = customer_info
                 
                 # If we already have sufficient info, proceed to booking creation
                 if customer_info.get('name') and (customer_info.get('phone') or customer_info.get('email')):
@@ -532,22 +690,22 @@ class RestaurantAgent:
                 
             elif intent == 'deny':
                 # Go back to date selection
-                booking['stage'] = 'date_selection'
+                booking.stage = 'date_selection'
                 return {
                     'text': "No problem. Let's start over. What date would you like to make a reservation for?",
                     'available_dates': self.booking_handler.get_available_dates()
                 }
             
             # If neither affirm nor deny, assume they want to make changes
-            booking['stage'] = 'date_selection'
+            booking.stage = 'date_selection'
             return {
                 'text': "What would you like to change in your reservation?",
                 'available_dates': self.booking_handler.get_available_dates()
             }
             
-        elif booking['stage'] == 'customer_details':
+        elif booking.stage == 'customer_details':
             # Extract customer details
-            customer_info = context['booking'].get('customer_info', {})
+            customer_info = booking.customer_info
             
             if entities.get('name') and not customer_info.get('name'):
                 customer_info['name'] = entities['name'][0]
@@ -556,7 +714,7 @@ class RestaurantAgent:
             if entities.get('email') and not customer_info.get('email'):
                 customer_info['email'] = entities['email'][0]
             
-            context['booking']['customer_info'] = customer_info
+            booking.customer_info = customer_info
             
             # Check if we have enough info
             if customer_info.get('name') and (customer_info.get('phone') or customer_info.get('email')):
@@ -589,18 +747,15 @@ class RestaurantAgent:
                 'text': self.response_generator.get_response('farewell')
             }
         elif intent == 'order_food':
-            conversation['state'] = 'ordering'
-            context = conversation['context']
-            context['ordering'] = {
-                'items': [],
-                'stage': 'item_selection'
-            }
+            conversation.state = 'ordering'
+            conversation.ordering = Cart()
             
             # Check for food items in the message
             if entities.get('food_item'):
-                items = self.order_handler.identify_menu_items(" ".join(entities['food_item']))
+                message = conversation.history.last()
+                items = self.order_handler.identify_menu_items(message)
                 if items:
-                    context['ordering']['items'] = items
+                    conversation.ordering.items = items
                     return {
                         'text': {', '.join([f"{item['quantity']}x {item['name']}" for item in items])},
                         'items': items
@@ -616,30 +771,24 @@ class RestaurantAgent:
             }
             
         elif intent == 'book_table':
-            conversation['state'] = 'booking'
-            context = conversation['context']
-            context['booking'] = {
-                'stage': 'date_selection'
-            }
+            conversation.state = 'booking'
+            conversation.booking = BookingDraft()
             
             # Process any entities we already have
             if entities.get('processed_date'):
-                context['booking']['date'] = entities['processed_date'][0]
-                context['booking']['stage'] = 'time_selection'
+                conversation.booking.date = entities['processed_date'][0]
+                conversation.booking.stage = 'time_selection'
                 
                 # Get available times for the date
-                available_times = self.booking_handler.get_available_times(context['booking']['date'])
+                available_times = self.booking_handler.get_available_times(conversation.booking.date)
                 
                 if not available_times:
-                    return {
-                        'text': self.response_generator.get_response('no_availability') + " Would you like to try another date?",
-                        'available_dates': self.booking_handler.get_available_dates()
-                    }
+                    return self.no_availability_response(conversation.booking)
                 
                 times_text = self.response_generator.format_available_times(available_times)
                 return {
                     'text': self.response_generator.get_response('suggest_times', 
-                                                              date=context['booking']['date'],
+                                                              date=conversation.booking.date,
                                                               times=times_text),
                     'available_times': available_times
                 }
@@ -652,10 +801,11 @@ class RestaurantAgent:
             }
             
         elif intent == 'check_menu':
-            menu_items = [item.to_dict() for item in self.menu_items]
+            menu = self.menu
             return {
                 'text': self.response_generator.get_response('menu_inquiry'),
-                'menu': menu_items
+                'menu': menu.to_dicts(),
+                'menu_version': menu.version
             }
             
         elif intent == 'check_hours':
@@ -679,21 +829,20 @@ class RestaurantAgent:
         Complete the order process
         
         Args:
-            conversation (dict): Conversation state
+            conversation (ConversationState): Conversation state
             
         Returns:
             dict: Response with confirmation text
         """
-        context = conversation['context']
-        ordering = context['ordering']
-        customer_info = ordering.get('customer_info', {})
+        ordering = conversation.ordering
+        customer_info = ordering.customer_info
         
         # Create order in database
         try:
-            order = self.order_handler.create_order(customer_info, ordering['items'])
+            order = self.order_handler.create_order(customer_info, ordering.items, self.unit_of_work)
             
-            # Reset conversation state
-            conversation['state'] = 'initial'
+            # Reset conversation state once the order is committed
+            self.unit_of_work.after_commit(lambda: setattr(conversation, 'state', 'initial'))
             
             return {
                 'text': self.response_generator.get_response('order_confirmation', 
@@ -702,7 +851,8 @@ class RestaurantAgent:
                 'order': order.to_dict()
             }
         except Exception as e:
-            # Handle error
+            # Handle error; nothing of the order is kept
+            self.unit_of_work.rollback()
             return {
                 'text': f"I'm sorry, there was an error processing your order: {str(e)}. Please try again."
             }
@@ -712,28 +862,27 @@ class RestaurantAgent:
         Complete the booking process
         
         Args:
-            conversation (dict): Conversation state
+            conversation (ConversationState): Conversation state
             
         Returns:
             dict: Response with confirmation text
         """
-        context = conversation['context']
-        booking_data = context['booking']
-        customer_info = booking_data.get('customer_info', {})
+        booking_data = conversation.booking
+        customer_info = booking_data.customer_info
         
         # Create booking in database
         try:
             booking_details = {
-                'date': booking_data['date'],
-                'time': booking_data['time'],
-                'guests': booking_data['guests'],
-                'special_requests': booking_data.get('special_requests', '')
+                'date': booking_data.date,
+                'time': booking_data.time,
+                'guests': booking_data.guests,
+                'special_requests': ''
             }
             
-            booking = self.booking_handler.create_booking(customer_info, booking_details)
+            booking = self.booking_handler.create_booking(customer_info, booking_details, self.unit_of_work)
             
-            # Reset conversation state
-            conversation['state'] = 'initial'
+            # Reset conversation state once the booking is committed
+            self.unit_of_work.after_commit(lambda: setattr(conversation, 'state', 'initial'))
             
             return {
                 'text': self.response_generator.get_response('booking_confirmation',
@@ -743,7 +892,8 @@ class RestaurantAgent:
                 'booking': booking.to_dict()
             }
         except Exception as e:
-            # Handle error
+            # Handle error; nothing of the booking is kept
+            self.unit_of_work.rollback()
             return {
                 'text': f"I'm sorry, there was an error processing your booking: {str(e)}. Please try again."
             }
\ No newline at end of file
@@ -0,0 +1,221 @@
+# agent/availability.py
+import datetime
+import threading
+import time as time_module
+from collections import OrderedDict
+
+class AvailabilityCalendar:
+    """
+    Per-day table availability
+
+    Built from the slots of a set of dates, loaded with a single range query or
+    taken from the availability cache. Answers the available date list, the
+    available times of a date and single-slot lookups without going back to
+    the database.
+    """
+
+    def __init__(self, slots):
+        """
+        Args:
+            slots (dict): date -> list of (time, available) in slot order
+        """
+        self.slots = slots
+
+    def available_dates(self, start_date, days):
+        """
+        Get the dates that have at least one available slot
+
+        Args:
+            start_date (datetime.date): First date to check
+            days (int): Number of days to check
+
+        Returns:
+            list: Dicts with date and display strings, in date order
+        """
+        date_list = []
+        for i in range(days):
+            check_date = start_date + datetime.timedelta(days=i)
+            date_str = check_date.strftime('%Y-%m-%d')
+            if any(available > 0 for _, available in self.slots.get(date_str, ())):
+                date_list.append({
+                    'date': date_str,
+                    'display': check_date.strftime('%A, %B %d, %Y')
+                })
+        return date_list
+
+    def available_times(self, date):
+        """
+        Get the available time slots of a date
+
+        Returns:
+            list: Dicts with time and available tables
+        """
+        return [
+            {
+                'time': time,
+                'available': available
+            }
+            for time, available in self.slots.get(date, ())
+            if available > 0
+        ]
+
+    def tables_available(self, date, time):
+        """
+        Get the number of free tables in a slot
+
+        Returns:
+            int: Free tables, or None if the slot does not exist
+        """
+        for slot_time, available in self.slots.get(date, ()):
+            if slot_time == time:
+                return available
+        return None
+
+class AvailabilityCache:
+    """
+    In-process LRU cache of table availability, keyed by date
+
+    Availability only changes when a booking is made (or cancelled), so
+    writers update the cached slot in place (write-through) instead of
+    dropping it. Entries also expire after ttl seconds, which bounds how stale
+    a cache can get when other processes write to the same database.
+    """
+
+    def __init__(self, max_dates=512, ttl=None):
+        self.max_dates = max_dates
+        self.ttl = ttl
+        self._entries = OrderedDict()  # date -> (loaded_at, tuple of (time, available))
+        self._lock = threading.Lock()
+
+        # Bumped on every write, so loads that raced with a write are not cached
+        self.generation = 0
+
+        # date -> writes begun but not yet applied or aborted; loads of these
+        # dates may have read the new rows and are not cached
+        self._writing = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, date):
+        """
+        Get the cached slots of a date
+
+        Returns:
+            tuple: (time, available) pairs, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(date)
+            if entry is not None and self.ttl is not None and time_module.monotonic() - entry[0] > self.ttl:
+                del self._entries[date]
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(date)
+            self.hits += 1
+            return entry[1]
+
+    def put_many(self, slots_by_date, generation):
+        """
+        Cache freshly loaded slots
+
+        Args:
+            slots_by_date (dict): date -> list of (time, available); dates
+                                  without slots must be included with an empty list
+            generation (int): Value of self.generation read before loading
+        """
+        if self.max_dates <= 0:
+            return
+
+        with self._lock:
+            if generation != self.generation:
+                # A booking was written while loading: the rows may be stale
+                return
+
+            now = time_module.monotonic()
+            for date, slots in slots_by_date.items():
+                if date in self._writing:
+                    continue
+                self._entries[date] = (now, tuple(slots))
+                self._entries.move_to_end(date)
+
+            while len(self._entries) > self.max_dates:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def begin_write(self, date):
+        """
+        Mark a date as being written, before the change is committed
+
+        Loads that are running or that start before the write ends are not
+        cached for this date: they may read the committed row, and adjust()
+        would then apply the change a second time.
+
+        Args:
+            date (str): Slot date
+        """
+        with self._lock:
+            self.generation += 1
+            self._writing[date] = self._writing.get(date, 0) + 1
+
+    def abort_write(self, date):
+        """End a write of begin_write() that was rolled back"""
+        with self._lock:
+            self.generation += 1
+            self._end_write(date)
+
+    def _end_write(self, date):
+        pending = self._writing.get(date, 0) - 1
+        if pending > 0:
+            self._writing[date] = pending
+        else:
+            self._writing.pop(date, None)
+
+    def adjust(self, date, time, delta):
+        """
+        Write-through update after a committed change to a slot
+
+        Ends the write of begin_write(), if one was begun for the date.
+
+        Args:
+            date (str): Slot date
+            time (str): Slot time
+            delta (int): Change in available tables, negative for a booking
+        """
+        with self._lock:
+            self.generation += 1
+            self._end_write(date)
+            entry = self._entries.get(date)
+            if entry is None:
+                return
+
+            self._entries[date] = (entry[0], tuple(
+                (slot_time, available + delta if slot_time == time else available)
+                for slot_time, available in entry[1]
+            ))
+
+    def invalidate(self, date=None):
+        """Drop one date, or everything"""
+        with self._lock:
+            self.generation += 1
+            if date is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(date, None)
+
+    def stats(self):
+        """Get hit, miss and eviction counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_dates': self.max_dates,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
@@ -2,45 +2,102 @@
 import datetime
 import re
 from models import TableAvailability, TableBooking
+from .availability import AvailabilityCache, AvailabilityCalendar
+from .slot_calendar import SlotCalendar, tables_needed
+from .unit_of_work import UnitOfWork
 
 class BookingHandler:
     """
     Handles table booking functionality
     """
     
-    def __init__(self, session):
+    def __init__(self, session, days_ahead=7, cache=None, max_days_ahead=366):
         self.session = session
+        self.days_ahead = days_ahead
+        
+        # Longest range a caller can ask for; each day is a cache entry
+        self.max_days_ahead = max_days_ahead
+        
+        # Availability by date, updated write-through by create_booking()
+        self.cache = cache if cache is not None else AvailabilityCache()
     
-    def get_available_dates(self, days_ahead=7):
+    def load_slots(self, dates):
         """
-        Get a list of dates with available tables
+        Get the slots of some dates, from the cache or with a single range query
         
         Args:
-            days_ahead (int): Number of days to look ahead
+            dates (list): Date strings in format 'YYYY-MM-DD'
             
         Returns:
-            list: List of dates with available tables
+            dict: date -> (time, available) pairs in slot order
         """
-        today = datetime.datetime.now().date()
-        date_list = []
+        slots = {date: self.cache.get(date) for date in dates}
+        missing = [date for date, date_slots in slots.items() if date_slots is None]
+        
+        if missing:
+            generation = self.cache.generation
+            loaded = {date: [] for date in missing}
+            rows = self.session.query(
+                TableAvailability.date, TableAvailability.time, TableAvailability.available
+            ).filter(
+                TableAvailability.date >= min(missing),
+                TableAvailability.date <= max(missing)
+            ).order_by(TableAvailability.id).all()
+            
+            for date, time, available in rows:
+                if date in loaded:
+                    loaded[date].append((time, available))
+            
+            self.cache.put_many(loaded, generation)
+            slots.update(loaded)
+        
+        return slots
+    
+    def clamp_days_ahead(self, days_ahead=None):
+        """
+        Bring a number of days to look ahead into the range 1..max_days_ahead
         
-        for i in range(days_ahead):
-            check_date = today + datetime.timedelta(days=i)
-            date_str = check_date.strftime('%Y-%m-%d')
+        Args:
+            days_ahead (int): Number of days to look ahead, defaults to self.days_ahead
             
-            # Check if there are available tables for this date
-            availability = self.session.query(TableAvailability).filter(
-                TableAvailability.date == date_str,
-                TableAvailability.available > 0
-            ).first()
+        Returns:
+            int: Number of days to look ahead
+        """
+        days_ahead = days_ahead or self.days_ahead
+        return max(1, min(days_ahead, self.max_days_ahead))
+    
+    def load_calendar(self, days_ahead=None, start_date=None):
+        """
+        Load table availability for a range of dates
+        
+        Args:
+            days_ahead (int): Number of days to cover, defaults to self.days_ahead
+            start_date (datetime.date): First day, defaults to today
             
-            if availability:
-                date_list.append({
-                    'date': date_str,
-                    'display': check_date.strftime('%A, %B %d, %Y')
-                })
+        Returns:
+            AvailabilityCalendar: Availability of every slot in the range
+        """
+        days_ahead = self.clamp_days_ahead(days_ahead)
+        start_date = start_date or datetime.datetime.now().date()
+        dates = [
+            (start_date + datetime.timedelta(days=i)).strftime('%Y-%m-%d')
+            for i in range(days_ahead)
+        ]
+        return AvailabilityCalendar(self.load_slots(dates))
+    
+    def get_available_dates(self, days_ahead=None):
+        """
+        Get a list of dates with available tables
         
-        return date_list
+        Args:
+            days_ahead (int): Number of days to look ahead, defaults to self.days_ahead
+            
+        Returns:
+            list: List of dates with available tables
+        """
+        days_ahead = self.clamp_days_ahead(days_ahead)
+        start_date = datetime.datetime.now().date()
+        return self.load_calendar(days_ahead, start_date).available_dates(start_date, days_ahead)
     
     def get_available_times(self, date):
         """
@@ -52,18 +109,7 @@ class BookingHandler:
         Returns:
             list: List of available time slots
         """
-        availabilities = self.session.query(TableAvailability).filter(
-            TableAvailability.date == date,
-            TableAvailability.available > 0
-        ).all()
-        
-        return [
-            {
-                'time': a.time,
-                'available': a.available
-            }
-            for a in availabilities
-        ]
+        return AvailabilityCalendar(self.load_slots([date])).available_times(date)
     
     def is_table_available(self, date, time, guests):
         """
@@ -77,41 +123,98 @@ class BookingHandler:
         Returns:
             bool: True if a table is available, False otherwise
         """
-        # Find the closest matching time
-        availability = self.session.query(TableAvailability).filter(
-            TableAvailability.date == date,
-            TableAvailability.time == time
-        ).first()
+        available = AvailabilityCalendar(self.load_slots([date])).tables_available(date, time)
         
-        if not availability:
+        if available is None:
             return False
         
-        # Simple logic: 1 table can accommodate up to 4 guests
-        # For larger parties, we need more tables
-        tables_needed = (guests + 3) // 4  # Ceiling division
+        return available >= tables_needed(guests)
+    
+    def find_alternatives(self, date, time=None, guests=1, limit=3):
+        """
+        Find concrete slots to offer when the requested one is not available
+        
+        Prefers the slots closest to the requested time on the same date, then
+        the earliest slots on the following days, then those on the days
+        between today and the requested date.
         
-        return availability.available >= tables_needed
+        Args:
+            date (str): Requested date in format 'YYYY-MM-DD'
+            time (str): Requested time, if any
+            guests (int): Party size
+            limit (int): Maximum number of slots to return
+            
+        Returns:
+            list: Slot dicts with date, time and available
+        """
+        try:
+            requested_day = datetime.datetime.strptime(date, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return []
+        today = datetime.datetime.now().date()
+        first_day = max(requested_day, today)
+        if (first_day - today).days >= self.max_days_ahead:
+            return []
+        
+        # One window covering today up to days_ahead past the requested date
+        window = (first_day - today).days + self.days_ahead
+        dates = [(today + datetime.timedelta(days=i)).strftime('%Y-%m-%d') for i in range(window)]
+        calendar = SlotCalendar.from_slots(self.load_slots(dates))
+        
+        alternatives = calendar.nearest_slots(date, time, guests, limit) if time else []
+        if not alternatives:
+            alternatives = calendar.first_slots(first_day.strftime('%Y-%m-%d'), self.days_ahead, guests, limit)
+        if not alternatives:
+            alternatives = calendar.first_slots(dates[0], (first_day - today).days, guests, limit)
+        
+        return alternatives
     
-    def create_booking(self, customer_info, booking_details):
+    def create_booking(self, customer_info, booking_details, unit_of_work=None):
         """
         Create a new table booking in the database
         
         Args:
             customer_info (dict): Customer information (name, email, phone)
             booking_details (dict): Booking details (date, time, guests, special_requests)
+            unit_of_work (UnitOfWork): Transaction of the chat turn, which the
+                caller commits; without one the booking is committed right away
             
         Returns:
             TableBooking: The created booking object
         """
-        # Check availability first
+        standalone = unit_of_work is None
+        if standalone:
+            unit_of_work = UnitOfWork(self.session)
+        
         date = booking_details.get('date')
         time = booking_details.get('time')
         guests = booking_details.get('guests', 1)
+        tables = tables_needed(guests)
         
-        if not self.is_table_available(date, time, guests):
+        # Reserve the tables with a single conditional UPDATE. The availability
+        # check and the decrement happen atomically in the database, so
+        # concurrent bookings can never oversell a slot.
+        reserved = self.session.query(TableAvailability).filter(
+            TableAvailability.date == date,
+            TableAvailability.time == time,
+            TableAvailability.available >= tables
+        ).update(
+            {TableAvailability.available: TableAvailability.available - tables},
+            synchronize_session=False
+        )
+        
+        if not reserved:
+            if standalone:
+                unit_of_work.rollback()
             raise ValueError(f"No tables available for {guests} guests on {date} at {time}")
+        unit_of_work.mark_written()
+        
+        # Loads that overlap the commit must not be cached, or the cache would
+        # take the new row and then apply the reservation to it again
+        self.cache.begin_write(date)
+        unit_of_work.after_rollback(lambda: self.cache.abort_write(date))
         
-        # Create booking
+        # Create booking in the same transaction
         booking = TableBooking(
             customer_name=customer_info.get('name', 'Guest'),
             customer_email=customer_info.get('email'),
@@ -123,21 +226,19 @@ class BookingHandler:
             status='confirmed'
         )
         
-        self.session.add(booking)
-        
-        # Update table availability
-        tables_needed = (guests + 3) // 4  # Ceiling division
-        
-        availability = self.session.query(TableAvailability).filter(
-            TableAvailability.date == date,
-            TableAvailability.time == time
-        ).first()
+        unit_of_work.add(booking)
         
-        if availability:
-            availability.available -= tables_needed
+        # Write-through: once the reservation is committed, apply it to the cache
+        unit_of_work.after_commit(lambda: self.cache.adjust(date, time, -tables))
         
-        # Commit transaction
-        self.session.commit()
+        try:
+            self.session.flush()
+            if standalone:
+                unit_of_work.commit()
+        except Exception:
+            if standalone:
+                unit_of_work.rollback()
+            raise
         
         return booking
     
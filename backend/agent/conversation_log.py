@@ -0,0 +1,129 @@
+# agent/conversation_log.py
+import atexit
+import datetime
+import queue
+import threading
+import time as time_module
+
+class ConversationLogWriter:
+    """
+    Background group-commit writer for the conversations table
+
+    Chat turns only enqueue their log row. A writer thread collects rows for
+    up to flush_interval seconds or batch_size rows and inserts them in a
+    single transaction with executemany, so many turns share one commit. The
+    queue is bounded: when the database falls behind, write() blocks instead
+    of letting memory grow.
+    """
+
+    def __init__(self, engine, batch_size=200, flush_interval=0.05, max_queue=10000):
+        from models import Conversation
+        self.engine = engine
+        self.table = Conversation.__table__
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._closed = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.enqueued = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.blocked = 0
+
+    def start(self):
+        """Start the writer thread; pending rows are flushed at interpreter exit"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='conversation-log-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def write(self, session_id, user_message, bot_response):
+        """
+        Enqueue a conversation log row
+
+        Blocks while the queue is full (backpressure).
+        """
+        row = {
+            'session_id': session_id,
+            'user_message': user_message,
+            'bot_response': bot_response,
+            'timestamp': datetime.datetime.utcnow()
+        }
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.blocked += 1
+            self._queue.put(row)
+
+        with self._lock:
+            self.enqueued += 1
+
+    def flush(self):
+        """Wait until every row enqueued so far is written"""
+        self._queue.join()
+
+    def close(self):
+        """Flush pending rows and stop the writer thread"""
+        if self._thread is None or self._closed.is_set():
+            return
+        self.flush()
+        self._closed.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._closed.is_set():
+            try:
+                rows = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+
+            # Collect more rows until the batch is full or the interval ends
+            deadline = time_module.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                remaining = deadline - time_module.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    rows.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._write_batch(rows)
+            for _ in rows:
+                self._queue.task_done()
+
+    def _write_batch(self, rows):
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(self.table.insert(), rows)
+        except Exception as e:
+            print(f"Error writing {len(rows)} conversation log rows: {e}")
+            with self._lock:
+                self.failed += len(rows)
+            return
+
+        with self._lock:
+            self.written += len(rows)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(rows))
+
+    def stats(self):
+        """Get queue and batch counters"""
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'failed': self.failed,
+                'batches': self.batches,
+                'avg_batch': round(self.written / self.batches, 1) if self.batches else 0.0,
+                'largest_batch': self.largest_batch,
+                'blocked_writes': self.blocked
+            }
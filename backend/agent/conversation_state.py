@@ -0,0 +1,139 @@
+# agent/conversation_state.py
+
+# User messages kept per conversation. The handlers only read the last one;
+# the full transcript is in the conversations table.
+HISTORY_SIZE = 4
+
+class MessageHistory:
+    """
+    Fixed-size ring buffer of the most recent user messages
+    """
+    __slots__ = ('_messages', '_next', '_count')
+
+    def __init__(self, size=HISTORY_SIZE, messages=()):
+        self._messages = [None] * size
+        self._next = 0
+        self._count = 0
+        for message in messages:
+            self.append(message)
+
+    def append(self, message):
+        """Add a message, overwriting the oldest one when full"""
+        self._messages[self._next] = message
+        self._next = (self._next + 1) % len(self._messages)
+        self._count = min(self._count + 1, len(self._messages))
+
+    def last(self):
+        """Get the most recent message, or an empty string"""
+        if not self._count:
+            return ""
+        return self._messages[self._next - 1]
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """Iterate from the oldest to the most recent message"""
+        size = len(self._messages)
+        for i in range(self._next - self._count, self._next):
+            yield self._messages[i % size]
+
+class Cart:
+    """
+    Order being built in the ordering state
+
+    Items are the dicts returned by OrderHandler.identify_menu_items() (id,
+    name, price, quantity, confidence); they are sent as is in responses.
+    """
+    __slots__ = ('stage', 'items', 'customer_info')
+
+    def __init__(self, stage='item_selection', items=None, customer_info=None):
+        self.stage = stage
+        self.items = items if items is not None else []
+        self.customer_info = customer_info if customer_info is not None else {}
+
+    def add_items(self, new_items):
+        """Add items, increasing the quantity of those already in the cart"""
+        for item in new_items:
+            for existing_item in self.items:
+                if existing_item['id'] == item['id']:
+                    existing_item['quantity'] += item['quantity']
+                    break
+            else:
+                self.items.append(item)
+
+    def to_dict(self):
+        return {
+            'stage': self.stage,
+            'items': self.items,
+            'customer_info': self.customer_info
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['stage'], data['items'], data['customer_info'])
+
+class BookingDraft:
+    """
+    Reservation being built in the booking state
+    """
+    __slots__ = ('stage', 'date', 'time', 'guests', 'customer_info', 'alternatives')
+
+    def __init__(self, stage='date_selection', date=None, time=None, guests=None,
+                 customer_info=None, alternatives=None):
+        self.stage = stage
+        self.date = date
+        self.time = time
+        self.guests = guests
+        self.customer_info = customer_info if customer_info is not None else {}
+        self.alternatives = alternatives if alternatives is not None else []
+
+    def to_dict(self):
+        return {
+            'stage': self.stage,
+            'date': self.date,
+            'time': self.time,
+            'guests': self.guests,
+            'customer_info': self.customer_info,
+            'alternatives': self.alternatives
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+class ConversationState:
+    """
+    State of one chat session
+
+    state is 'initial', 'ordering' or 'booking'; ordering and booking hold
+    the cart and booking draft of the current (or last) flow.
+    """
+    __slots__ = ('session_id', 'state', 'ordering', 'booking', 'history')
+
+    def __init__(self, session_id, state='initial', ordering=None, booking=None, history=None):
+        self.session_id = session_id
+        self.state = state
+        self.ordering = ordering
+        self.booking = booking
+        self.history = history if history is not None else MessageHistory()
+
+    def to_dict(self):
+        """Get the state as plain data, e.g. for serialization"""
+        return {
+            'session_id': self.session_id,
+            'state': self.state,
+            'ordering': self.ordering.to_dict() if self.ordering else None,
+            'booking': self.booking.to_dict() if self.booking else None,
+            'history': list(self.history)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['session_id'],
+            data['state'],
+            Cart.from_dict(data['ordering']) if data.get('ordering') else None,
+            BookingDraft.from_dict(data['booking']) if data.get('booking') else None,
+            MessageHistory(messages=data.get('history', ()))
+        )
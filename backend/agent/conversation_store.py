@@ -0,0 +1,374 @@
+# agent/conversation_store.py
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time as time_module
+import zlib
+from collections import OrderedDict
+from .conversation_state import ConversationState
+
+def estimate_size(obj):
+    """
+    Approximate the memory held by a conversation, in bytes
+
+    Counts containers and the strings and numbers they hold. Shared objects
+    (interned strings, small ints) are counted every time, so the estimate
+    errs on the high side.
+    """
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__slots__'):
+        for name in obj.__slots__:
+            size += estimate_size(getattr(obj, name, None))
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            size += estimate_size(key) + estimate_size(value)
+    elif isinstance(obj, (list, tuple, set)):
+        for value in obj:
+            size += estimate_size(value)
+    return size
+
+def serialize_conversation(conversation):
+    """
+    Encode a conversation compactly for a shared store
+
+    Minified JSON of ConversationState.to_dict(), compressed with zlib.
+
+    Returns:
+        bytes: The encoded conversation
+    """
+    payload = json.dumps(conversation.to_dict(), separators=(',', ':'))
+    return zlib.compress(payload.encode('utf-8'), 1)
+
+def deserialize_conversation(data):
+    """Decode a conversation encoded by serialize_conversation()"""
+    return ConversationState.from_dict(json.loads(zlib.decompress(data).decode('utf-8')))
+
+class ConversationStore:
+    """
+    Interface of conversation state backends
+
+    get() returns a conversation the caller may mutate for the duration of a
+    turn; save() must be called afterwards for the changes to be seen by
+    other workers. loader, if set, rebuilds conversations the store no
+    longer has.
+    """
+    loader = None
+
+    def get(self, session_id):
+        """Get a conversation, or None if it is unknown"""
+        raise NotImplementedError
+
+    def put(self, session_id, conversation):
+        """Add or replace a conversation"""
+        raise NotImplementedError
+
+    def save(self, conversation):
+        """Persist the changes made to a conversation during a turn"""
+        raise NotImplementedError
+
+    def discard(self, session_id):
+        """Remove a conversation"""
+        raise NotImplementedError
+
+    def stats(self):
+        """Get backend counters"""
+        raise NotImplementedError
+
+class MemoryConversationStore(ConversationStore):
+    """
+    Bounded in-memory store of conversation state
+
+    Only usable with a single worker process.
+
+    Conversations are kept in least-recently-used order. Conversations idle
+    for longer than idle_ttl seconds expire, and the least recently used ones
+    are evicted when there are more than max_sessions or when their estimated
+    size exceeds memory_budget bytes.
+
+    When a session that is not in memory comes back, the loader (if any) is
+    asked to rebuild it, e.g. from the conversations table.
+    """
+
+    def __init__(self, max_sessions=10000, idle_ttl=1800, memory_budget=64 * 1024 * 1024, loader=None):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.memory_budget = memory_budget
+        self.loader = loader
+
+        self._conversations = OrderedDict()  # session_id -> (last_used, conversation)
+        self._sizes = {}
+        self.memory_used = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.restored = 0
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+        self.evicted_memory = 0
+
+    def __len__(self):
+        return len(self._conversations)
+
+    def __contains__(self, session_id):
+        return session_id in self._conversations
+
+    def get(self, session_id):
+        """
+        Get a conversation, rebuilding it with the loader if it is not in memory
+
+        Returns:
+            ConversationState: The conversation, or None if it is unknown
+        """
+        now = time_module.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._conversations.get(session_id)
+            if entry is not None:
+                self._conversations[session_id] = (now, entry[1])
+                self._conversations.move_to_end(session_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        if self.loader is None:
+            return None
+
+        # Rebuild outside the lock, the loader may query the database
+        conversation = self.loader(session_id)
+        if conversation is None:
+            return None
+
+        with self._lock:
+            entry = self._conversations.get(session_id)
+            if entry is not None:
+                # Another request restored it first
+                return entry[1]
+            self.restored += 1
+            self._insert(session_id, conversation, now)
+        return conversation
+
+    def put(self, session_id, conversation):
+        """Add a conversation, evicting others if the store is over its limits"""
+        with self._lock:
+            self._insert(session_id, conversation, time_module.monotonic())
+
+    def save(self, conversation):
+        """
+        Record that a conversation changed, e.g. at the end of a turn
+
+        Re-estimates its size and enforces the memory budget.
+        """
+        session_id = conversation.session_id
+        with self._lock:
+            if session_id in self._conversations:
+                self._insert(session_id, conversation, time_module.monotonic())
+
+    def discard(self, session_id):
+        """Remove a conversation"""
+        with self._lock:
+            if self._conversations.pop(session_id, None) is not None:
+                self.memory_used -= self._sizes.pop(session_id)
+
+    def _insert(self, session_id, conversation, now):
+        if session_id in self._conversations:
+            self.memory_used -= self._sizes[session_id]
+
+        size = estimate_size(conversation)
+        self._conversations[session_id] = (now, conversation)
+        self._conversations.move_to_end(session_id)
+        self._sizes[session_id] = size
+        self.memory_used += size
+
+        self._expire(now)
+
+        # Never evict the conversation that was just stored
+        while len(self._conversations) > max(self.max_sessions, 1):
+            self._evict_oldest()
+            self.evicted_lru += 1
+        while self.memory_used > self.memory_budget and len(self._conversations) > 1:
+            self._evict_oldest()
+            self.evicted_memory += 1
+
+    def _expire(self, now):
+        """Drop conversations idle for longer than idle_ttl, oldest first"""
+        if self.idle_ttl is None:
+            return
+        while self._conversations:
+            session_id, (last_used, _) = next(iter(self._conversations.items()))
+            if now - last_used <= self.idle_ttl:
+                break
+            self._evict_oldest()
+            self.evicted_idle += 1
+
+    def _evict_oldest(self):
+        session_id, _ = self._conversations.popitem(last=False)
+        self.memory_used -= self._sizes.pop(session_id)
+
+    def stats(self):
+        """Get size, memory and eviction counters"""
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'sessions': len(self._conversations),
+                'max_sessions': self.max_sessions,
+                'memory_used': self.memory_used,
+                'memory_budget': self.memory_budget,
+                'hits': self.hits,
+                'misses': self.misses,
+                'restored': self.restored,
+                'evicted_idle': self.evicted_idle,
+                'evicted_lru': self.evicted_lru,
+                'evicted_memory': self.evicted_memory
+            }
+
+class SQLiteConversationStore(ConversationStore):
+    """
+    Conversation state in a SQLite file shared by local worker processes
+
+    The file uses write-ahead logging, so readers in other processes are
+    never blocked by a writer and each turn costs a single small write.
+    Conversations idle for longer than idle_ttl seconds, and the least
+    recently saved ones beyond max_sessions, are removed by a periodic sweep.
+    """
+
+    SWEEP_EVERY = 500  # Writes between two sweeps
+
+    def __init__(self, path, max_sessions=100000, idle_ttl=1800, loader=None):
+        self.path = os.path.abspath(path)
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.loader = loader
+
+        # sqlite3 connections cannot be shared between threads
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.restored = 0
+        self.expired = 0
+        self.bytes_written = 0
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_state ("
+            " session_id TEXT PRIMARY KEY,"
+            " updated_at REAL NOT NULL,"
+            " data BLOB NOT NULL)"
+        )
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_conversation_state_updated_at"
+            " ON conversation_state (updated_at)"
+        )
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, session_id):
+        row = self._connection().execute(
+            "SELECT updated_at, data FROM conversation_state WHERE session_id = ?",
+            (session_id,)
+        ).fetchone()
+
+        if row is not None and (self.idle_ttl is None or time_module.time() - row[0] <= self.idle_ttl):
+            with self._lock:
+                self.hits += 1
+            return deserialize_conversation(row[1])
+
+        with self._lock:
+            self.misses += 1
+
+        if self.loader is None:
+            return None
+        conversation = self.loader(session_id)
+        if conversation is None:
+            return None
+
+        with self._lock:
+            self.restored += 1
+        self.put(session_id, conversation)
+        return conversation
+
+    def put(self, session_id, conversation):
+        data = serialize_conversation(conversation)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO conversation_state (session_id, updated_at, data) VALUES (?, ?, ?)",
+            (session_id, time_module.time(), data)
+        )
+
+        with self._lock:
+            self._writes += 1
+            self.bytes_written += len(data)
+            sweep = self._writes % self.SWEEP_EVERY == 0
+        if sweep:
+            self.sweep()
+
+    def save(self, conversation):
+        self.put(conversation.session_id, conversation)
+
+    def discard(self, session_id):
+        self._connection().execute(
+            "DELETE FROM conversation_state WHERE session_id = ?", (session_id,)
+        )
+
+    def sweep(self):
+        """Remove expired conversations and the oldest ones beyond max_sessions"""
+        connection = self._connection()
+        removed = 0
+        if self.idle_ttl is not None:
+            removed += connection.execute(
+                "DELETE FROM conversation_state WHERE updated_at < ?",
+                (time_module.time() - self.idle_ttl,)
+            ).rowcount
+        removed += connection.execute(
+            "DELETE FROM conversation_state WHERE session_id IN ("
+            " SELECT session_id FROM conversation_state"
+            " ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,)
+        ).rowcount
+
+        with self._lock:
+            self.expired += removed
+
+    def stats(self):
+        sessions = self._connection().execute("SELECT COUNT(*) FROM conversation_state").fetchone()[0]
+        with self._lock:
+            return {
+                'backend': 'sqlite',
+                'sessions': sessions,
+                'max_sessions': self.max_sessions,
+                'hits': self.hits,
+                'misses': self.misses,
+                'restored': self.restored,
+                'expired': self.expired,
+                'avg_bytes_per_write': self.bytes_written // self._writes if self._writes else 0
+            }
+
+def create_conversation_store(backend='memory', path=None, max_sessions=10000, idle_ttl=1800,
+                              memory_budget=64 * 1024 * 1024):
+    """
+    Create a conversation store from configuration
+
+    Args:
+        backend (str): 'memory' for a single worker, 'sqlite' to share state
+                       between worker processes
+        path (str): SQLite file of the 'sqlite' backend
+
+    Returns:
+        ConversationStore: The store
+    """
+    if backend == 'memory':
+        return MemoryConversationStore(max_sessions=max_sessions, idle_ttl=idle_ttl, memory_budget=memory_budget)
+    if backend == 'sqlite':
+        return SQLiteConversationStore(path, max_sessions=max_sessions, idle_ttl=idle_ttl)
+    raise ValueError(f"Unknown conversation store backend: {backend}")
@@ -0,0 +1,90 @@
+# agent/idempotency.py
+import collections
+import copy
+import threading
+import time as time_module
+
+class IdempotencyCache:
+    """
+    Bounded cache of recent chat responses, keyed by idempotency key
+
+    A client that retries a message sends the same key again. The agent looks
+    the key up while it holds the lock of the session, so a retry that
+    arrives while the first attempt is still running waits for it and then
+    gets the stored response instead of running the turn a second time.
+
+    Entries expire after ttl seconds, and the least recently stored entry is
+    dropped once max_entries is reached.
+    """
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        self.lookups = 0
+        self.deduplicated = 0
+        self.mismatched = 0
+        self.stored = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, key, message):
+        """
+        Get the stored response of a request
+
+        Args:
+            key (tuple): Session ID and idempotency key
+            message (str): User message; a key reused for another message is not a retry
+
+        Returns:
+            dict: The stored response, or None if the request has not been seen
+        """
+        with self._lock:
+            self.lookups += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            stored_at, stored_message, response = entry
+            if time_module.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expired += 1
+                return None
+            if stored_message != message:
+                self.mismatched += 1
+                return None
+
+            self.deduplicated += 1
+            return copy.deepcopy(response)
+
+    def put(self, key, message, response):
+        """
+        Store the response of a request
+
+        The response is copied: it can share lists with the conversation
+        (such as the items of the cart), which later turns keep changing.
+        """
+        response = copy.deepcopy(response)
+        with self._lock:
+            self._entries[key] = (time_module.monotonic(), message, response)
+            self._entries.move_to_end(key)
+            self.stored += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evicted += 1
+
+    def stats(self):
+        """Get dedupe counters"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'lookups': self.lookups,
+                'deduplicated': self.deduplicated,
+                'mismatched': self.mismatched,
+                'stored': self.stored,
+                'expired': self.expired,
+                'evicted': self.evicted
+            }
@@ -1,6 +1,9 @@
 # agent/intent_classifier.py
 import re
 import datetime
+from .pattern_matcher import PatternGroup
+from .menu_automaton import MenuAutomaton
+from .spell_corrector import SpellCorrector
 
 class IntentClassifier:
     """
@@ -58,7 +61,7 @@ class IntentClassifier:
         }
         
         self.entities = {
-            'food_item': [],  # Will be populated from menu data
+            'food_item': [],  # Matched with self.food_automaton, built from menu data
             'date': [
                 r'today', r'tomorrow', r'day after tomorrow',
                 r'next (monday|tuesday|wednesday|thursday|friday|saturday|sunday)',
@@ -88,23 +91,49 @@ class IntentClassifier:
                 r'(my name is|i am|this is) ([a-zA-Z]+ ?[a-zA-Z]*)'
             ]
         }
+        
+        # Compiled matchers, one per intent and one per entity type
+        self.intent_matchers = {}
+        self.entity_matchers = {}
+        self.compile_patterns()
+        
+        # Menu keyword automaton for food_item extraction
+        self.food_automaton = MenuAutomaton()
+        
+        # Spelling correction over the keywords, extended with menu words later
+        self.spell_corrector = SpellCorrector.from_texts([], self._keyword_vocabulary())
+    
+    def compile_patterns(self):
+        """Compile the intent and entity patterns into one matcher per group"""
+        self.intent_matchers = {
+            intent: PatternGroup(patterns)
+            for intent, patterns in self.intents.items()
+        }
+        self.entity_matchers = {
+            entity_type: PatternGroup(patterns, re.IGNORECASE)
+            for entity_type, patterns in self.entities.items()
+        }
+    
+    def _keyword_vocabulary(self):
+        """Get the literal words used in the intent and entity patterns"""
+        words = set()
+        for patterns in list(self.intents.values()) + list(self.entities.values()):
+            for pattern in patterns:
+                # Drop escapes such as \b and \d before taking the words
+                words.update(re.findall(r'[a-z]+', re.sub(r'\\.', ' ', pattern)))
+        return sorted(words)
     
     def set_menu_items(self, menu_items):
-        """Set the menu items for better intent classification"""
-        self.entities['food_item'] = []
-        for item in menu_items:
-            # Create regex patterns from menu item names
-            item_name = item['name'].lower()
-            parts = item_name.split()
-            
-            # Add full name pattern
-            self.entities['food_item'].append(r'\b' + re.escape(item_name) + r'\b')
-            
-            # For items with multiple words, also match key words
-            if len(parts) > 1:
-                for part in parts:
-                    if len(part) > 3 and part not in ['with', 'and', 'the']:
-                        self.entities['food_item'].append(r'\b' + re.escape(part) + r'\b')
+        """
+        Set the menu items for better intent classification
+        
+        Args:
+            menu_items (MenuSnapshot): Menu to recognise food items from
+        """
+        self.food_automaton = MenuAutomaton.from_menu_items(menu_items)
+        self.spell_corrector = SpellCorrector.from_texts(
+            [item.name for item in menu_items], self._keyword_vocabulary()
+        )
     
     def classify_intent(self, message):
         """
@@ -114,18 +143,21 @@ class IntentClassifier:
             message (str): User's message
             
         Returns:
-            dict: Dictionary with intent, confidence, and extracted entities
+            dict: Dictionary with intent, confidence, extracted entities, the
+                  spell-corrected message and the spans of the menu keywords
+                  found in it
         """
         message = message.lower()
         
-        # Score each intent
+        # Fix typos in keywords and menu words ("resrvation", "margarita piza").
+        # Names, emails and phone numbers are still taken from the original.
+        corrected_message = self.spell_corrector.correct_text(message)
+        
+        # Score each intent on both texts, so a correction can add matches
+        # but never take away one the message already had
         intent_scores = {}
-        for intent, patterns in self.intents.items():
-            score = 0
-            for pattern in patterns:
-                matches = re.findall(pattern, message)
-                score += len(matches)
-            intent_scores[intent] = score
+        for intent, matcher in self.intent_matchers.items():
+            intent_scores[intent] = max(matcher.count(message), matcher.count(corrected_message))
         
         # Find highest scoring intent
         max_score = 0
@@ -138,23 +170,30 @@ class IntentClassifier:
         # Set confidence based on score
         confidence = min(max_score * 0.2, 0.95) if max_score > 0 else 0.1
         
-        # Extract entities
-        entities = self._extract_entities(message)
+        # Find menu items, then extract entities
+        food_spans = self.food_automaton.find_spans(corrected_message)
+        entities = self._extract_entities(message, food_spans)
         
         return {
             'intent': classified_intent,
             'confidence': confidence,
-            'entities': entities
+            'entities': entities,
+            'corrected_message': corrected_message,
+            'food_item_spans': food_spans
         }
         
-    def _extract_entities(self, message):
+    def _extract_entities(self, message, food_spans=None):
         """Extract entities from the message"""
         entities = {}
         
-        for entity_type, patterns in self.entities.items():
+        for entity_type, matcher in self.entity_matchers.items():
             extracted = []
-            for pattern in patterns:
-                matches = re.findall(pattern, message, re.IGNORECASE)
+            if entity_type == 'food_item':
+                if food_spans is None:
+                    food_spans = self.food_automaton.find_spans(message)
+                extracted = [span['text'] for span in food_spans]
+            
+            for matches in matcher.findall(message):
                 if matches:
                     if entity_type == 'name':
                         # For name patterns, extract only the name part
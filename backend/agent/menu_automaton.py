@@ -0,0 +1,140 @@
+# agent/menu_automaton.py
+
+# Words too generic to identify a menu item on their own
+STOP_WORDS = ['with', 'and', 'the']
+
+def _is_word_char(ch):
+    """Match the definition of \\w used by the re module"""
+    return ch.isalnum() or ch == '_'
+
+class MenuAutomaton:
+    """
+    Aho-Corasick automaton over menu item names and keywords
+
+    Finds every menu keyword in a message in a single pass, regardless of menu
+    size. Matches honour word boundaries the same way a \\bkeyword\\b regex does.
+    """
+
+    def __init__(self):
+        # Trie transitions, failure links and keywords ending at each state
+        self.transitions = [{}]
+        self.fail = [0]
+        self.outputs = [()]
+
+        self.keywords = []
+        self.keyword_index = {}
+        self.keyword_items = []
+
+    @classmethod
+    def from_menu_items(cls, menu_items):
+        """
+        Build an automaton from menu items
+
+        Every full item name is a keyword, and so is every significant word
+        (longer than 3 characters) of a multi-word name.
+
+        Args:
+            menu_items (MenuSnapshot): Menu entries with id and name
+
+        Returns:
+            MenuAutomaton: The built automaton
+        """
+        automaton = cls()
+        for item in menu_items:
+            item_name = item.name.lower()
+            parts = item_name.split()
+
+            automaton.add(item_name, item.id)
+
+            if len(parts) > 1:
+                for part in parts:
+                    if len(part) > 3 and part not in STOP_WORDS:
+                        automaton.add(part, item.id)
+
+        automaton.build()
+        return automaton
+
+    def add(self, keyword, item_id=None):
+        """
+        Add a keyword to the trie
+
+        Args:
+            keyword (str): Lowercase keyword to match
+            item_id (int): Menu item the keyword refers to
+        """
+        if keyword not in self.keyword_index:
+            state = 0
+            for ch in keyword:
+                next_state = self.transitions[state].get(ch)
+                if next_state is None:
+                    next_state = len(self.transitions)
+                    self.transitions.append({})
+                    self.fail.append(0)
+                    self.outputs.append(())
+                    self.transitions[state][ch] = next_state
+                state = next_state
+
+            self.keyword_index[keyword] = len(self.keywords)
+            self.keywords.append(keyword)
+            self.keyword_items.append([])
+            self.outputs[state] = (self.keyword_index[keyword],)
+
+        items = self.keyword_items[self.keyword_index[keyword]]
+        if item_id is not None and item_id not in items:
+            items.append(item_id)
+
+    def build(self):
+        """Compute failure links breadth-first, once all keywords are added"""
+        queue = list(self.transitions[0].values())
+        for state in queue:
+            for ch, next_state in self.transitions[state].items():
+                queue.append(next_state)
+
+                fallback = self.fail[state]
+                while fallback and ch not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.transitions[fallback].get(ch, 0)
+                self.fail[next_state] = target if target != next_state else 0
+
+                self.outputs[next_state] = self.outputs[next_state] + self.outputs[self.fail[next_state]]
+
+    def find_spans(self, text):
+        """
+        Find every keyword occurrence in the text
+
+        Args:
+            text (str): Lowercase text to scan
+
+        Returns:
+            list: Span dicts with start, end, text and item_ids, ordered by end position
+        """
+        spans = []
+        transitions = self.transitions
+        fail = self.fail
+        outputs = self.outputs
+        state = 0
+
+        for i, ch in enumerate(text):
+            while state and ch not in transitions[state]:
+                state = fail[state]
+            state = transitions[state].get(ch, 0)
+
+            for keyword_id in outputs[state]:
+                keyword = self.keywords[keyword_id]
+                start = i - len(keyword) + 1
+                end = i + 1
+
+                # Same rule as \b: word-ness must change on both sides of the span
+                before = start > 0 and _is_word_char(text[start - 1])
+                after = end < len(text) and _is_word_char(text[end])
+                if before == _is_word_char(keyword[0]) or after == _is_word_char(keyword[-1]):
+                    continue
+
+                spans.append({
+                    'start': start,
+                    'end': end,
+                    'text': keyword,
+                    'item_ids': list(self.keyword_items[keyword_id])
+                })
+
+        return spans
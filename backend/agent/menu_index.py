@@ -0,0 +1,306 @@
+# agent/menu_index.py
+import heapq
+import re
+
+from .menu_automaton import STOP_WORDS
+
+# Quantity words recognised next to a menu item
+NUMBER_WORDS = {
+    'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5,
+    'six': 6, 'seven': 7, 'eight': 8, 'nine': 9, 'ten': 10,
+    'eleven': 11, 'twelve': 12, 'dozen': 12, 'couple': 2
+}
+
+# Words allowed between a quantity and the item ("2 x pizza", "two of the pizzas")
+QUANTITY_FILLERS = {'x', 'of', 'the'}
+
+# Minimum score for a menu item to be returned
+MIN_SCORE = 0.2
+
+# Weight of a token that matched after spelling correction
+CORRECTED_WEIGHT = 0.9
+
+# Minimum trigram similarity for a misspelt or partial token to count
+MIN_SIMILARITY = 0.5
+
+# An item needs at least one match this strong: an exact, plural, corrected
+# or partial word. Trigram matches alone ("roast" -> "toast") are too weak.
+MIN_ANCHOR_WEIGHT = 0.7
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+def tokenize(text):
+    """Split lowercase text into alphanumeric tokens"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+def trigrams(token):
+    """Get the set of padded character trigrams of a token"""
+    padded = f' {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class MenuIndex:
+    """
+    Inverted token index and trigram index over menu item names
+
+    Built once per menu. A lookup tokenizes the message once, gathers candidate
+    items from the indexes, ranks them with a single scoring function and binds
+    quantities to the message tokens each item claimed.
+    """
+
+    # Upper bound on cached token lookups
+    MAX_CACHED_TOKENS = 10000
+
+    def __init__(self, menu_items, spell_corrector=None):
+        self.items = list(menu_items)
+        self.spell_corrector = spell_corrector
+
+        # Significant tokens of every item, by position in the menu
+        self.item_tokens = [
+            tuple(dict.fromkeys(token for token in tokenize(item.name) if self._is_significant(token)))
+            for item in self.items
+        ]
+
+        # Inverted index: token -> positions of the items whose name contains it
+        self.postings = {}
+        for position, tokens in enumerate(self.item_tokens):
+            for token in tokens:
+                self.postings.setdefault(token, []).append(position)
+
+        # Trigram index: trigram -> vocabulary tokens containing it
+        self.trigram_index = {}
+        self.vocabulary_trigrams = {}
+        for token in self.postings:
+            self.vocabulary_trigrams[token] = trigrams(token)
+            for trigram in self.vocabulary_trigrams[token]:
+                self.trigram_index.setdefault(trigram, []).append(token)
+
+        self._token_cache = {}
+
+    @staticmethod
+    def _is_significant(token):
+        """Tokens that can identify a menu item on their own"""
+        return len(token) >= 3 and token not in STOP_WORDS and not token.isdigit()
+
+    def _token_matches(self, token):
+        """
+        Find the vocabulary tokens a message token may refer to
+
+        Args:
+            token (str): Message token
+
+        Returns:
+            list: (vocabulary token, weight) pairs, exact matches weigh 1.0
+        """
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            return cached
+
+        if token in self.postings:
+            matches = [(token, 1.0)]
+        elif not self._is_significant(token):
+            matches = []
+        elif token.endswith('s') and token[:-1] in self.postings:
+            # Simple plural, e.g. "pizzas"
+            matches = [(token[:-1], 1.0)]
+        elif self._corrected(token) in self.postings:
+            # Typo, e.g. "piza" or "lasagne"
+            matches = [(self._corrected(token), CORRECTED_WEIGHT)]
+        elif len(token) < 4 or self._is_known_word(token):
+            # Ordinary words ("price", "green") are not misspelt menu words
+            matches = []
+        else:
+            matches = self._approximate_matches(token)
+
+        if len(self._token_cache) >= self.MAX_CACHED_TOKENS:
+            self._token_cache.clear()
+        self._token_cache[token] = matches
+        return matches
+
+    def _corrected(self, token):
+        """Spell-correct a token, if a corrector is available"""
+        if self.spell_corrector is None:
+            return token
+        return self.spell_corrector.correct(token)
+
+    def _is_known_word(self, token):
+        """Check whether a token is a correctly spelt chat or intent word"""
+        return self.spell_corrector is not None and token in self.spell_corrector.words
+
+    def _approximate_matches(self, token):
+        """Match a token against the vocabulary through shared trigrams"""
+        token_trigrams = trigrams(token)
+        shared = {}
+        for trigram in token_trigrams:
+            for candidate in self.trigram_index.get(trigram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        matches = []
+        for candidate, count in shared.items():
+            similarity = 2.0 * count / (len(token_trigrams) + len(self.vocabulary_trigrams[candidate]))
+            if token in candidate:
+                # Partial word, e.g. "ravio"
+                similarity = max(similarity, 0.7)
+            if similarity >= MIN_SIMILARITY:
+                matches.append((candidate, similarity))
+        return matches
+
+    def _score(self, position, weight):
+        """
+        Score a candidate item
+
+        The score is the weighted share of the item's significant tokens found
+        in the message. Ties go to the longer name, then to the earlier item.
+
+        Args:
+            position (int): Item position in the menu
+            weight (float): Sum of the match weights of the item's tokens
+
+        Returns:
+            tuple: Sort key, highest first
+        """
+        token_count = len(self.item_tokens[position])
+        return (weight / token_count, token_count, -position)
+
+    def _claim(self, position, hits, claimed):
+        """
+        Pick the message tokens an item would claim, skipping claimed ones
+
+        Args:
+            position (int): Item position in the menu
+            hits (dict): Vocabulary token -> list of (message token position, weight)
+            claimed (set): Message token positions already taken by other items
+
+        Returns:
+            tuple: (total weight, list of claimed message token positions,
+                    weight of the strongest claimed match)
+        """
+        weight = 0.0
+        strongest = 0.0
+        positions = []
+        for token in self.item_tokens[position]:
+            best = None
+            for message_position, match_weight in hits.get(token, ()):
+                if message_position in claimed or message_position in positions:
+                    continue
+                if best is None or match_weight > best[1]:
+                    best = (message_position, match_weight)
+            if best:
+                weight += best[1]
+                strongest = max(strongest, best[1])
+                positions.append(best[0])
+        return weight, positions, strongest
+
+    def search(self, message):
+        """
+        Find the menu items mentioned in a message
+
+        Args:
+            message (str): User message
+
+        Returns:
+            list: (item, quantity, score) tuples in the order they appear in the message
+        """
+        tokens = tokenize(message)
+
+        # Vocabulary token -> where and how well it occurs in the message
+        hits = {}
+        for message_position, token in enumerate(tokens):
+            for vocabulary_token, weight in self._token_matches(token):
+                hits.setdefault(vocabulary_token, []).append((message_position, weight))
+
+        # Candidate items, their match weight and their strongest match
+        weights = {}
+        anchors = {}
+        for vocabulary_token, occurrences in hits.items():
+            best = max(weight for _, weight in occurrences)
+            for position in self.postings[vocabulary_token]:
+                weights[position] = weights.get(position, 0.0) + best
+                anchors[position] = max(anchors.get(position, 0.0), best)
+
+        heap = []
+        for position, weight in weights.items():
+            key = self._score(position, weight)
+            if key[0] > MIN_SCORE and anchors[position] >= MIN_ANCHOR_WEIGHT:
+                heap.append((tuple(-k for k in key), position))
+        heapq.heapify(heap)
+
+        # Greedily accept the best-ranked items. Each message token belongs to at
+        # most one item, so "salad" alone picks one salad, not all of them.
+        claimed = set()
+        accepted = []
+        unclaimed = {message_position for occurrences in hits.values() for message_position, _ in occurrences}
+        while heap and unclaimed:
+            negated_key, position = heapq.heappop(heap)
+            weight, positions, strongest = self._claim(position, hits, claimed)
+            key = self._score(position, weight)
+            if key != tuple(-k for k in negated_key):
+                # Some tokens were claimed by a better item: re-rank
+                if key[0] > MIN_SCORE and strongest >= MIN_ANCHOR_WEIGHT:
+                    heapq.heappush(heap, (tuple(-k for k in key), position))
+                continue
+
+            claimed.update(positions)
+            unclaimed.difference_update(positions)
+            accepted.append((min(positions), max(positions), position, key[0]))
+
+        accepted.sort()
+        quantities = self._bind_quantities(tokens, accepted, claimed)
+
+        return [
+            (self.items[position], quantities[position], score)
+            for _, _, position, score in accepted
+        ]
+
+    def _bind_quantities(self, tokens, accepted, claimed):
+        """
+        Bind quantity tokens to the item spans they precede or follow
+
+        "2 margherita pizza" and "margherita pizza x2" both give a quantity of 2.
+        A number between two items goes to the following item, unless the last
+        item is itself followed by a number ("pizza 2 salad 3").
+
+        Returns:
+            dict: Item position -> quantity
+        """
+        quantities = {}
+        used = set(claimed)
+
+        def quantity_at(index):
+            if index < 0 or index >= len(tokens) or index in used:
+                return None
+            token = tokens[index]
+            if token.isdigit():
+                return int(token)
+            if token.startswith('x') and token[1:].isdigit():
+                return int(token[1:])
+            return NUMBER_WORDS.get(token)
+
+        def leading_index(first):
+            index = first - 1
+            while index >= 0 and tokens[index] in QUANTITY_FILLERS and index not in used:
+                index -= 1
+            return index
+
+        def trailing_index(last):
+            index = last + 1
+            if index < len(tokens) and tokens[index] == 'x' and index not in used:
+                index += 1
+            return index
+
+        def bind(from_end):
+            for first, last, position, _ in accepted:
+                if position in quantities:
+                    continue
+                index = trailing_index(last) if from_end else leading_index(first)
+                quantity = quantity_at(index)
+                if quantity:
+                    quantities[position] = quantity
+                    used.add(index)
+
+        trailing_style = bool(accepted) and quantity_at(trailing_index(accepted[-1][1])) is not None
+        bind(from_end=trailing_style)
+        bind(from_end=not trailing_style)
+
+        for _, _, position, _ in accepted:
+            quantities.setdefault(position, 1)
+        return quantities
@@ -0,0 +1,113 @@
+# agent/menu_snapshot.py
+import hashlib
+from types import MappingProxyType
+
+class MenuEntry:
+    """
+    Immutable menu item, detached from any database session
+    """
+    __slots__ = ('id', 'name', 'price')
+
+    def __init__(self, id, name, price):
+        object.__setattr__(self, 'id', id)
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, 'price', price)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MenuEntry is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("MenuEntry is immutable")
+
+    def __repr__(self):
+        return f"MenuEntry(id={self.id!r}, name={self.name!r}, price={self.price!r})"
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'price': self.price
+        }
+
+class MenuSnapshot:
+    """
+    Frozen in-memory copy of the menu with prebuilt lookup maps
+
+    Loaded once with a single query and shared by the intent classifier, the
+    order handler and the menu endpoint, so serving a chat turn never touches
+    the menu_items table. Unlike ORM instances, entries are never expired by a
+    commit and cannot trigger lazy reloads.
+
+    The version is a checksum of the menu contents: two snapshots of the same
+    table have the same version, and any change to an item changes it.
+    """
+    __slots__ = ('items', 'by_id', 'by_name', 'version')
+
+    def __init__(self, entries):
+        object.__setattr__(self, 'items', tuple(entries))
+        object.__setattr__(self, 'by_id', MappingProxyType({item.id: item for item in self.items}))
+        object.__setattr__(self, 'by_name', MappingProxyType({item.name.lower(): item for item in self.items}))
+
+        checksum = hashlib.sha1()
+        for item in self.items:
+            checksum.update(repr((item.id, item.name, item.price)).encode('utf-8'))
+        object.__setattr__(self, 'version', checksum.hexdigest()[:16])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MenuSnapshot is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("MenuSnapshot is immutable")
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @classmethod
+    def from_session(cls, session):
+        """
+        Load the menu from the database
+
+        Args:
+            session: SQLAlchemy session
+
+        Returns:
+            MenuSnapshot: Snapshot of the menu_items table
+        """
+        from models import MenuItem
+        rows = session.query(MenuItem.id, MenuItem.name, MenuItem.price).order_by(MenuItem.id).all()
+        return cls(MenuEntry(row.id, row.name, row.price) for row in rows)
+
+    @classmethod
+    def from_dicts(cls, menu_items):
+        """
+        Build a snapshot from menu item dicts, e.g. the contents of menu.json
+
+        Args:
+            menu_items (list): Dicts with id, name and price
+
+        Returns:
+            MenuSnapshot: The snapshot
+        """
+        return cls(MenuEntry(item['id'], item['name'], item['price']) for item in menu_items)
+
+    def to_dicts(self):
+        """Get the menu as a list of item dicts"""
+        return [item.to_dict() for item in self.items]
+
+class MenuState:
+    """
+    Everything built from one menu snapshot
+
+    The agent swaps the whole bundle with a single reference assignment when
+    the menu is reloaded, so a chat turn always sees a classifier and order
+    indexes built from the same snapshot.
+    """
+    __slots__ = ('menu', 'intent_classifier', 'order_handler')
+
+    def __init__(self, menu, intent_classifier, order_handler):
+        self.menu = menu
+        self.intent_classifier = intent_classifier
+        self.order_handler = order_handler
@@ -1,27 +1,29 @@
 # agent/order_handler.py
-from models import Order, OrderItem
-import re
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from models import MenuItem, Order, OrderItem
+from .menu_index import MenuIndex
+from .popularity import PopularityRanking
+from .unit_of_work import UnitOfWork
 
 class OrderHandler:
     """
     Handles food ordering functionality
     """
     
-    def __init__(self, session, menu_items):
+    def __init__(self, session, menu, spell_corrector=None, popularity=None):
         self.session = session
-        self.menu_items = menu_items
-        self.menu_by_id = {item.id: item for item in menu_items}
-        self.menu_by_name = {item.name.lower(): item for item in menu_items}
-        
-        # Build keyword index for fuzzy matching
-        self.keyword_to_menu = {}
-        for item in menu_items:
-            words = item.name.lower().split()
-            for word in words:
-                if len(word) > 3 and word not in ['with', 'and', 'the']:
-                    if word not in self.keyword_to_menu:
-                        self.keyword_to_menu[word] = []
-                    self.keyword_to_menu[word].append(item)
+        self.menu = menu
+        self.menu_items = menu.items
+        self.menu_by_id = menu.by_id
+        self.menu_by_name = menu.by_name
+        
+        # Build token and trigram indexes for ranked matching
+        self.menu_index = MenuIndex(menu.items, spell_corrector)
+        
+        # Sales ranking used for suggestions; it outlives menu reloads
+        self.popularity = popularity if popularity is not None else PopularityRanking()
+        self.popularity.track(item.id for item in menu.items)
     
     def identify_menu_items(self, message):
         """
@@ -33,104 +35,20 @@ class OrderHandler:
         Returns:
             list: List of potential menu items
         """
-        message = message.lower()
-        potential_items = {}
-        
-        # Try exact matching first
-        for name, item in self.menu_by_name.items():
-            if name in message:
-                potential_items[item.id] = {
-                    'item': item,
-                    'confidence': 1.0,
-                    'quantity': 1  # Default quantity
-                }
-        
-        # If no exact matches, try keyword matching with a more lenient approach
-        if not potential_items:
-            # Check if the message contains only the item name without price
-            for name, item in self.menu_by_name.items():
-                # Remove special characters and convert to lowercase for comparison
-                clean_name = ''.join(c for c in name if c.isalnum() or c.isspace()).lower()
-                clean_message = ''.join(c for c in message if c.isalnum() or c.isspace()).lower()
-                
-                if clean_name in clean_message or clean_message in clean_name:
-                    potential_items[item.id] = {
-                        'item': item,
-                        'confidence': 0.9,
-                        'quantity': 1
-                    }
-                    break  # Found a match, no need to continue
-        
-        # If still no matches, try more aggressive fuzzy matching
-        if not potential_items:
-            words = set(re.findall(r'\b\w+\b', message))
-            for word in words:
-                if len(word) >= 4:  # Only consider words of reasonable length
-                    for name, item in self.menu_by_name.items():
-                        if word in name.lower():
-                            potential_items[item.id] = {
-                                'item': item,
-                                'confidence': 0.7,
-                                'quantity': 1
-                            }
-                            break
-        
-        # If still no matches, try the original keyword matching
-        if not potential_items:
-            words = set(re.findall(r'\b\w+\b', message))
-            for word in words:
-                if word in self.keyword_to_menu:
-                    for item in self.keyword_to_menu[word]:
-                        # Skip items already matched
-                        if item.id in potential_items:
-                            continue
-                            
-                        # Calculate a confidence score based on word match
-                        item_words = set(re.findall(r'\b\w+\b', item.name.lower()))
-                        matching_words = words.intersection(item_words)
-                        confidence = len(matching_words) / len(item_words)
-                        
-                        if confidence > 0.2:  # Lower threshold for accepting a match
-                            potential_items[item.id] = {
-                                'item': item,
-                                'confidence': confidence,
-                                'quantity': 1  # Default quantity
-                            }
-        
-        # Extract quantities
-        quantity_patterns = [
-            r'(\d+)\s+([a-zA-Z\s]+)',  # "2 margherita pizza"
-            r'([a-zA-Z\s]+)\s+(\d+)',  # "margherita pizza 2"
-        ]
-        
-        for pattern in quantity_patterns:
-            matches = re.findall(pattern, message)
-            for match in matches:
-                # Determine which group is the quantity and which is the item
-                if match[0].isdigit():
-                    quantity, item_text = int(match[0]), match[1]
-                else:
-                    item_text, quantity = match[0], int(match[1])
-                
-                # Try to find matching item
-                for item_id, item_data in potential_items.items():
-                    item_name = item_data['item'].name.lower()
-                    if item_text.lower() in item_name or item_name in item_text.lower():
-                        potential_items[item_id]['quantity'] = quantity
-                        break
+        matches = self.menu_index.search(message)
         
         # Debug print - log what was recognized
-        print(f"Identified items from message '{message}': {[item_data['item'].name for _, item_data in potential_items.items()]}")
+        print(f"Identified items from message '{message.lower()}': {[item.name for item, _, _ in matches]}")
         
         return [
             {
-                'id': item_id,
-                'name': item_data['item'].name,
-                'price': item_data['item'].price,
-                'quantity': item_data['quantity'],
-                'confidence': item_data['confidence']
+                'id': item.id,
+                'name': item.name,
+                'price': item.price,
+                'quantity': quantity,
+                'confidence': confidence
             }
-            for item_id, item_data in potential_items.items()
+            for item, quantity, confidence in matches
         ]
     
     def calculate_total(self, items):
@@ -148,17 +66,23 @@ class OrderHandler:
             total += item['price'] * item['quantity']
         return round(total, 2)
     
-    def create_order(self, customer_info, items):
+    def create_order(self, customer_info, items, unit_of_work=None):
         """
         Create a new order in the database
         
         Args:
             customer_info (dict): Customer information (name, email, phone)
             items (list): List of order items with quantity
+            unit_of_work (UnitOfWork): Transaction of the chat turn, which the
+                caller commits; without one the order is committed right away
             
         Returns:
             Order: The created order object
         """
+        standalone = unit_of_work is None
+        if standalone:
+            unit_of_work = UnitOfWork(self.session)
+        
         # Calculate total amount
         total_amount = self.calculate_total(items)
         
@@ -170,28 +94,73 @@ class OrderHandler:
             total_amount=total_amount,
             status='confirmed'
         )
-        self.session.add(order)
+        unit_of_work.add(order)
         self.session.flush()  # Get the order ID
         
-        # Create order items
-        for item in items:
-            order_item = OrderItem(
-                order_id=order.id,
-                menu_item_id=item['id'],
-                quantity=item['quantity'],
-                price=item['price']
-            )
-            self.session.add(order_item)
-        
-        # Commit transaction
-        self.session.commit()
+        # Insert all order items with a single executemany instead of one ORM
+        # insert per line
+        rows = [
+            {
+                'order_id': order.id,
+                'menu_item_id': item['id'],
+                'quantity': item['quantity'],
+                'price': item['price']
+            }
+            for item in items
+        ]
+        if rows:
+            self.session.execute(OrderItem.__table__.insert(), rows)
+            unit_of_work.mark_written(len(rows))
+        
+        # Count the sales once the order is committed
+        unit_of_work.after_commit(lambda: self.popularity.record(items))
+        
+        # Load the items back in one query; their menu items come from the
+        # snapshot, so order.to_dict() queries neither table
+        menu_items = self._attach_menu_items(items)
+        order_items = self.session.query(OrderItem).filter(
+            OrderItem.order_id == order.id
+        ).order_by(OrderItem.id).all()
+        for order_item in order_items:
+            if order_item.menu_item_id in menu_items:
+                set_committed_value(order_item, 'menu_item', menu_items[order_item.menu_item_id])
+        set_committed_value(order, 'items', order_items)
+        
+        if standalone:
+            unit_of_work.commit()
         
         return order
     
+    def _attach_menu_items(self, items):
+        """
+        Put the ordered menu items in the session as if they were loaded
+        
+        They are built from the menu snapshot instead of being queried.
+        Items missing from the snapshot are left to the lazy load.
+        
+        Args:
+            items (list): List of order items with quantity
+            
+        Returns:
+            dict: Menu item ID -> MenuItem in the session
+        """
+        menu_items = {}
+        for item_id in {item['id'] for item in items}:
+            entry = self.menu_by_id.get(item_id)
+            if entry is None:
+                continue
+            menu_item = MenuItem(id=entry.id, name=entry.name, price=entry.price)
+            make_transient_to_detached(menu_item)
+            menu_items[item_id] = self.session.merge(menu_item, load=False)
+        return menu_items
+    
     def get_menu_suggestions(self, keywords=None, max_items=5):
         """
         Get menu suggestions based on keywords or popular items
         
+        Best sellers come first; the ranking is kept in memory, so no query
+        is run.
+        
         Args:
             keywords (list): List of keywords to match
             max_items (int): Maximum number of items to return
@@ -200,32 +169,28 @@ class OrderHandler:
             list: List of suggested menu items
         """
         if not keywords:
-            # Return some random items if no keywords provided
-            import random
-            suggested_items = random.sample(list(self.menu_by_id.values()), min(max_items, len(self.menu_by_id)))
-            return [item.to_dict() for item in suggested_items]
+            # Return the best selling items if no keywords provided
+            return [
+                self.menu_by_id[item_id].to_dict()
+                for item_id in self.popularity.top(max_items, allowed=self.menu_by_id)
+            ]
         
-        # Try to match keywords with menu items
+        # Match keywords with menu items, best sellers first
         matched_items = {}
         for keyword in keywords:
             keyword = keyword.lower()
             for item in self.menu_items:
-                if keyword in item.name.lower() and item.id not in matched_items:
+                if keyword in item.name.lower():
                     matched_items[item.id] = item
-                    
-                    if len(matched_items) >= max_items:
+        
+        suggested_items = sorted(matched_items.values(), key=lambda item: self.popularity.rank(item.id))[:max_items]
+        
+        # If we don't have enough matches, add the best selling other items
+        if len(suggested_items) < max_items:
+            for item_id in self.popularity.top(max_items + len(suggested_items), allowed=self.menu_by_id):
+                if item_id not in matched_items:
+                    suggested_items.append(self.menu_by_id[item_id])
+                    if len(suggested_items) >= max_items:
                         break
-            
-            if len(matched_items) >= max_items:
-                break
-        
-        # If we don't have enough matches, add some random items
-        if len(matched_items) < max_items:
-            remaining_items = [item for item in self.menu_items if item.id not in matched_items]
-            import random
-            additional_items = random.sample(remaining_items, min(max_items - len(matched_items), len(remaining_items)))
-            
-            for item in additional_items:
-                matched_items[item.id] = item
         
-        return [item.to_dict() for item in matched_items.values()]
\ No newline at end of file
+        return [item.to_dict() for item in suggested_items]
\ No newline at end of file
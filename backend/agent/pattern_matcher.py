@@ -0,0 +1,51 @@
+# agent/pattern_matcher.py
+import re
+
+class PatternGroup:
+    """
+    Precompiled matcher for a group of regex patterns
+
+    The patterns are joined into a single non-capturing alternation that is
+    scanned first: most groups do not match a given message at all, and one
+    search is enough to rule them out. When the alternation does match, each
+    precompiled pattern is scanned from the first matching position, so results
+    are identical to calling re.findall() once per pattern.
+    """
+
+    def __init__(self, patterns, flags=0):
+        self.patterns = list(patterns)
+        self.flags = flags
+        self.compiled = [re.compile(pattern, flags) for pattern in self.patterns]
+        self.regex = None
+        if self.patterns:
+            self.regex = re.compile('|'.join(f'(?:{pattern})' for pattern in self.patterns), flags)
+
+    def findall(self, message):
+        """
+        Find all matches of every pattern in a message
+
+        Args:
+            message (str): Text to scan
+
+        Returns:
+            list: One list per pattern, shaped like re.findall() output
+        """
+        first = self.regex.search(message) if self.regex else None
+        if first is None:
+            return [[] for _ in self.compiled]
+
+        # No pattern can match before the first match of the alternation
+        pos = first.start()
+        return [regex.findall(message, pos) for regex in self.compiled]
+
+    def count(self, message):
+        """
+        Count the matches of all patterns in a message
+
+        Args:
+            message (str): Text to scan
+
+        Returns:
+            int: Sum of len(re.findall(pattern, message)) over all patterns
+        """
+        return sum(len(matches) for matches in self.findall(message))
@@ -0,0 +1,176 @@
+# agent/popularity.py
+import calendar
+import datetime
+import threading
+import time as time_module
+
+class PopularityRanking:
+    """
+    Menu items ranked by how much they sell, updated incrementally
+
+    Every committed order adds its quantities to the items' scores, and an
+    item whose score grows moves up past the items it overtook. The ranking
+    is always sorted, so the top K items are read in O(K) without a query.
+
+    With a half_life (seconds), older sales count less. This uses forward
+    decay: a sale at time t adds quantity * 2 ** ((t - epoch) / half_life),
+    so newer sales weigh more and the scores never need to be decayed
+    one by one. When the weights grow too large, all scores are scaled down
+    together, which keeps the order.
+    """
+
+    # Rescale the scores before the weights get near the float limit
+    MAX_EXPONENT = 512
+
+    def __init__(self, half_life=None, now=None):
+        self.half_life = half_life
+        self._epoch = time_module.time() if now is None else now
+        self._scores = {}
+        self._ranked = []
+        self._position = {}
+        self._lock = threading.Lock()
+
+        self.orders_recorded = 0
+        self.rescaled = 0
+
+    @classmethod
+    def from_session(cls, session, half_life=None):
+        """
+        Seed the ranking from the order_items table
+
+        Args:
+            session: SQLAlchemy session
+            half_life (float): Seconds for a sale to lose half its weight, or None
+
+        Returns:
+            PopularityRanking: The seeded ranking
+        """
+        from sqlalchemy import func
+        from models import Order, OrderItem
+
+        ranking = cls(half_life=half_life)
+        if half_life:
+            # Quantities per item and day, each weighted by its day
+            day = func.date(Order.order_date)
+            rows = session.query(
+                OrderItem.menu_item_id, day, func.sum(OrderItem.quantity)
+            ).join(Order, Order.id == OrderItem.order_id).group_by(OrderItem.menu_item_id, day).all()
+            sales = [
+                (item_id, quantity, calendar.timegm(datetime.datetime.strptime(date, '%Y-%m-%d').timetuple()) + 43200)
+                for item_id, date, quantity in rows
+                if date
+            ]
+        else:
+            rows = session.query(
+                OrderItem.menu_item_id, func.sum(OrderItem.quantity)
+            ).group_by(OrderItem.menu_item_id).all()
+            sales = [(item_id, quantity, None) for item_id, quantity in rows]
+
+        with ranking._lock:
+            for item_id, quantity, timestamp in sales:
+                ranking._add(item_id, quantity * ranking._weight(timestamp))
+
+        print(f"Seeded popularity ranking from {len(rows)} order_items groups")
+        return ranking
+
+    def track(self, item_ids):
+        """Add menu items that have not sold yet at the bottom of the ranking"""
+        with self._lock:
+            for item_id in item_ids:
+                if item_id not in self._scores:
+                    self._insert(item_id)
+
+    def record(self, items, timestamp=None):
+        """
+        Record the items of a committed order
+
+        Args:
+            items (list): Order items with id and quantity
+            timestamp (float): Time of the order, defaults to now
+        """
+        with self._lock:
+            weight = self._weight(timestamp)
+            for item in items:
+                self._add(item['id'], item['quantity'] * weight)
+            self.orders_recorded += 1
+
+    def top(self, k, allowed=None):
+        """
+        Get the k best selling item IDs, best first
+
+        Args:
+            k (int): Number of items
+            allowed: Optional container of item IDs to choose from, such as the current menu
+
+        Returns:
+            list: Item IDs
+        """
+        with self._lock:
+            if allowed is None:
+                return self._ranked[:k]
+
+            result = []
+            for item_id in self._ranked:
+                if item_id in allowed:
+                    result.append(item_id)
+                    if len(result) == k:
+                        break
+            return result
+
+    def rank(self, item_id):
+        """Get the position of an item in the ranking; unknown items rank last"""
+        return self._position.get(item_id, len(self._ranked))
+
+    def _weight(self, timestamp):
+        if not self.half_life:
+            return 1.0
+
+        if timestamp is None:
+            timestamp = time_module.time()
+        exponent = (timestamp - self._epoch) / self.half_life
+        if exponent > self.MAX_EXPONENT:
+            self._rescale(timestamp)
+            exponent = 0.0
+        return 2.0 ** exponent
+
+    def _rescale(self, timestamp):
+        """Move the epoch to timestamp, scaling every score to match"""
+        factor = 2.0 ** (-(timestamp - self._epoch) / self.half_life)
+        for item_id in self._scores:
+            self._scores[item_id] *= factor
+        self._epoch = timestamp
+        self.rescaled += 1
+
+    def _insert(self, item_id):
+        self._scores[item_id] = 0.0
+        self._position[item_id] = len(self._ranked)
+        self._ranked.append(item_id)
+
+    def _add(self, item_id, amount):
+        if item_id not in self._scores:
+            self._insert(item_id)
+        scores = self._scores
+        scores[item_id] += amount
+
+        # Move the item up past every item it now outsells; ties keep their order
+        ranked = self._ranked
+        position = self._position[item_id]
+        score = scores[item_id]
+        while position > 0 and scores[ranked[position - 1]] < score:
+            above = ranked[position - 1]
+            ranked[position] = above
+            self._position[above] = position
+            position -= 1
+        ranked[position] = item_id
+        self._position[item_id] = position
+
+    def stats(self):
+        """Get ranking counters and the current top items"""
+        with self._lock:
+            return {
+                'items': len(self._ranked),
+                'orders_recorded': self.orders_recorded,
+                'half_life': self.half_life,
+                'rescaled': self.rescaled,
+                'top': self._ranked[:5]
+            }
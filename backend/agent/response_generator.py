@@ -1,4 +1,5 @@
 # agent/response_generator.py
+import datetime
 import random
 
 class ResponseGenerator:
@@ -163,4 +164,11 @@ class ResponseGenerator:
     
     def format_available_times(self, times):
         """Format available times for display"""
-        return ", ".join([time['time'] for time in times])
\ No newline at end of file
+        return ", ".join([time['time'] for time in times])
+    
+    def format_alternative_slots(self, slots):
+        """Format alternative slots on possibly different dates for display"""
+        return ", ".join([
+            f"{datetime.datetime.strptime(slot['date'], '%Y-%m-%d').strftime('%A, %B %d')} at {slot['time']}"
+            for slot in slots
+        ])
\ No newline at end of file
@@ -0,0 +1,55 @@
+# agent/response_projection.py
+import hashlib
+import json
+
+# Response fields that carry the same data turn after turn
+BLOB_FIELDS = ('menu', 'available_dates', 'available_times')
+
+# Fields a projection never drops
+ALWAYS_KEPT = ('error',)
+
+def blob_version(value):
+    """
+    Get the version of a blob, a checksum of its contents
+
+    The menu is versioned by its MenuSnapshot instead (menu_version in the
+    response), so the same version works for /api/menu and chat turns.
+    """
+    data = json.dumps(value, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return hashlib.sha1(data).hexdigest()[:16]
+
+def project_response(response, versions=None, fields=None):
+    """
+    Trim a chat response to what the client does not hold yet
+
+    Every blob field of the response is listed in a 'versions' field. A blob
+    whose version matches the one the client sent is left out: the client
+    reuses its copy. The response itself is not changed, so a stored
+    response can be projected differently for each retry.
+
+    Args:
+        response (dict): Response from RestaurantAgent.process_message
+        versions (dict): Blob field -> version the client holds
+        fields (list): Response fields to keep, or None for all of them
+
+    Returns:
+        dict: Projected response
+    """
+    versions = versions or {}
+    projected = {}
+    held = {}
+    for name, value in response.items():
+        if fields is not None and name not in fields and name not in ALWAYS_KEPT:
+            continue
+
+        if name in BLOB_FIELDS:
+            version = response.get('menu_version') if name == 'menu' else None
+            held[name] = version or blob_version(value)
+            if versions.get(name) == held[name]:
+                continue
+
+        projected[name] = value
+
+    if held:
+        projected['versions'] = held
+    return projected
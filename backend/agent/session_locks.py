@@ -0,0 +1,79 @@
+# agent/session_locks.py
+import contextlib
+import threading
+import time as time_module
+import zlib
+
+class SessionLockTable:
+    """
+    Striped locks that serialize chat turns per session
+
+    A fixed table of locks is indexed by a hash of the session ID. Turns for
+    the same session always take the same lock and run one at a time, while
+    turns for different sessions almost always take different locks and run
+    in parallel. Unlike a lock per session, the table never grows and needs
+    no cleanup; two sessions that share a stripe just wait for each other.
+    """
+
+    def __init__(self, stripes=1024):
+        self.stripes = stripes
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self._stats_lock = threading.Lock()
+
+        self.acquired = 0
+        self.contended = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def stripe(self, session_id):
+        """
+        Get the stripe index of a session
+
+        crc32 is used instead of hash() so the mapping is the same in every
+        worker process.
+        """
+        return zlib.crc32(session_id.encode('utf-8')) % self.stripes
+
+    @contextlib.contextmanager
+    def hold(self, session_id):
+        """
+        Hold the lock of a session for the duration of a with block
+
+        Args:
+            session_id (str): Session ID; without one there is nothing to serialize
+        """
+        if not session_id:
+            yield
+            return
+
+        lock = self._locks[self.stripe(session_id)]
+        waited = 0.0
+        if not lock.acquire(blocking=False):
+            started = time_module.perf_counter()
+            lock.acquire()
+            waited = time_module.perf_counter() - started
+
+        with self._stats_lock:
+            self.acquired += 1
+            if waited:
+                self.contended += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def stats(self):
+        """Get lock wait counters"""
+        with self._stats_lock:
+            return {
+                'stripes': self.stripes,
+                'acquired': self.acquired,
+                'contended': self.contended,
+                'contended_ratio': round(self.contended / self.acquired, 4) if self.acquired else 0.0,
+                'total_wait_ms': round(self.wait_seconds * 1000, 3),
+                'avg_wait_ms': round(self.wait_seconds * 1000 / self.contended, 3) if self.contended else 0.0,
+                'max_wait_ms': round(self.max_wait_seconds * 1000, 3)
+            }
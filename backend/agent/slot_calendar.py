@@ -0,0 +1,184 @@
+# agent/slot_calendar.py
+import datetime
+import re
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+
+# Simple logic: 1 table can accommodate up to 4 guests
+SEATS_PER_TABLE = 4
+
+MINUTES_PER_DAY = 24 * 60
+
+# Free tables are stored as array('I'); larger counts are clamped
+MAX_CAPACITY = 2 ** 32 - 1
+
+TIME_PATTERN = re.compile(r'^\s*(\d{1,2}):(\d{2})\s*([AaPp][Mm])\s*$')
+
+def tables_needed(guests):
+    """Get the number of tables a party needs"""
+    return (guests + SEATS_PER_TABLE - 1) // SEATS_PER_TABLE  # Ceiling division
+
+@lru_cache(maxsize=1024)
+def time_to_minutes(time_str):
+    """
+    Convert a slot time like '7:00 PM' to minutes since midnight
+
+    Returns:
+        int: Minutes since midnight, or None if the time cannot be parsed
+    """
+    match = TIME_PATTERN.match(time_str)
+    if not match:
+        return None
+
+    hour, minute = int(match.group(1)) % 12, int(match.group(2))
+    if match.group(3).upper() == 'PM':
+        hour += 12
+    return hour * 60 + minute
+
+class SlotCalendar:
+    """
+    Per-date slot capacity in compact arrays
+
+    Each date holds two parallel arrays sorted by time: the slot start in
+    minutes since midnight and the number of free tables. Range questions
+    ("anything around 7pm", "first slot for 6 people this week") are answered
+    with a bisect and a short walk instead of scanning and parsing rows.
+    Questions over a date range use one index of every slot, keyed by its
+    minutes since the first date of the calendar.
+    """
+
+    def __init__(self):
+        self.minutes = {}    # date -> array('H') of slot starts, ascending
+        self.capacity = {}   # date -> array('I') of free tables, same order
+        self.labels = {}     # date -> slot times as stored, same order
+        self._range_index = None  # built by the first range question
+
+    @classmethod
+    def from_slots(cls, slots):
+        """
+        Build a calendar from availability slots
+
+        Args:
+            slots (dict): date -> list of (time, available), as returned by
+                          BookingHandler.load_slots()
+
+        Returns:
+            SlotCalendar: The calendar
+        """
+        calendar = cls()
+        for date, date_slots in slots.items():
+            calendar.add_date(date, date_slots)
+        return calendar
+
+    def add_date(self, date, date_slots):
+        """Add the slots of one date, skipping times that cannot be parsed"""
+        parsed = sorted(
+            (time_to_minutes(time), max(available, 0), time)
+            for time, available in date_slots
+            if time_to_minutes(time) is not None
+        )
+        self.minutes[date] = array('H', (slot[0] for slot in parsed))
+        self.capacity[date] = array('I', (min(slot[1], MAX_CAPACITY) for slot in parsed))
+        self.labels[date] = tuple(slot[2] for slot in parsed)
+        self._range_index = None
+
+    def _get_range_index(self):
+        """
+        Get the index of every slot across dates
+
+        Returns:
+            tuple: (ordinal of the first date, array('I') of slot offsets in
+                   minutes since that date, ascending, and the (date, index)
+                   of each offset)
+        """
+        if self._range_index is None:
+            days = {date: datetime.date.fromisoformat(date).toordinal() for date in self.minutes}
+            base = min(days.values(), default=0)
+            slots = sorted(
+                ((days[date] - base) * MINUTES_PER_DAY + minute, date, index)
+                for date, minutes in self.minutes.items()
+                for index, minute in enumerate(minutes)
+            )
+            self._range_index = (
+                base,
+                array('I', (slot[0] for slot in slots)),
+                [(slot[1], slot[2]) for slot in slots]
+            )
+        return self._range_index
+
+    def _slot(self, date, index):
+        """Get a slot as a dict"""
+        return {
+            'date': date,
+            'time': self.labels[date][index],
+            'available': self.capacity[date][index]
+        }
+
+    def nearest_slots(self, date, time, guests=1, limit=3, exclude_requested=True):
+        """
+        Get the slots of a date closest to a time that can seat a party
+
+        Args:
+            date (str): Date string in format 'YYYY-MM-DD'
+            time (str): Requested time, e.g. '7:00 PM'
+            guests (int): Party size
+            limit (int): Maximum number of slots to return
+            exclude_requested (bool): Skip the slot at exactly the requested time
+
+        Returns:
+            list: Slot dicts with date, time and available, closest first
+        """
+        minutes = self.minutes.get(date)
+        target = time_to_minutes(time) if time else None
+        if not minutes or target is None:
+            return []
+
+        capacity = self.capacity[date]
+        needed = tables_needed(guests)
+
+        # Walk outwards from the insertion point, taking the closer side first
+        results = []
+        right = bisect_left(minutes, target)
+        left = right - 1
+        while len(results) < limit and (left >= 0 or right < len(minutes)):
+            if right >= len(minutes) or (left >= 0 and target - minutes[left] <= minutes[right] - target):
+                index, left = left, left - 1
+            else:
+                index, right = right, right + 1
+
+            if exclude_requested and minutes[index] == target:
+                continue
+            if capacity[index] >= needed:
+                results.append(self._slot(date, index))
+
+        return results
+
+    def first_slots(self, start_date, days, guests=1, limit=3):
+        """
+        Get the earliest slots in a date range that can seat a party
+
+        Args:
+            start_date (str): First date, in format 'YYYY-MM-DD'
+            days (int): Number of days to search
+            guests (int): Party size
+            limit (int): Maximum number of slots to return
+
+        Returns:
+            list: Slot dicts with date, time and available, in time order
+        """
+        needed = tables_needed(guests)
+        first_day = datetime.datetime.strptime(start_date, '%Y-%m-%d').date()
+        base, offsets, slots = self._get_range_index()
+
+        # Bisect to the slots of the range, then take the first that fit
+        start = (first_day.toordinal() - base) * MINUTES_PER_DAY
+        results = []
+        for position in range(bisect_left(offsets, start), bisect_left(offsets, start + days * MINUTES_PER_DAY)):
+            date, index = slots[position]
+            if self.capacity[date][index] >= needed:
+                results.append(self._slot(date, index))
+                if len(results) >= limit:
+                    break
+
+        return results
@@ -0,0 +1,199 @@
+# agent/spell_corrector.py
+import re
+
+# Everyday chat words that must never be "corrected" into a menu word
+# (e.g. "price" is one delete away from "rice")
+COMMON_WORDS = [
+    'about', 'after', 'again', 'also', 'anything', 'available', 'back', 'been', 'before',
+    'best', 'bring', 'call', 'change', 'come', 'cost', 'could', 'dear', 'does',
+    'each', 'else', 'email', 'even', 'every', 'extra', 'fine', 'first', 'free', 'from',
+    'give', 'going', 'good', 'great', 'guys', 'have', 'here', 'home', 'into', 'just',
+    'know', 'large', 'last', 'late', 'later', 'leave', 'less', 'like', 'little', 'long',
+    'look', 'love', 'made', 'make', 'many', 'maybe', 'mine', 'more', 'most', 'much',
+    'must', 'name', 'need', 'nice', 'number', 'only', 'other', 'over', 'party', 'people',
+    'person', 'phone', 'place', 'please', 'plus', 'price', 'prices', 'quick', 'really',
+    'same', 'seat', 'seats', 'should', 'side', 'size', 'small', 'some', 'something',
+    'soon', 'sorry', 'still', 'such', 'sure', 'take', 'than', 'thank', 'thanks', 'that',
+    'them', 'then', 'there', 'these', 'they', 'thing', 'think', 'this', 'those', 'time',
+    'tonight', 'very', 'wait', 'want', 'wanted', 'week', 'well', 'were', 'what', 'when',
+    'where', 'which', 'while', 'will', 'wish', 'with', 'without', 'would', 'your', 'yours'
+]
+
+# Food and drink words that are not on the menu but are one edit away from
+# a menu word (e.g. "roast" -> "toast", "green" -> "greek"); asking for
+# them must not put a menu item in the cart
+FOOD_WORDS = [
+    'bacon', 'baked', 'beans', 'beef', 'beer', 'boiled', 'bread', 'burger', 'butter',
+    'cake', 'cheese', 'chicken', 'chips', 'chocolate', 'coffee', 'coke', 'cream', 'dessert',
+    'drink', 'drinks', 'eggs', 'fish', 'fried', 'fries', 'green', 'ham', 'hot', 'juice',
+    'lamb', 'lemon', 'lemonade', 'meat', 'milk', 'pasta', 'pork', 'red', 'roast',
+    'roasted', 'salmon', 'sauce', 'sausage', 'soda', 'spicy', 'steamed', 'sugar', 'tea',
+    'toasted', 'tuna', 'water', 'white', 'wine'
+]
+
+WORD_PATTERN = re.compile(r'[a-z]+')
+
+def edit_distance(a, b, max_distance):
+    """
+    Optimal string alignment distance between two words
+
+    Args:
+        a (str): First word
+        b (str): Second word
+        max_distance (int): Give up once the distance is known to exceed this
+
+    Returns:
+        int: The distance, or max_distance + 1 if it is larger than max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+class SpellCorrector:
+    """
+    Symmetric-delete (SymSpell) spelling corrector over a fixed vocabulary
+
+    Every vocabulary word is indexed under all the strings obtained by deleting
+    up to max_edit_distance characters from its prefix. Correcting a token only
+    generates the deletes of the token itself and looks them up, so the cost
+    per token does not depend on the vocabulary size.
+
+    Equally close words are ranked: preferred words (the intent keywords)
+    first, then words that keep the first and last letter of the token,
+    which typos rarely change, then the more frequent word.
+    """
+
+    def __init__(self, words, max_edit_distance=2, prefix_length=7, preferred_words=()):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+
+        # Word -> frequency, used to break ties between equally close words
+        self.words = {}
+        for word in words:
+            self.words[word] = self.words.get(word, 0) + 1
+
+        # Words that win a tie, so "yess" is read as "yes" and not "less"
+        self.preferred_words = frozenset(preferred_words)
+
+        # Delete variant -> vocabulary words it was derived from
+        self.deletes = {}
+        for word in self.words:
+            for variant in self._deletes(word[:self.prefix_length], self.max_edit_distance):
+                self.deletes.setdefault(variant, []).append(word)
+
+        self._cache = {}
+
+    @classmethod
+    def from_texts(cls, texts, known_words=()):
+        """
+        Build a corrector from the words of some texts
+
+        Args:
+            texts (list): Texts to take the vocabulary from, e.g. menu item names
+            known_words (list): Extra words to recognise as correct, such as
+                                the intent keywords; they win ties
+
+        Returns:
+            SpellCorrector: The corrector
+        """
+        words = []
+        for text in texts:
+            words.extend(WORD_PATTERN.findall(text.lower()))
+        words.extend(known_words)
+        words.extend(COMMON_WORDS)
+        words.extend(FOOD_WORDS)
+        return cls(words, preferred_words=known_words)
+
+    @staticmethod
+    def _deletes(word, distance):
+        """Get the word and all strings made by deleting up to distance characters"""
+        variants = {word}
+        frontier = {word}
+        for _ in range(distance):
+            next_frontier = set()
+            for variant in frontier:
+                for i in range(len(variant)):
+                    next_frontier.add(variant[:i] + variant[i + 1:])
+            variants |= next_frontier
+            frontier = next_frontier
+        return variants
+
+    def allowed_distance(self, token):
+        """Short words are too ambiguous to correct aggressively"""
+        if len(token) < 4:
+            return 0
+        if len(token) < 8:
+            return min(1, self.max_edit_distance)
+        return self.max_edit_distance
+
+    def correct(self, token):
+        """
+        Correct a single lowercase token
+
+        Args:
+            token (str): Token to correct
+
+        Returns:
+            str: The closest vocabulary word, or the token itself if it is
+                 known or nothing is close enough
+        """
+        if token in self.words:
+            return token
+
+        cached = self._cache.get(token)
+        if cached is not None:
+            return cached
+
+        distance = self.allowed_distance(token)
+        best = token
+        if distance:
+            best_key = None
+            seen = set()
+            for variant in self._deletes(token[:self.prefix_length], distance):
+                for word in self.deletes.get(variant, ()):
+                    if word in seen:
+                        continue
+                    seen.add(word)
+                    word_distance = edit_distance(token, word, distance)
+                    if word_distance > distance:
+                        continue
+                    key = (
+                        word_distance,
+                        word not in self.preferred_words,
+                        (word[0] != token[0]) + (word[-1] != token[-1]),
+                        -self.words[word],
+                        word
+                    )
+                    if best_key is None or key < best_key:
+                        best, best_key = word, key
+
+        # Bounded cache of recent corrections
+        if len(self._cache) >= 10000:
+            self._cache.clear()
+        self._cache[token] = best
+        return best
+
+    def correct_text(self, text):
+        """
+        Correct every word of a lowercase text, keeping everything else as is
+
+        Args:
+            text (str): Lowercase text
+
+        Returns:
+            str: The corrected text
+        """
+        return WORD_PATTERN.sub(lambda match: self.correct(match.group(0)), text)
@@ -0,0 +1,73 @@
+# agent/unit_of_work.py
+
+class UnitOfWork:
+    """
+    Database writes of one chat turn, committed once at the end of the turn
+
+    Handlers add their rows and flush them (to get ids), but never commit.
+    The agent commits when the turn is done, or rolls back if anything in the
+    turn failed. Work that must only happen once the writes are durable,
+    such as updating the availability cache or advancing the conversation,
+    is registered with after_commit() and is dropped on rollback; work that
+    undoes a preparation made before the commit is registered with
+    after_rollback().
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.writes = 0
+        self._after_commit = []
+        self._after_rollback = []
+
+    def add(self, instance):
+        """Add a new row to the turn's transaction"""
+        self.session.add(instance)
+        self.writes += 1
+
+    def mark_written(self, count=1):
+        """Record writes made with statements instead of add(), such as an UPDATE"""
+        self.writes += count
+
+    def after_commit(self, callback):
+        """Run callback once the turn's writes are committed"""
+        self._after_commit.append(callback)
+
+    def after_rollback(self, callback):
+        """Run callback if the turn's writes are rolled back"""
+        self._after_rollback.append(callback)
+
+    def commit(self):
+        """
+        Commit the turn's writes, if it made any
+
+        Returns:
+            bool: True if a transaction was committed
+        """
+        if not self.writes:
+            self._run_callbacks()
+            return False
+
+        try:
+            self.session.commit()
+        except Exception:
+            self.rollback()
+            raise
+
+        self.writes = 0
+        self._run_callbacks()
+        return True
+
+    def rollback(self):
+        """Discard the turn's writes and the work waiting for their commit"""
+        self.session.rollback()
+        self.writes = 0
+        self._after_commit = []
+        callbacks, self._after_rollback = self._after_rollback, []
+        for callback in callbacks:
+            callback()
+
+    def _run_callbacks(self):
+        self._after_rollback = []
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
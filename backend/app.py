@@ -1,11 +1,21 @@
 # app.py
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
 import json
+import base64
+import datetime
 
-from database import init_db, get_session
+from database import init_db, get_session, remove_session, engine, Session
 from agent import RestaurantAgent
+from agent.availability import AvailabilityCache
+from agent.conversation_log import ConversationLogWriter
+from agent.conversation_store import create_conversation_store
+from agent.session_locks import SessionLockTable
+from agent.idempotency import IdempotencyCache
+from agent.popularity import PopularityRanking
+from agent.response_projection import project_response
+from compression import ENCODINGS, choose_encoding, compress, compress_stream, is_compressible
 import config
 
 # Initialize Flask app
@@ -32,9 +42,48 @@ def add_cors_headers(response):
         response.headers['Access-Control-Allow-Origin'] = 'http://localhost:5173'
     
     # Add other CORS headers
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, Idempotency-Key'
     response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
     response.headers['Access-Control-Allow-Credentials'] = 'true'
+    response.headers['Access-Control-Expose-Headers'] = 'X-Export-Watermark'
+    return response
+
+@app.after_request
+def compress_response(response):
+    """
+    Compress JSON and NDJSON responses for clients that accept gzip or deflate
+    
+    Bodies smaller than COMPRESSION_MIN_SIZE are sent as is, since the
+    compressed headers would cost more than they save. Streamed responses
+    are compressed chunk by chunk. Responses that already carry a
+    Content-Encoding, such as the pre-compressed menu, are left alone.
+    """
+    if (not config.COMPRESSION_LEVEL
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or not is_compressible(response.mimetype)):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    
+    if response.is_streamed:
+        response.response = compress_stream(response.response, encoding, config.COMPRESSION_LEVEL)
+    else:
+        body = response.get_data()
+        if len(body) < config.COMPRESSION_MIN_SIZE:
+            return response
+        response.set_data(compress(body, encoding, config.COMPRESSION_LEVEL))
+    
+    response.headers['Content-Encoding'] = encoding
+    # A strong ETag names one representation, so the compressed body needs its own
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(f"{etag}-{encoding}")
     return response
 
 # Initialize database
@@ -49,9 +98,52 @@ restaurant_info = {
     'hours': config.RESTAURANT_HOURS
 }
 
-# Initialize agent
-session = get_session()
-agent = RestaurantAgent(session, restaurant_info)
+# Initialize agent. The agent only shares immutable state (menu snapshot and
+# indexes) between requests; it reaches the database through the Session
+# registry, which gives every request thread its own session.
+availability_cache = AvailabilityCache(
+    max_dates=config.AVAILABILITY_CACHE_SIZE,
+    ttl=config.AVAILABILITY_CACHE_TTL
+)
+conversation_store = create_conversation_store(
+    config.CONVERSATION_STORE,
+    path=config.CONVERSATION_STORE_PATH,
+    max_sessions=config.CONVERSATION_MAX_SESSIONS,
+    idle_ttl=config.CONVERSATION_IDLE_TTL,
+    memory_budget=config.CONVERSATION_MEMORY_BUDGET
+)
+log_writer = ConversationLogWriter(
+    engine,
+    batch_size=config.CONVERSATION_LOG_BATCH_SIZE,
+    flush_interval=config.CONVERSATION_LOG_FLUSH_MS / 1000,
+    max_queue=config.CONVERSATION_LOG_QUEUE_SIZE
+).start()
+agent = RestaurantAgent(
+    Session,
+    restaurant_info,
+    booking_days_ahead=config.BOOKING_DAYS_AHEAD,
+    booking_max_days_ahead=config.BOOKING_MAX_DAYS_AHEAD,
+    availability_cache=availability_cache,
+    conversation_store=conversation_store,
+    log_writer=log_writer,
+    session_locks=SessionLockTable(stripes=config.SESSION_LOCK_STRIPES),
+    idempotency_cache=IdempotencyCache(
+        max_entries=config.IDEMPOTENCY_CACHE_SIZE,
+        ttl=config.IDEMPOTENCY_TTL
+    ),
+    popularity=PopularityRanking.from_session(
+        Session,
+        half_life=config.POPULARITY_HALF_LIFE_DAYS * 86400 or None
+    )
+)
+
+# Release the session used to load the menu
+remove_session()
+
+@app.teardown_appcontext
+def shutdown_session(exception=None):
+    """End the request's unit of work and return its connection to the pool"""
+    remove_session(exception)
 
 @app.route('/api/chat', methods=['POST', 'OPTIONS'])
 def chat():
@@ -61,9 +153,20 @@ def chat():
     Request:
     {
         "message": "User message text",
-        "session_id": "Optional session ID for conversation tracking"
+        "session_id": "Optional session ID for conversation tracking",
+        "sequence": "Optional message number within the session",
+        "versions": "Optional {menu, available_dates, available_times: version} the client holds",
+        "fields": "Optional list of response fields to return"
     }
     
+    Retries of a message should carry the same Idempotency-Key header (or
+    idempotency_key field); without one, session_id and sequence are used.
+    A retry gets the stored response and the message is not processed again.
+    
+    A client that sends versions or fields gets the response projected by
+    project_response(): the versions of its blobs are listed in
+    response.versions, and blobs the client already holds are left out.
+    
     Response:
     {
         "response": {
@@ -85,15 +188,29 @@ def chat():
         if not message:
             return jsonify({'error': 'No message provided'}), 400
         
+        versions = data.get('versions')
+        fields = data.get('fields')
+        if versions is not None and not isinstance(versions, dict):
+            return jsonify({'error': 'versions must be an object'}), 400
+        if fields is not None and not isinstance(fields, list):
+            return jsonify({'error': 'fields must be a list'}), 400
+        
+        # Idempotency key supplied by the client, or derived from the sequence number
+        idempotency_key = request.headers.get('Idempotency-Key') or data.get('idempotency_key')
+        if not idempotency_key and session_id and data.get('sequence') is not None:
+            idempotency_key = f"seq-{data['sequence']}"
+        
         # Process message with agent
-        response = agent.process_message(message, session_id)
+        response = agent.process_message(message, session_id, idempotency_key)
+        if versions is not None or fields is not None:
+            response = project_response(response, versions, fields)
         
         # Get conversation
         conversation = agent.get_or_create_conversation(session_id)
         
         return jsonify({
             'response': response,
-            'session_id': conversation['session_id']
+            'session_id': conversation.session_id
         })
     except Exception as e:
         # Log the error
@@ -104,23 +221,88 @@ def chat():
             'message': str(e)
         }), 500
 
+# Serialized /api/menu response as (menu version, body per content coding)
+menu_payload = None
+
+def get_menu_payload(menu):
+    """
+    Get the serialized menu response, built and compressed once per menu version
+    
+    Args:
+        menu (MenuSnapshot): Current menu
+        
+    Returns:
+        tuple: Menu version and a dict of bodies by content coding, with
+            None for the uncompressed JSON
+    """
+    global menu_payload
+    payload = menu_payload
+    if payload is None or payload[0] != menu.version:
+        body = json.dumps({
+            'menu': menu.to_dicts(),
+            'version': menu.version
+        }, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        bodies = {None: body}
+        for encoding in ENCODINGS:
+            bodies[encoding] = compress(body, encoding, level=9)
+        payload = menu_payload = (menu.version, bodies)
+    return payload
+
 @app.route('/api/menu', methods=['GET'])
 def get_menu():
-    """Get the restaurant menu"""
-    from models import MenuItem
-    session = get_session()
-    menu_items = session.query(MenuItem).all()
+    """
+    Get the restaurant menu
+    
+    The body is serialized and compressed once per menu version. Each
+    content coding is sent with its own strong ETag, the version with the
+    coding appended. A client that sends any of them back in If-None-Match
+    gets 304 Not Modified without a body.
+    """
+    version, bodies = get_menu_payload(agent.menu)
+    encoding = None
+    if config.COMPRESSION_LEVEL and len(bodies[None]) >= config.COMPRESSION_MIN_SIZE:
+        encoding = choose_encoding(request.accept_encodings)
+    
+    etags = [version] + [f"{version}-{name}" for name in ENCODINGS]
+    if any(request.if_none_match.contains(etag) for etag in etags):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(bodies[encoding], mimetype='application/json')
+    
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+        response.set_etag(f"{version}-{encoding}")
+    else:
+        response.set_etag(version)
+    response.vary.add('Accept-Encoding')
+    if config.MENU_CACHE_MAX_AGE:
+        response.headers['Cache-Control'] = f"public, max-age={config.MENU_CACHE_MAX_AGE}"
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/admin/menu/reload', methods=['POST'])
+def reload_menu():
+    """
+    Reload the menu from the database without restarting (for admin purposes)
+    
+    The classifier and order indexes are rebuilt in the background and swapped
+    in atomically; conversations in memory are kept.
+    """
+    current_version = agent.menu.version
+    agent.reload_menu_in_background(get_session)
     
     return jsonify({
-        'menu': [item.to_dict() for item in menu_items]
-    })
+        'status': 'reloading',
+        'current_version': current_version
+    }), 202
 
 @app.route('/api/availability', methods=['GET'])
 def get_availability():
     """Get table availability"""
     date = request.args.get('date')
+    days = request.args.get('days', type=int)
     
-    session = get_session()
     booking_handler = agent.booking_handler
     
     if date:
@@ -131,32 +313,248 @@ def get_availability():
             'available_times': available_times
         })
     else:
+        # Every day is a cache entry, so the range is bounded
+        if days is not None and not 1 <= days <= config.BOOKING_MAX_DAYS_AHEAD:
+            return jsonify({'error': f"days must be between 1 and {config.BOOKING_MAX_DAYS_AHEAD}"}), 400
+        
         # Get dates with availability
-        available_dates = booking_handler.get_available_dates()
+        available_dates = booking_handler.get_available_dates(days)
         return jsonify({
             'available_dates': available_dates
         })
 
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page as an opaque cursor"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor, types):
+    """
+    Decode a cursor from encode_cursor()
+    
+    Args:
+        cursor (str): The cursor
+        types (tuple): Type of each value of the sort key, e.g. (str, int)
+        
+    Returns:
+        list: The sort key
+        
+    Raises:
+        ValueError: If the cursor is invalid or is not a sort key of these types
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    
+    # A cursor that decodes can still be the wrong shape, e.g. from another list
+    if not isinstance(values, list) or len(values) != len(types) or not all(
+        isinstance(value, value_type) and not isinstance(value, bool)
+        for value, value_type in zip(values, types)
+    ):
+        raise ValueError('Invalid cursor')
+    return values
+
+def parse_page_args(cursor_types):
+    """
+    Read the pagination and filter query parameters of an admin list
+    
+    Args:
+        cursor_types (tuple): Type of each value of the list's sort key
+        
+    Query parameters:
+        limit: Rows per page, capped at ADMIN_PAGE_SIZE_MAX
+        cursor: next_cursor of the previous page
+        status: Only rows with this status
+        from, to: Only rows dated within this range (YYYY-MM-DD, inclusive)
+        
+    Returns:
+        dict: limit, cursor, status, date_from and date_to
+    """
+    limit = request.args.get('limit', config.ADMIN_PAGE_SIZE, type=int)
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    
+    args = {
+        'limit': min(limit, config.ADMIN_PAGE_SIZE_MAX),
+        'cursor': decode_cursor(request.args['cursor'], cursor_types) if request.args.get('cursor') else None,
+        'status': request.args.get('status')
+    }
+    for name, key in (('from', 'date_from'), ('to', 'date_to')):
+        value = request.args.get(name)
+        if value:
+            try:
+                datetime.datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+        args[key] = value
+    return args
+
+def start_of_day(date, days=0):
+    """Get midnight of a YYYY-MM-DD date, optionally some days later, as a datetime"""
+    return datetime.datetime.strptime(date, '%Y-%m-%d') + datetime.timedelta(days=days)
+
 @app.route('/api/orders', methods=['GET'])
 def get_orders():
-    """Get all orders (for admin purposes)"""
-    from models import Order
+    """
+    Get orders, newest first, one page at a time (for admin purposes)
+    
+    Pages are keyset paginated on the order id, so every page costs the
+    same no matter how deep it is, and the items and their menu items are
+    loaded for the whole page at once. See parse_page_args() for the query
+    parameters; the date range applies to the order date.
+    """
+    from sqlalchemy.orm import selectinload
+    from models import Order, OrderItem
+    try:
+        args = parse_page_args((int,))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     session = get_session()
-    orders = session.query(Order).all()
+    query = session.query(Order).options(
+        selectinload(Order.items).joinedload(OrderItem.menu_item)
+    )
+    if args['cursor'] is not None:
+        query = query.filter(Order.id < args['cursor'][0])
+    if args['status']:
+        query = query.filter(Order.status == args['status'])
+    if args['date_from']:
+        query = query.filter(Order.order_date >= start_of_day(args['date_from']))
+    if args['date_to']:
+        query = query.filter(Order.order_date < start_of_day(args['date_to'], days=1))
+    
+    # One extra row tells whether there is a next page
+    orders = query.order_by(Order.id.desc()).limit(args['limit'] + 1).all()
+    next_cursor = None
+    if len(orders) > args['limit']:
+        orders = orders[:args['limit']]
+        next_cursor = encode_cursor([orders[-1].id])
     
     return jsonify({
-        'orders': [order.to_dict() for order in orders]
+        'orders': [order.to_dict() for order in orders],
+        'next_cursor': next_cursor
     })
 
 @app.route('/api/bookings', methods=['GET'])
 def get_bookings():
-    """Get all bookings (for admin purposes)"""
+    """
+    Get bookings by reservation date, one page at a time (for admin purposes)
+    
+    Pages are keyset paginated on (date, id). See parse_page_args() for the
+    query parameters; the date range applies to the reservation date.
+    """
+    from sqlalchemy import and_, or_
     from models import TableBooking
+    try:
+        args = parse_page_args((str, int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    session = get_session()
+    query = session.query(TableBooking)
+    if args['cursor'] is not None:
+        date, booking_id = args['cursor']
+        query = query.filter(or_(
+            TableBooking.date > date,
+            and_(TableBooking.date == date, TableBooking.id > booking_id)
+        ))
+    if args['status']:
+        query = query.filter(TableBooking.status == args['status'])
+    if args['date_from']:
+        query = query.filter(TableBooking.date >= args['date_from'])
+    if args['date_to']:
+        query = query.filter(TableBooking.date <= args['date_to'])
+    
+    # One extra row tells whether there is a next page
+    bookings = query.order_by(TableBooking.date, TableBooking.id).limit(args['limit'] + 1).all()
+    next_cursor = None
+    if len(bookings) > args['limit']:
+        bookings = bookings[:args['limit']]
+        next_cursor = encode_cursor([bookings[-1].date, bookings[-1].id])
+    
+    return jsonify({
+        'bookings': [booking.to_dict() for booking in bookings],
+        'next_cursor': next_cursor
+    })
+
+def export_rows(model, since, until, options=()):
+    """
+    Yield the rows of a table with since < id <= until as NDJSON lines
+    
+    Rows are read in keyset chunks of EXPORT_CHUNK_SIZE and dropped from
+    the session after each chunk, so memory stays flat however large the
+    table is. Only ids are compared, so rows at or below since are never
+    exported again, even if they changed.
+    
+    Args:
+        model: Model class with an integer id
+        since (int): Last id the client already has
+        until (int): Last id to export
+        options: Loader options for each chunk, such as eager loads
+    """
     session = get_session()
-    bookings = session.query(TableBooking).all()
+    last_id = since
+    while last_id < until:
+        rows = session.query(model).options(*options).filter(
+            model.id > last_id, model.id <= until
+        ).order_by(model.id).limit(config.EXPORT_CHUNK_SIZE).all()
+        if not rows:
+            break
+        
+        yield ''.join(json.dumps(row.to_dict()) + '\n' for row in rows)
+        last_id = rows[-1].id
+        session.expunge_all()
+
+@app.route('/api/export/<table>', methods=['GET'])
+def export_table(table):
+    """
+    Stream a whole table as NDJSON, one JSON object per line (for reconciliation)
     
+    Tables are orders, bookings and conversations. Rows are exported in id
+    order up to the last id at the time of the request, which is sent in
+    the X-Export-Watermark header. Passing it back as since exports only the
+    rows added after it.
+    
+    The watermark covers inserts only: changes to rows the client already
+    has, such as an order or booking changing status, are not exported
+    again. Export from 0 to pick those up.
+    
+    Query parameters:
+        since: Watermark of a previous export, defaults to 0 (everything);
+               only newer rows are exported, not updates to older ones
+    """
+    from sqlalchemy import func
+    from sqlalchemy.orm import selectinload
+    from models import Order, OrderItem, TableBooking, Conversation
+    exports = {
+        'orders': (Order, (selectinload(Order.items).joinedload(OrderItem.menu_item),)),
+        'bookings': (TableBooking, ()),
+        'conversations': (Conversation, ())
+    }
+    if table not in exports:
+        return jsonify({'error': f"Unknown table {table}"}), 404
+    
+    since = request.args.get('since', 0, type=int)
+    model, options = exports[table]
+    until = get_session().query(func.max(model.id)).scalar() or 0
+    
+    response = Response(
+        stream_with_context(export_rows(model, since, until, options)),
+        mimetype='application/x-ndjson'
+    )
+    response.headers['X-Export-Watermark'] = str(max(since, until))
+    return response
+
+@app.route('/api/admin/metrics', methods=['GET'])
+def get_metrics():
+    """Get in-process cache counters (for admin purposes)"""
     return jsonify({
-        'bookings': [booking.to_dict() for booking in bookings]
+        'availability_cache': agent.booking_handler.cache.stats(),
+        'conversations': agent.conversations.stats(),
+        'conversation_log': agent.log_writer.stats(),
+        'session_locks': agent.session_locks.stats(),
+        'idempotency': agent.idempotency_cache.stats(),
+        'popularity': agent.popularity.stats()
     })
 
 @app.route('/api/health', methods=['GET'])
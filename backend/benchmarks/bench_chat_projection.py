@@ -0,0 +1,138 @@
+# benchmarks/bench_chat_projection.py
+"""
+Benchmark for projected chat responses
+
+Imports the app with a scratch database (the working directory is switched
+to a temporary directory first) and plays the same conversations through
+POST /api/chat twice with Flask's test client:
+
+- full: a client that sends neither versions nor fields, and gets every
+  blob (menu, available_dates, available_times) in every turn
+- projected: a client that keeps the blobs it received, sends their
+  versions, and puts left-out blobs back the way the frontend does
+
+Reports the response bytes of both, and checks that the projected client
+ends up with the same blobs as the full one after every turn. Also checks
+field projections, and that a retried message can be projected for the
+versions the retry sends.
+
+Run from the backend directory:
+    python benchmarks/bench_chat_projection.py [visitors]
+"""
+import contextlib
+import gzip
+import io
+import os
+import sys
+import tempfile
+
+from common import BACKEND_DIR
+
+# A repeat visitor browsing the menu and looking for a table, without booking
+TURNS = [
+    "what do you serve",
+    "I want to book a table",
+    "what do you serve",
+    "I want to book a table",
+    "tomorrow",
+    "what do you serve",
+    "hello",
+    "what do you serve",
+    "I want to book a table",
+    "what do you serve",
+]
+BLOB_FIELDS = ('menu', 'available_dates', 'available_times')
+
+
+class Client:
+    """Chat client that keeps the blobs it receives, like frontend/src/apiService.js"""
+
+    def __init__(self, client, projected):
+        self.client = client
+        self.projected = projected
+        self.held = {}
+        self.session_id = None
+        self.bytes = 0
+        self.gzip_bytes = 0
+
+    def send(self, message):
+        body = {'message': message, 'session_id': self.session_id}
+        if self.projected:
+            body['versions'] = {name: version for name, (version, value) in self.held.items()}
+        response = self.client.post('/api/chat', json=body)
+        assert response.status_code == 200, response.get_json()
+        self.bytes += len(response.data)
+        self.gzip_bytes += len(gzip.compress(response.data))
+
+        data = response.get_json()
+        self.session_id = data['session_id']
+        reply = data['response']
+        for name, version in reply.get('versions', {}).items():
+            if name in reply:
+                self.held[name] = (version, reply[name])
+            else:
+                assert self.held[name][0] == version, f"{name} left out but not held"
+                reply[name] = self.held[name][1]
+        return reply
+
+
+def main():
+    visitors = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as app_module
+        client = app_module.app.test_client()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            full = Client(client, projected=False)
+            projected = Client(client, projected=True)
+            blobs_sent = 0
+            for visitor in range(visitors):
+                # Each visitor starts a new conversation; the projected client keeps its blobs
+                full.session_id = projected.session_id = None
+                for message in TURNS:
+                    expected = full.send(message)
+                    reply = projected.send(message)
+                    blobs_sent += sum(name in expected for name in BLOB_FIELDS)
+                    for name in BLOB_FIELDS:
+                        assert reply.get(name) == expected.get(name), f"{message!r}: {name} differs"
+
+            # Field projection keeps only the requested fields (and errors)
+            reply = client.post('/api/chat', json={'message': 'what do you serve', 'fields': ['text']}).get_json()
+            assert set(reply['response']) == {'text'}, reply['response']
+            reply = client.post('/api/chat', json={'message': 'what do you serve', 'fields': ['menu_version']}).get_json()
+            assert set(reply['response']) == {'menu_version'}, reply['response']
+            assert reply['response']['menu_version'] == app_module.agent.menu.version
+            bad = client.post('/api/chat', json={'message': 'hello', 'versions': ['menu']})
+            assert bad.status_code == 400
+
+            # A retry is projected for the versions it sends; the stored response is not changed
+            version = app_module.agent.menu.version
+            headers = {'Idempotency-Key': 'projection-retry'}
+            body = {'message': 'what do you serve', 'session_id': 'projection-retry'}
+            first = client.post('/api/chat', json=body, headers=headers).get_json()['response']
+            retried = client.post('/api/chat', json={**body, 'versions': {'menu': version}},
+                                  headers=headers).get_json()['response']
+            again = client.post('/api/chat', json=body, headers=headers).get_json()['response']
+            assert 'menu' in first and 'menu' not in retried and retried['versions'] == {'menu': version}
+            assert again == first, "the stored response was changed by a projection"
+
+        app_module.agent.log_writer.close()
+        os.chdir(BACKEND_DIR)
+
+    turns = visitors * len(TURNS)
+    print(f"{visitors} visitors, {turns} turns, {blobs_sent} blobs in the full responses")
+    print(f"{'client':<10} {'bytes':>10} {'per turn':>9} {'gzip bytes':>11} {'per turn':>9}")
+    for name, result in (('full', full), ('projected', projected)):
+        print(f"{name:<10} {result.bytes:>10} {result.bytes / turns:>9.0f} "
+              f"{result.gzip_bytes:>11} {result.gzip_bytes / turns:>9.0f}")
+    print(f"projected responses are {projected.bytes / full.bytes:.0%} of the full bytes "
+          f"({projected.gzip_bytes / full.gzip_bytes:.0%} gzipped)")
+    assert projected.bytes < full.bytes
+    print("OK: the projected client holds the same blobs after every turn")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+# benchmarks/bench_compression.py
+"""
+Benchmark for response compression
+
+Imports the app with a scratch database (the working directory is switched
+to a temporary directory first), adds some orders, and compares with
+Flask's test client, with and without Accept-Encoding:
+
+- bytes sent for the menu, a check_menu chat turn, a page of /api/orders
+  and the NDJSON orders export
+- requests per second for /api/menu served from the bodies compressed once
+  per menu version, against compressing the menu on every request
+  (registered under a benchmark-only URL)
+
+Also checks that every compressed body decompresses to the uncompressed
+one, that small bodies are sent as is, and that each coding of the menu
+has its own ETag.
+
+Run from the backend directory:
+    python benchmarks/bench_compression.py [requests]
+"""
+import contextlib
+import datetime
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+from common import BACKEND_DIR
+
+GZIP = {'Accept-Encoding': 'gzip, deflate'}
+DEFLATE = {'Accept-Encoding': 'deflate'}
+
+
+def decode(response):
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        return gzip.decompress(response.data)
+    if encoding == 'deflate':
+        return zlib.decompress(response.data)
+    return response.data
+
+
+def chat_menu(body):
+    """The menu of a chat body; its session_id and wording change from turn to turn"""
+    return json.loads(body)['response']['menu']
+
+
+def measure(client, url, requests, headers=None):
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get(url, headers=headers)
+    return requests / (time.perf_counter() - started)
+
+
+def seed(engine, menu_ids, orders):
+    from models import Order, OrderItem
+
+    now = datetime.datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(Order.__table__.insert(), [
+            {'id': n + 1, 'customer_name': f"Customer {n}", 'customer_email': f"customer{n}@example.com",
+             'customer_phone': '555-0100', 'total_amount': 42.5, 'order_date': now, 'status': 'confirmed'}
+            for n in range(orders)
+        ])
+        conn.execute(OrderItem.__table__.insert(), [
+            {'order_id': n + 1, 'menu_item_id': menu_ids[(n + k) % len(menu_ids)], 'quantity': 1 + k, 'price': 12.5}
+            for n in range(orders)
+            for k in range(3)
+        ])
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as app_module
+        from compression import compress
+        from models import MenuItem
+
+        app = app_module.app
+        config = app_module.config
+        session = app_module.Session()
+        seed(app_module.engine, [item_id for item_id, in session.query(MenuItem.id)], 1000)
+        app_module.remove_session()
+
+        def get_menu_compressed_per_request():
+            version, bodies = app_module.get_menu_payload(app_module.agent.menu)
+            response = app.response_class(compress(bodies[None], 'gzip', config.COMPRESSION_LEVEL),
+                                          mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+            return response
+
+        app.add_url_rule('/bench/menu-gzip', 'bench_menu_gzip', get_menu_compressed_per_request)
+        client = app.test_client()
+
+        sizes = []
+
+        def compare(name, send, normalize=bytes):
+            plain, packed = send(None), send(GZIP)
+            assert plain.status_code == packed.status_code == 200, name
+            assert 'Content-Encoding' not in plain.headers, name
+            assert packed.headers.get('Content-Encoding') == 'gzip', f"{name} was not compressed"
+            assert 'Accept-Encoding' in packed.headers.get('Vary', ''), name
+            assert normalize(decode(packed)) == normalize(plain.data), f"{name}: the gzip body differs"
+            deflated = send(DEFLATE)
+            assert deflated.headers.get('Content-Encoding') == 'deflate', name
+            assert normalize(decode(deflated)) == normalize(plain.data), f"{name}: the deflate body differs"
+            sizes.append((name, len(plain.data), len(packed.data)))
+            return plain, packed
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            compare('menu', lambda headers: client.get('/api/menu', headers=headers))
+            compare('chat check_menu turn', lambda headers: client.post(
+                '/api/chat', json={'message': 'what do you serve'}, headers=headers), chat_menu)
+            compare('orders page (limit 200)', lambda headers: client.get('/api/orders?limit=200', headers=headers))
+            compare('orders export (NDJSON)', lambda headers: client.get('/api/export/orders', headers=headers))
+
+            # Small bodies and clients that refuse compression get the body as is
+            small = client.get('/api/health', headers=GZIP)
+            refused = client.get('/api/orders?limit=200', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+            assert 'Content-Encoding' not in small.headers and 'Content-Encoding' not in refused.headers
+
+        # One ETag per coding, and any of them revalidates
+        plain = client.get('/api/menu')
+        packed = client.get('/api/menu', headers=GZIP)
+        assert plain.headers['ETag'] != packed.headers['ETag']
+        for etag in (plain.headers['ETag'], packed.headers['ETag']):
+            cached = client.get('/api/menu', headers={**GZIP, 'If-None-Match': etag})
+            assert cached.status_code == 304 and cached.headers['ETag'] == packed.headers['ETag']
+
+        plain_rps = measure(client, '/api/menu', requests)
+        stored_rps = measure(client, '/api/menu', requests, GZIP)
+        per_request_rps = measure(client, '/bench/menu-gzip', requests, GZIP)
+
+        app_module.agent.log_writer.close()
+        os.chdir(BACKEND_DIR)
+
+    print(f"{'response':<26} {'identity':>10} {'gzip':>10} {'ratio':>6}")
+    for name, plain_size, packed_size in sizes:
+        print(f"{name:<26} {plain_size:>10} {packed_size:>10} {plain_size / packed_size:>5.1f}x")
+    print(f"/api/menu, {requests} requests each: identity {plain_rps:.0f} req/s, "
+          f"gzip stored per version {stored_rps:.0f} req/s, gzip per request {per_request_rps:.0f} req/s")
+    print("OK: compressed bodies match, small bodies are sent as is, one ETag per coding")
+
+
+if __name__ == '__main__':
+    main()
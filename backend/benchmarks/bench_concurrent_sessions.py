@@ -0,0 +1,187 @@
+# benchmarks/bench_concurrent_sessions.py
+"""
+Concurrency benchmark for database sessions
+
+Runs complete order and booking conversations from many parallel clients
+through RestaurantAgent against a scratch SQLite file, twice:
+
+- shared: one session instance used by every thread (the old app setup)
+- locked: one session instance behind a global lock, the only safe way to
+  share it, which serializes every turn
+- scoped: the scoped_session registry, removed after every turn like the
+  app's teardown_appcontext handler
+
+Each mode runs in its own process, because sharing one session (and so one
+sqlite3 connection) between threads can crash the interpreter outright or
+hang it; a mode that does not finish within CHILD_TIMEOUT is reported as
+such. Reports turns per second, failed turns, and whether the orders and
+bookings in the database match the confirmations the clients received.
+
+Every mode is run twice: against the local SQLite file as is, and with a
+simulated round trip of latency_ms per statement, as with a database server.
+Agent turns are mostly Python work that holds the GIL, so without latency
+scoped sessions can at best keep up with the locked session. With latency
+they must be faster, or the benchmark fails.
+
+Run from the backend directory:
+    python benchmarks/bench_concurrent_sessions.py [clients] [conversations per client] [latency_ms]
+"""
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from common import BOOKING_TURNS, ORDER_TURNS, RESTAURANT_INFO, create_database
+
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+from agent import RestaurantAgent
+from database import MAX_OVERFLOW, POOL_SIZE, serialize_writes, set_sqlite_pragmas
+from models import Order, TableBooking
+
+CHILD_TIMEOUT = 60
+
+
+def create_app_database(path, latency):
+    """Scratch database with the engine settings of database.py"""
+    engine = create_database(path, free_tables=100000, poolclass=QueuePool,
+                             pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
+    engine.dispose()
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    serialize_writes(engine)
+
+    if latency:
+        @event.listens_for(engine, "before_cursor_execute")
+        def round_trip(conn, cursor, statement, parameters, context, executemany):
+            time.sleep(latency)
+
+    return engine
+
+
+def run(mode, clients, conversations, directory, latency=0.0):
+    engine = create_app_database(os.path.join(directory, f'{mode}.db'), latency)
+    registry = scoped_session(sessionmaker(bind=engine))
+    agent = RestaurantAgent(registry if mode == 'scoped' else registry(), RESTAURANT_INFO)
+    if mode == 'scoped':
+        registry.remove()
+    turn_lock = threading.Lock() if mode == 'locked' else contextlib.nullcontext()
+
+    results = {'turns': 0, 'failed': 0, 'orders': 0, 'bookings': 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients)
+
+    def client(client_id):
+        barrier.wait()
+        counts = {'turns': 0, 'failed': 0, 'orders': 0, 'bookings': 0}
+        for n in range(conversations):
+            session_id = f"{mode}-{client_id}-{n}"
+            turns = ORDER_TURNS if n % 2 == 0 else BOOKING_TURNS
+            for message in turns:
+                try:
+                    with turn_lock:
+                        response = agent.process_message(message, session_id)
+                except Exception:
+                    response = {'error': True}
+                finally:
+                    if mode == 'scoped':
+                        registry.remove()
+                counts['turns'] += 1
+                if 'error' in response or 'error processing' in response.get('text', ''):
+                    counts['failed'] += 1
+                counts['orders'] += 'order' in response
+                counts['bookings'] += 'id' in response.get('booking', {})
+        with lock:
+            for key, value in counts.items():
+                results[key] += value
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        agent.log_writer.close()
+
+    session = sessionmaker(bind=engine)()
+    results['db_orders'] = session.query(Order).count()
+    results['db_bookings'] = session.query(TableBooking).count()
+    session.close()
+    engine.dispose()
+    return results, elapsed
+
+
+def run_child(mode, clients, conversations, latency_ms):
+    """Run one mode in a child process; returns (results, elapsed) or an error string"""
+    try:
+        child = subprocess.run(
+            [sys.executable, '-W', 'ignore', os.path.abspath(__file__), mode,
+             str(clients), str(conversations), str(latency_ms)],
+            capture_output=True, text=True, timeout=CHILD_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        return f"did not finish within {CHILD_TIMEOUT}s"
+    if child.returncode != 0:
+        if child.returncode < 0:
+            return f"crashed with signal {-child.returncode}"
+        return f"exited with code {child.returncode}: {child.stderr.strip().splitlines()[-1:]}"
+    return json.loads(child.stdout.strip().splitlines()[-1])
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in ('shared', 'locked', 'scoped'):
+        mode, clients, conversations = sys.argv[1], int(sys.argv[2]), int(sys.argv[3])
+        with tempfile.TemporaryDirectory() as directory:
+            results, elapsed = run(mode, clients, conversations, directory, float(sys.argv[4]) / 1000)
+        print(json.dumps([results, elapsed]))
+        return
+
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    conversations = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    latency_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    expected_orders = clients * ((conversations + 1) // 2)
+    expected_bookings = clients * (conversations // 2)
+    print(f"{clients} clients x {conversations} conversations "
+          f"({expected_orders} orders, {expected_bookings} bookings expected)")
+
+    for latency in (0, latency_ms):
+        print(f"database latency {latency} ms per statement")
+        outcome = {}
+        for mode in ('shared', 'locked', 'scoped'):
+            outcome[mode] = run_child(mode, clients, conversations, latency)
+            if isinstance(outcome[mode], str):
+                print(f"  {mode:>6}: {outcome[mode]}")
+                continue
+            results, elapsed = outcome[mode]
+            consistent = (results['orders'] == results['db_orders']
+                          and results['bookings'] == results['db_bookings'])
+            print(f"  {mode:>6}: {results['turns'] / elapsed:7.0f} turns/s, "
+                  f"{results['failed']} failed turns, "
+                  f"orders {results['orders']} confirmed / {results['db_orders']} stored, "
+                  f"bookings {results['bookings']} confirmed / {results['db_bookings']} stored"
+                  f"{'' if consistent else '  INCONSISTENT'}")
+
+        assert not isinstance(outcome['scoped'], str), "scoped sessions did not complete"
+        results, elapsed = outcome['scoped']
+        assert results['failed'] == 0, "scoped sessions had failed turns"
+        assert (results['db_orders'], results['db_bookings']) == (expected_orders, expected_bookings)
+        assert not isinstance(outcome['locked'], str), "the locked session did not complete"
+        locked_results, locked_elapsed = outcome['locked']
+        speedup = (results['turns'] / elapsed) / (locked_results['turns'] / locked_elapsed)
+        print(f"  scoped sessions: {speedup:.2f}x the throughput of a locked shared session")
+        if latency:
+            assert speedup > 1, f"scoped sessions are not faster than a locked session at {latency} ms"
+
+    print(f"OK: scoped sessions completed all {expected_orders} orders and {expected_bookings} bookings")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/bench_conversation_log.py
+"""
+Benchmark for conversation logging
+
+Compares one session.add() + commit() per chat turn with the group-commit
+ConversationLogWriter, with several threads logging at once against a
+scratch SQLite file.
+
+Run from the backend directory:
+    python benchmarks/bench_conversation_log.py [threads] [rows per thread]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import common  # noqa: F401  (puts the backend directory on sys.path)
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from agent.conversation_log import ConversationLogWriter
+from models import Base, Conversation
+
+
+def run_threads(threads, target):
+    workers = [threading.Thread(target=target, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    rows = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    total = threads * rows
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(directory, 'log.db')}",
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        Base.metadata.create_all(engine)
+        Session = scoped_session(sessionmaker(bind=engine))
+
+        def commit_per_turn(worker_id):
+            session = Session()
+            for i in range(rows):
+                session.add(Conversation(session_id=f"sync-{worker_id}", user_message=f"message {i}",
+                                         bot_response="response"))
+                session.commit()
+            Session.remove()
+
+        sync_seconds = run_threads(threads, commit_per_turn)
+
+        writer = ConversationLogWriter(engine).start()
+
+        def enqueue(worker_id):
+            for i in range(rows):
+                writer.write(f"batched-{worker_id}", f"message {i}", "response")
+
+        started = time.perf_counter()
+        enqueue_seconds = run_threads(threads, enqueue)
+        writer.flush()
+        batched_seconds = time.perf_counter() - started
+        writer.close()
+        stats = writer.stats()
+
+        session = Session()
+        count = session.query(Conversation).filter(Conversation.session_id.like('batched-%')).count()
+        session.close()
+
+    print(f"{threads} threads x {rows} rows")
+    print(f"commit per turn   {sync_seconds:6.2f}s  {total / sync_seconds:8.0f} rows/s")
+    print(f"group commit      {batched_seconds:6.2f}s  {total / batched_seconds:8.0f} rows/s written, "
+          f"{stats['batches']} transactions (avg {stats['avg_batch']} rows)")
+    print(f"  hot path only enqueues: {enqueue_seconds / total * 1e6:.1f} us/row")
+    assert count == total, f"{count} of {total} rows written"
+    print("OK: every batched row was written")
+
+
+if __name__ == '__main__':
+    main()
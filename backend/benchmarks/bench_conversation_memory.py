@@ -0,0 +1,103 @@
+# benchmarks/bench_conversation_memory.py
+"""
+Memory benchmark for conversation state
+
+Builds synthetic sessions of a typical ordering conversation in the old
+representation (nested dicts, with the full history and the classification
+of every turn) and with ConversationState records, and reports the bytes
+per session measured with tracemalloc.
+
+Run from the backend directory:
+    python benchmarks/bench_conversation_memory.py [sessions]
+"""
+import contextlib
+import io
+import json
+import sys
+import tracemalloc
+
+from common import load_menu
+
+from agent.conversation_state import Cart, ConversationState
+from agent.intent_classifier import IntentClassifier
+from agent.menu_snapshot import MenuSnapshot
+
+TURNS = [
+    ("I would like to order food", "I'd be happy to take your order. What would you like to have?"),
+    ("2 margherita pizza", "What else would you like to order? Or say 'that's all' if you're done."),
+    ("and a caprese salad", "What else would you like to order? Or say 'that's all' if you're done."),
+    ("that's all", "Here's your order summary:\n- 2x Margherita Pizza ($12.99 each)\n- 1x Caprese Salad"),
+    ("yes", "May I have your name and a phone number for the order?"),
+    ("my name is Jane Doe", "How can we contact you? Please provide a phone number or email."),
+]
+CART_ITEMS = [
+    {'id': 1, 'name': 'Margherita Pizza', 'price': 12.99, 'quantity': 2, 'confidence': 1.0},
+    {'id': 2, 'name': 'Caprese Salad', 'price': 9.49, 'quantity': 1, 'confidence': 1.0},
+]
+
+
+def copy(data):
+    """Deep copy through JSON, so every session has its own objects like real requests"""
+    return json.loads(json.dumps(data))
+
+
+def legacy_session(session_id, classifications):
+    """A conversation in the old nested-dict representation"""
+    history = []
+    for (user, bot), classification in zip(TURNS, classifications):
+        history.append({'user': f"{user} #{session_id}", 'classification': copy(classification)})
+        history.append({'bot': f"{bot} #{session_id}"})
+    return {
+        'session_id': session_id,
+        'state': 'ordering',
+        'context': {
+            'ordering': {
+                'items': copy(CART_ITEMS),
+                'stage': 'customer_details',
+                'customer_info': {'name': 'jane doe'}
+            }
+        },
+        'history': history
+    }
+
+
+def record_session(session_id):
+    """The same conversation as ConversationState records"""
+    conversation = ConversationState(session_id, 'ordering', Cart('customer_details', copy(CART_ITEMS), {'name': 'jane doe'}))
+    for user, _ in TURNS:
+        conversation.history.append(f"{user} #{session_id}")
+    return conversation
+
+
+def measure(build, sessions):
+    """Build the sessions and return the bytes allocated per session"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = {}
+    for i in range(sessions):
+        session_id = f"{i:036d}"
+        store[session_id] = build(session_id)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / sessions
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    menu = MenuSnapshot.from_dicts(load_menu())
+    classifier = IntentClassifier()
+    with contextlib.redirect_stdout(io.StringIO()):
+        classifier.set_menu_items(menu)
+        classifications = [classifier.classify_intent(user) for user, _ in TURNS]
+
+    legacy = measure(lambda session_id: legacy_session(session_id, classifications), sessions)
+    records = measure(record_session, sessions)
+
+    print(f"{sessions} sessions of {len(TURNS)} turns")
+    print(f"nested dicts with full history  {legacy:8.0f} bytes/session")
+    print(f"ConversationState records        {records:8.0f} bytes/session ({legacy / records:.1f}x smaller)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_intent_classifier.py
+"""
+Microbenchmark for IntentClassifier pattern matching
+
+Compares the per-pattern re.findall() scan with the compiled matchers and
+checks that both produce the same scores and entities, and that typos which
+the spelling corrector could turn into another intent are still classified
+as intended.
+
+Run from the backend directory:
+    python benchmarks/bench_intent_classifier.py
+"""
+import re
+import timeit
+
+from common import load_menu
+
+from agent.intent_classifier import IntentClassifier
+from agent.menu_snapshot import MenuSnapshot
+
+MESSAGES = [
+    "hi there",
+    "I would like to order 2 margherita pizza and a caprese salad",
+    "can I book a table for 4 tomorrow at 7:30 pm",
+    "what are your opening hours on sunday",
+    "yes that's right",
+    "no, cancel that please",
+    "my name is Jane Doe, phone 555-123-4567, email jane@example.com",
+    "do you have anything with mushroom or paneer? I'm hungry",
+    "next friday at 8pm for a couple of people",
+    "what can you do to help me",
+]
+# Typos -> intent; "yess" is as close to "less" and "hellp" to "hello"
+TYPOS = {
+    "yess": 'affirm',
+    "yess please": 'affirm',
+    "yes": 'affirm',
+    "hellp": 'help',
+    "helo": 'greeting',
+    "resrvation for 2": 'book_table',
+    "i want to ordr food": 'order_food',
+}
+
+
+def legacy_scan(classifier, message):
+    """Score intents and extract raw entities with one re.findall per pattern"""
+    message = message.lower()
+    scores = {
+        intent: sum(len(re.findall(pattern, message)) for pattern in patterns)
+        for intent, patterns in classifier.intents.items()
+    }
+    entities = {
+        entity_type: [re.findall(pattern, message, re.IGNORECASE) for pattern in patterns]
+        for entity_type, patterns in classifier.entities.items()
+    }
+    return scores, entities
+
+
+def compiled_scan(classifier, message):
+    """Score intents and extract raw entities with the compiled matchers"""
+    message = message.lower()
+    scores = {
+        intent: matcher.count(message)
+        for intent, matcher in classifier.intent_matchers.items()
+    }
+    entities = {
+        entity_type: matcher.findall(message)
+        for entity_type, matcher in classifier.entity_matchers.items()
+    }
+    return scores, entities
+
+
+def main():
+    menu_items = load_menu()
+
+    classifier = IntentClassifier()
+    classifier.set_menu_items(MenuSnapshot.from_dicts(menu_items))
+
+    for message in MESSAGES:
+        assert legacy_scan(classifier, message) == compiled_scan(classifier, message), message
+
+    for message, expected in TYPOS.items():
+        intent = classifier.classify_intent(message)['intent']
+        assert intent == expected, f"{message!r} classified as {intent}, expected {expected}"
+
+    rounds = 2000
+    for label, scan in (('re.findall per pattern', legacy_scan), ('compiled matchers', compiled_scan)):
+        seconds = timeit.timeit(lambda: [scan(classifier, m) for m in MESSAGES], number=rounds)
+        print(f"{label:<24} {seconds / (rounds * len(MESSAGES)) * 1e6:8.1f} us/message")
+
+
+if __name__ == '__main__':
+    main()
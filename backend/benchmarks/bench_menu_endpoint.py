@@ -0,0 +1,78 @@
+# benchmarks/bench_menu_endpoint.py
+"""
+Benchmark for GET /api/menu
+
+Imports the app with a scratch database (the working directory is switched
+to a temporary directory first) and measures requests per second with
+Flask's test client for:
+
+- jsonify: the previous handler, which rebuilt and re-serialized the menu
+  on every request (registered under a benchmark-only URL)
+- 200: the current handler without If-None-Match, sending the body
+  serialized once per menu version
+- 304: the current handler with the ETag in If-None-Match
+
+Run from the backend directory:
+    python benchmarks/bench_menu_endpoint.py [requests]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from common import BACKEND_DIR
+
+
+def measure(client, url, requests, headers=None):
+    started = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(url, headers=headers)
+    elapsed = time.perf_counter() - started
+    return requests / elapsed, response
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as app_module
+        from flask import jsonify
+
+        app = app_module.app
+
+        def get_menu_jsonify():
+            menu = app_module.agent.menu
+            return jsonify({
+                'menu': menu.to_dicts(),
+                'version': menu.version
+            })
+
+        app.add_url_rule('/bench/menu-jsonify', 'bench_menu_jsonify', get_menu_jsonify)
+        client = app.test_client()
+
+        old_rps, old = measure(client, '/bench/menu-jsonify', requests)
+        new_rps, new = measure(client, '/api/menu', requests)
+        etag = new.headers['ETag']
+        cached_rps, cached = measure(client, '/api/menu', requests, headers={'If-None-Match': etag})
+
+        app_module.agent.log_writer.close()
+        os.chdir(BACKEND_DIR)
+
+    print(f"{requests} requests each")
+    print(f"jsonify per request  {old_rps:8.0f} req/s  {len(old.data):6d} bytes")
+    print(f"pre-serialized 200   {new_rps:8.0f} req/s  {len(new.data):6d} bytes  ({new_rps / old_rps:.1f}x)")
+    print(f"If-None-Match 304    {cached_rps:8.0f} req/s  {len(cached.data):6d} bytes  ({cached_rps / old_rps:.1f}x)")
+    print(f"ETag {etag}, Cache-Control: {new.headers['Cache-Control']}")
+
+    assert new.status_code == 200 and cached.status_code == 304
+    assert new.get_json() == old.get_json(), "the menu body changed"
+    assert cached.data == b'' and cached.headers['ETag'] == etag
+    print("OK: same menu body, and revalidation returns 304")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# benchmarks/bench_menu_index.py
+"""
+Benchmark for MenuIndex lookups on a large synthetic menu
+
+Run from the backend directory:
+    python benchmarks/bench_menu_index.py
+"""
+import random
+import timeit
+from types import SimpleNamespace
+
+from common import load_menu
+
+from agent.menu_index import MenuIndex
+
+MESSAGES = [
+    "2 margherita pizza and a caprese salad",
+    "can I get the mushroom risotto x2 please",
+    "two vegetarian lasagna",
+    "i'd like some pizzas",
+    "what do you have",
+]
+
+
+def pseudo_word(rng):
+    """Generate a pronounceable made-up dish word"""
+    syllables = ['ba', 'ko', 'ri', 'ta', 'mu', 'sen', 'lo', 'fa', 'zu', 'pe', 'gar', 'ni', 'do', 'vel']
+    return ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+
+
+def synthetic_menu(menu_items, size):
+    """
+    Extend the real menu with generated items
+
+    Each generated name mixes one word from the real menu, which makes common
+    words like "salad" appear in hundreds of items, with made-up dish words.
+    """
+    rng = random.Random(42)
+    words = sorted({word for item in menu_items for word in item['name'].split()})
+    vocabulary = [pseudo_word(rng).capitalize() for _ in range(size // 2)]
+    items = [SimpleNamespace(**item) for item in menu_items]
+    for i in range(len(items), size):
+        name = ' '.join([rng.choice(words)] + rng.sample(vocabulary, 2))
+        items.append(SimpleNamespace(id=i + 1, name=name, price=round(rng.uniform(5, 25), 2)))
+    return items
+
+
+def main():
+    menu_items = load_menu()
+
+    for size in (len(menu_items), 1000, 10000):
+        menu = synthetic_menu(menu_items, size)
+        build_seconds = timeit.timeit(lambda: MenuIndex(menu), number=1)
+        index = MenuIndex(menu)
+
+        rounds = 200
+        seconds = timeit.timeit(lambda: [index.search(m) for m in MESSAGES], number=rounds)
+        print(f"{size:>6} items: build {build_seconds * 1e3:7.1f} ms, "
+              f"search {seconds / (rounds * len(MESSAGES)) * 1e6:7.1f} us/message")
+
+    index = MenuIndex(synthetic_menu(menu_items, len(menu_items)))
+    for message in MESSAGES:
+        print(f"  {message!r}: {[(item.name, quantity) for item, quantity, _ in index.search(message)]}")
+
+
+if __name__ == '__main__':
+    main()
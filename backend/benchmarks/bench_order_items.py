@@ -0,0 +1,127 @@
+# benchmarks/bench_order_items.py
+"""
+Benchmark for creating orders with many lines
+
+Creates orders of 1, 10 and 100 lines in two scratch SQLite files:
+
+- per line: the previous create_order, one ORM insert per order item,
+  followed by order.to_dict() after the commit, which reloads the order,
+  its items and the menu item of every line
+- bulk: OrderHandler.create_order, which inserts all items with one
+  executemany and loads them back with their menu items in one query
+
+Reports statements and time per order, and checks that both paths return
+the same order payload.
+
+Run from the backend directory:
+    python benchmarks/bench_order_items.py [orders per size]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from common import create_database
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from agent.menu_snapshot import MenuSnapshot
+from agent.order_handler import OrderHandler
+from agent.unit_of_work import UnitOfWork
+from models import Order, OrderItem
+
+CUSTOMER = {'name': 'Catering Customer', 'email': 'catering@example.com', 'phone': '555-0100'}
+SIZES = (1, 10, 100)
+
+
+def create_order_per_line(session, customer_info, items):
+    """The previous create_order: one ORM insert per line, then the payload after commit"""
+    order = Order(
+        customer_name=customer_info.get('name', 'Guest'),
+        customer_email=customer_info.get('email'),
+        customer_phone=customer_info.get('phone'),
+        total_amount=round(sum(item['price'] * item['quantity'] for item in items), 2),
+        status='confirmed'
+    )
+    session.add(order)
+    session.flush()
+    for item in items:
+        session.add(OrderItem(order_id=order.id, menu_item_id=item['id'],
+                              quantity=item['quantity'], price=item['price']))
+    session.commit()
+    return order.to_dict()
+
+
+def create_order_bulk(session, handler, customer_info, items):
+    unit_of_work = UnitOfWork(session)
+    order = handler.create_order(customer_info, items, unit_of_work)
+    payload = order.to_dict()
+    unit_of_work.commit()
+    return payload
+
+
+def order_lines(menu, size):
+    """Order lines as the cart holds them, cycling through the menu"""
+    items = menu.items
+    return [
+        {
+            'id': items[i % len(items)].id,
+            'name': items[i % len(items)].name,
+            'price': items[i % len(items)].price,
+            'quantity': 1 + i % 3
+        }
+        for i in range(size)
+    ]
+
+
+def run(engine, orders, create):
+    statements = [0]
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements[0] += 1
+
+    session = sessionmaker(bind=engine)()
+    menu = MenuSnapshot.from_session(session)
+    handler = OrderHandler(session, menu)
+    results = {}
+    for size in SIZES:
+        items = order_lines(menu, size)
+        payloads = []
+        statements[0] = 0
+        started = time.perf_counter()
+        for _ in range(orders):
+            payloads.append(create(session, handler, items))
+            session.close()
+        elapsed = time.perf_counter() - started
+        results[size] = (statements[0] / orders, elapsed / orders * 1000, payloads)
+    event.remove(engine, 'before_cursor_execute', count)
+    return results
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    with tempfile.TemporaryDirectory() as directory:
+        per_line = run(create_database(os.path.join(directory, 'per_line.db')), orders,
+                       lambda session, handler, items: create_order_per_line(session, CUSTOMER, items))
+        bulk = run(create_database(os.path.join(directory, 'bulk.db')), orders,
+                   lambda session, handler, items: create_order_bulk(session, handler, CUSTOMER, items))
+
+    print(f"{orders} orders per size; statements and milliseconds per order")
+    print(f"{'lines':>6} {'per line':>22} {'bulk':>22} {'speedup':>8}")
+    for size in SIZES:
+        old_statements, old_ms, old_payloads = per_line[size]
+        new_statements, new_ms, new_payloads = bulk[size]
+        print(f"{size:>6} {old_statements:>8.0f} stmts {old_ms:>6.2f} ms "
+              f"{new_statements:>8.0f} stmts {new_ms:>6.2f} ms {old_ms / new_ms:>7.1f}x")
+        for old, new in zip(old_payloads, new_payloads):
+            old.pop('order_date')
+            new.pop('order_date')
+            assert old == new, f"payloads differ for {size} lines:\n{old}\n{new}"
+    print("OK: both paths return the same order payload")
+
+
+if __name__ == '__main__':
+    main()
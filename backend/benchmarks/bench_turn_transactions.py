@@ -0,0 +1,145 @@
+# benchmarks/bench_turn_transactions.py
+"""
+Benchmark of database transactions per completed order and booking
+
+Plays complete order and booking conversations through RestaurantAgent
+against a scratch SQLite file and counts, per completed conversation, the
+transactions committed by the chat turns, the batches written by the
+conversation log writer, and the statements the turns executed.
+
+It then makes the commit of a booking fail once and checks that nothing of
+the turn is kept: no booking, no log row, no change to the availability in
+the database or the cache, and a conversation that can simply retry.
+
+Run from the backend directory:
+    python benchmarks/bench_turn_transactions.py [conversations]
+"""
+import collections
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+
+from common import BOOKING_TIME, BOOKING_TURNS, ORDER_TURNS, RESTAURANT_INFO, create_database, tomorrow
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+
+from agent import RestaurantAgent
+from models import Conversation, Order, TableAvailability, TableBooking
+
+CONVERSATIONS = {'order': ORDER_TURNS, 'booking': BOOKING_TURNS}
+LOG_WRITER_THREAD = 'conversation-log-writer'
+
+
+def check_failed_commit(agent, registry, engine):
+    """Fail the commit of a booking once, then retry the same message"""
+    session_id = 'failed-commit'
+    date = tomorrow()
+
+    def snapshot():
+        agent.log_writer.flush()
+        session = registry()
+        available = session.query(TableAvailability.available).filter_by(date=date, time=BOOKING_TIME).scalar()
+        bookings = session.query(TableBooking).count()
+        logged = session.query(Conversation).filter_by(session_id=session_id).count()
+        registry.remove()
+        return available, bookings, logged
+
+    def fail_commit(session):
+        event.remove(Session, 'before_commit', fail_commit)
+        raise RuntimeError("simulated commit failure")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for message in CONVERSATIONS['booking'][:-1]:
+            agent.process_message(message, session_id)
+            registry.remove()
+        before = snapshot()
+        cached_before = agent.booking_handler.cache.get(date)
+
+        event.listen(Session, 'before_commit', fail_commit)
+        failed = agent.process_message(CONVERSATIONS['booking'][-1], session_id)
+        registry.remove()
+        after_failure = snapshot()
+        cached_after_failure = agent.booking_handler.cache.get(date)
+
+        retried = agent.process_message(CONVERSATIONS['booking'][-1], session_id)
+        registry.remove()
+        after_retry = snapshot()
+
+    assert 'error' in failed, "a failed commit must not be reported as a booking"
+    assert after_failure[:2] == before[:2], "the failed turn left database changes"
+    assert after_failure[2] == before[2], "the failed turn was logged"
+    assert cached_after_failure == cached_before, "the failed turn changed the availability cache"
+    assert 'booking' in retried and after_retry[1] == before[1] + 1, "the retry did not book"
+    return before, after_failure, after_retry
+
+
+def main():
+    conversations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database(os.path.join(directory, 'turns.db'), free_tables=100000)
+        registry = scoped_session(sessionmaker(bind=engine))
+        agent = RestaurantAgent(registry, RESTAURANT_INFO)
+        registry.remove()
+
+        counts = collections.Counter()
+
+        def source():
+            return 'log' if threading.current_thread().name == LOG_WRITER_THREAD else 'turn'
+
+        @event.listens_for(engine, 'commit')
+        def on_commit(conn):
+            counts[(source(), 'commit')] += 1
+
+        @event.listens_for(engine, 'rollback')
+        def on_rollback(conn):
+            counts[(source(), 'rollback')] += 1
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            counts[(source(), statement.split(None, 1)[0].upper())] += 1
+
+        results = {}
+        for kind, turns in CONVERSATIONS.items():
+            counts.clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for n in range(conversations):
+                    for message in turns:
+                        agent.process_message(message, f"{kind}-{n}")
+                        registry.remove()
+                agent.log_writer.flush()
+            results[kind] = dict(counts)
+
+        session = registry()
+        stored = {'order': session.query(Order).count(), 'booking': session.query(TableBooking).count()}
+        registry.remove()
+
+        rollback = check_failed_commit(agent, registry, engine)
+        agent.log_writer.close()
+
+    print(f"{conversations} conversations of each kind, per completed conversation:")
+    for kind, result in results.items():
+        per = lambda key: result.get(key, 0) / conversations
+        statements = {
+            verb: per(('turn', verb))
+            for verb in ('SELECT', 'INSERT', 'UPDATE')
+            if per(('turn', verb))
+        }
+        print(f"  {kind:>7}: {per(('turn', 'commit')):4.1f} turn commits, "
+              f"{per(('log', 'commit')):4.2f} log writer commits, "
+              f"statements {', '.join(f'{verb} {count:.1f}' for verb, count in statements.items())}")
+        assert stored[kind] == conversations, f"{stored[kind]} {kind}s stored"
+
+    before, after_failure, after_retry = rollback
+    print(f"failed commit: free tables {before[0]} -> {after_failure[0]}, "
+          f"bookings {before[1]} -> {after_failure[1]}, log rows {before[2]} -> {after_failure[2]}; "
+          f"retry: bookings {after_retry[1]}, free tables {after_retry[0]}")
+    print("OK: one transaction per completed conversation, and a failed turn keeps nothing")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/check_availability_cache.py
+"""
+Randomized consistency check for the availability cache
+
+Runs a random mix of availability reads and bookings against a scratch SQLite
+database through a BookingHandler with a small availability cache (so entries
+are evicted all the time) and compares every answer with a handler that has
+caching disabled and always reads the database.
+
+Also loads a date between the commit of a booking and its write-through to
+the cache, and checks that the reservation is not applied twice.
+
+Run from the backend directory:
+    python benchmarks/check_availability_cache.py [operations] [seed]
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+
+import common  # noqa: F401  (puts the backend directory on sys.path)
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from agent.availability import AvailabilityCache
+from agent.booking_handler import BookingHandler
+from models import Base, TableAvailability
+
+DAYS = 30
+TIMES = ['11:00 AM', '1:00 PM', '5:00 PM', '6:00 PM', '7:00 PM', '8:00 PM', '9:00 PM']
+
+
+def check_load_during_commit(Session, date):
+    """Load the booked date after the commit, before the cache is adjusted"""
+    cache = AvailabilityCache()
+    booking_session = Session()
+    booker = BookingHandler(booking_session, cache=cache)
+    reader = BookingHandler(Session(), cache=cache)
+
+    def load_in_window(session):
+        reader.load_slots([date])
+
+    event.listen(booking_session, 'after_commit', load_in_window)
+    booker.create_booking({'name': 'Guest'}, {'date': date, 'time': TIMES[0], 'guests': 1})
+    event.remove(booking_session, 'after_commit', load_in_window)
+
+    expected = BookingHandler(Session(), cache=AvailabilityCache(max_dates=0)).get_available_times(date)
+    cached = reader.get_available_times(date)
+    print(f"load during commit: cached {cached}, database {expected}")
+    assert cached == expected, "the reservation was applied twice"
+
+
+def main():
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    rng = random.Random(seed)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f"sqlite:///{os.path.join(directory, 'cache.db')}")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        session = Session()
+        today = datetime.datetime.now().date()
+        dates = [(today + datetime.timedelta(days=i)).strftime('%Y-%m-%d') for i in range(DAYS)]
+        for date in dates:
+            for time in TIMES:
+                session.add(TableAvailability(date=date, time=time, available=rng.randint(0, 4)))
+        session.commit()
+
+        cache = AvailabilityCache(max_dates=5)
+        cached = BookingHandler(session, cache=cache)
+        uncached = BookingHandler(session, cache=AvailabilityCache(max_dates=0))
+
+        counts = {'reads': 0, 'booked': 0, 'rejected': 0}
+        for step in range(operations):
+            # Include a date with no slots at all
+            date = rng.choice(dates + ['2001-01-01'])
+            time = rng.choice(TIMES)
+            guests = rng.randint(1, 10)
+            operation = rng.random()
+
+            if operation < 0.3:
+                try:
+                    cached.create_booking({'name': 'Guest'}, {'date': date, 'time': time, 'guests': guests})
+                    counts['booked'] += 1
+                except ValueError:
+                    counts['rejected'] += 1
+                continue
+
+            counts['reads'] += 1
+            if operation < 0.5:
+                days = rng.randint(1, DAYS)
+                assert cached.get_available_dates(days) == uncached.get_available_dates(days), (step, days)
+            elif operation < 0.8:
+                assert cached.get_available_times(date) == uncached.get_available_times(date), (step, date)
+            else:
+                assert cached.is_table_available(date, time, guests) == \
+                    uncached.is_table_available(date, time, guests), (step, date, time, guests)
+
+        session.close()
+
+        # A free slot for the race check
+        session = Session()
+        session.add(TableAvailability(date='2001-01-02', time=TIMES[0], available=10))
+        session.commit()
+        session.close()
+        check_load_during_commit(Session, '2001-01-02')
+
+    print(f"{operations} operations: {counts['reads']} reads, "
+          f"{counts['booked']} bookings, {counts['rejected']} rejected")
+    print(f"cache: {cache.stats()}")
+    print("OK: cached answers match the database")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+# benchmarks/check_export.py
+"""
+Check for the NDJSON export endpoints, GET /api/export/<table>
+
+Imports the app with a scratch database (the working directory is switched
+to a temporary directory first), fills it with orders, bookings and
+conversation log rows, and reads every export with Flask's test client
+without buffering the response. The same is done after growing the tables
+tenfold, to check that:
+
+- the peak memory of an export stays flat while the tables grow, unlike
+  the previous unbounded /api/orders, which is registered under a
+  benchmark-only URL for comparison
+- each chunk of the orders export runs the same number of queries
+- every row is exported once, in id order, and since=<X-Export-Watermark>
+  exports only the rows added afterwards
+
+Run from the backend directory:
+    python benchmarks/check_export.py [rows]
+"""
+import contextlib
+import datetime
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import BACKEND_DIR
+
+# Queries per chunk of the orders export: orders, then their items with menu items
+ORDER_CHUNK_QUERIES = 2
+
+
+def seed(engine, menu_ids, rows, rng):
+    """Add rows orders (with 1 to 6 items), bookings and conversation rows"""
+    from models import Conversation, Order, OrderItem, TableBooking
+
+    now = datetime.datetime.utcnow()
+    with engine.begin() as conn:
+        first_order = conn.execute(Order.__table__.select().with_only_columns(
+            [Order.__table__.c.id]).order_by(Order.__table__.c.id.desc()).limit(1)).scalar() or 0
+        conn.execute(Order.__table__.insert(), [
+            {'id': first_order + n + 1, 'customer_name': f"Customer {n}", 'customer_email': 'customer@example.com',
+             'total_amount': 10.0, 'order_date': now, 'status': 'confirmed'}
+            for n in range(rows)
+        ])
+        conn.execute(OrderItem.__table__.insert(), [
+            {'order_id': first_order + n + 1, 'menu_item_id': item_id, 'quantity': 1, 'price': 1.0}
+            for n in range(rows)
+            for item_id in rng.sample(menu_ids, rng.randint(1, 6))
+        ])
+        conn.execute(TableBooking.__table__.insert(), [
+            {'customer_name': f"Guest {n}", 'date': '2030-01-01', 'time': '7:00 PM', 'guests': 2,
+             'booking_date': now, 'status': 'confirmed'}
+            for n in range(rows)
+        ])
+        conn.execute(Conversation.__table__.insert(), [
+            {'session_id': f"session-{n % 100}", 'user_message': 'I want to order food',
+             'bot_response': json.dumps({'message': 'What would you like to order?'}), 'timestamp': now}
+            for n in range(rows)
+        ])
+
+
+def export(client, table, counter, since=None):
+    """Read an export chunk by chunk; returns the ids, the watermark and the queries per chunk"""
+    url = f"/api/export/{table}" + (f"?since={since}" if since is not None else '')
+    counter[0] = 0
+    response = client.get(url, buffered=False)
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    ids, chunks = [], 0
+    for chunk in response.response:
+        chunks += 1
+        for line in chunk.decode('utf-8').splitlines():
+            ids.append(json.loads(line)['id'])
+    response.close()
+    # One query for the watermark, then the chunks
+    per_chunk = (counter[0] - 1) / chunks if chunks else 0
+    return ids, int(response.headers['X-Export-Watermark']), per_chunk
+
+
+def peak_memory(function):
+    tracemalloc.start()
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 / 1024, elapsed
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rng = random.Random(5)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as app_module
+        from flask import jsonify
+        from sqlalchemy import event
+        from models import MenuItem, Order
+
+        app = app_module.app
+        engine = app_module.engine
+        session = app_module.Session()
+        menu_ids = [item_id for item_id, in session.query(MenuItem.id)]
+        app_module.remove_session()
+
+        def get_orders_unbounded():
+            session = app_module.get_session()
+            return jsonify({'orders': [order.to_dict() for order in session.query(Order).all()]})
+
+        app.add_url_rule('/bench/orders-all', 'bench_orders_all', get_orders_unbounded)
+        client = app.test_client()
+
+        counter = [0]
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            counter[0] += 1
+
+        event.listen(engine, 'before_cursor_execute', count)
+
+        results = []
+        total = 0
+        for size in (rows, rows * 10):
+            seed(engine, menu_ids, size - total, rng)
+            total = size
+            exported = {}
+            for table in ('orders', 'bookings', 'conversations'):
+                ids, watermark, per_chunk = export(client, table, counter)
+                assert ids == sorted(ids) and len(ids) == len(set(ids)) == total, f"{table}: {len(ids)} rows"
+                assert watermark == ids[-1], f"{table}: watermark {watermark}, last id {ids[-1]}"
+                exported[table] = watermark
+                if table == 'orders':
+                    assert per_chunk == ORDER_CHUNK_QUERIES, f"orders: {per_chunk} queries per chunk"
+
+            export_mb, export_s = peak_memory(lambda: export(client, 'orders', counter))
+            unbounded_mb, unbounded_s = peak_memory(lambda: client.get('/bench/orders-all'))
+            results.append((size, export_mb, export_s, unbounded_mb, unbounded_s))
+
+        # Incremental pull: only the rows added after the watermark
+        seed(engine, menu_ids, 10, rng)
+        for table, watermark in exported.items():
+            ids, new_watermark, _ = export(client, table, counter, since=watermark)
+            assert ids == list(range(watermark + 1, watermark + 11)), f"{table}: since exported {ids}"
+            assert new_watermark == watermark + 10
+            ids, same_watermark, _ = export(client, table, counter, since=new_watermark)
+            assert ids == [] and same_watermark == new_watermark, f"{table}: nothing new"
+
+        event.remove(engine, 'before_cursor_execute', count)
+        app_module.agent.log_writer.close()
+        os.chdir(BACKEND_DIR)
+
+    print(f"peak traced memory reading every order (chunks of {app_module.config.EXPORT_CHUNK_SIZE})")
+    print(f"{'orders':>8} {'NDJSON export':>22} {'unbounded jsonify':>22}")
+    for size, export_mb, export_s, unbounded_mb, unbounded_s in results:
+        print(f"{size:>8} {export_mb:>8.1f} MB {export_s:>8.2f} s {unbounded_mb:>8.1f} MB {unbounded_s:>8.2f} s")
+
+    small, large = results[0][1], results[-1][1]
+    assert large < small * 2, f"export memory grew from {small:.1f} MB to {large:.1f} MB"
+    print("OK: flat export memory, every row once, and since exports only new rows")
+
+
+if __name__ == '__main__':
+    main()
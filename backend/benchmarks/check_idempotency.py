@@ -0,0 +1,114 @@
+# benchmarks/check_idempotency.py
+"""
+Check for idempotency keys on chat turns
+
+Plays order conversations in which every message is sent several times at
+once, like the frontend's retry loop does when the first attempt is slow.
+Runs once without idempotency keys and once with a key per message, then
+counts the stored orders, the pizzas in them and the conversation log rows.
+Also checks that a retry gets its response as it was first sent, even after
+later turns changed the cart.
+
+Run from the backend directory:
+    python benchmarks/check_idempotency.py [conversations] [attempts per message]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import uuid
+
+from common import ORDER_TURNS, RESTAURANT_INFO, create_database
+
+from sqlalchemy import func
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from agent import RestaurantAgent
+from models import Conversation, Order, OrderItem
+
+TURNS = ORDER_TURNS
+
+
+def run(name, use_keys, conversations, attempts, directory):
+    engine = create_database(os.path.join(directory, f'{name}.db'))
+    registry = scoped_session(sessionmaker(bind=engine))
+    agent = RestaurantAgent(registry, RESTAURANT_INFO)
+    registry.remove()
+
+    def send(message, session_id, key):
+        agent.process_message(message, session_id, key)
+        registry.remove()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for n in range(conversations):
+            session_id = f"{name}-{n}"
+            for message in TURNS:
+                key = str(uuid.uuid4()) if use_keys else None
+                threads = [threading.Thread(target=send, args=(message, session_id, key)) for _ in range(attempts)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        agent.log_writer.close()
+
+    session = registry()
+    orders = session.query(Order).count()
+    pizzas = session.query(func.coalesce(func.sum(OrderItem.quantity), 0)).scalar()
+    log_rows = session.query(Conversation).count()
+    registry.remove()
+    engine.dispose()
+
+    stats = agent.idempotency_cache.stats()
+    print(f"{name:>12}: {orders} orders, {pizzas} pizzas, {log_rows} log rows, "
+          f"{stats['deduplicated']} duplicates answered from the cache")
+    return orders, pizzas, log_rows, stats
+
+
+def check_stored_response(directory):
+    """A retry gets the response as it was sent, not the cart as it is now"""
+    engine = create_database(os.path.join(directory, 'stored.db'))
+    registry = scoped_session(sessionmaker(bind=engine))
+    agent = RestaurantAgent(registry, RESTAURANT_INFO)
+    registry.remove()
+
+    def send(message, key):
+        response = agent.process_message(message, 'stored', key)
+        registry.remove()
+        return response
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        send("I want to order food", 'order')
+        first = send("I want to order 2 margherita pizza", 'pizza')
+        expected = [(item['name'], item['quantity']) for item in first['items']]
+        send("I want to order a caprese salad", 'salad')
+        retried = send("I want to order 2 margherita pizza", 'pizza')
+        agent.log_writer.close()
+    engine.dispose()
+
+    items = [(item['name'], item['quantity']) for item in retried['items']]
+    print(f"stored response: {expected}, retried after adding a salad: {items}")
+    assert items == expected == [('Margherita Pizza', 2)], "a later turn changed the stored response"
+
+
+def main():
+    conversations = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    attempts = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    print(f"{conversations} order conversations, every message sent {attempts} times at once")
+    print(f"expected: {conversations} orders, {conversations * 2} pizzas, {conversations * len(TURNS)} log rows")
+    with tempfile.TemporaryDirectory() as directory:
+        run('without keys', False, conversations, attempts, directory)
+        orders, pizzas, log_rows, stats = run('with keys', True, conversations, attempts, directory)
+        check_stored_response(directory)
+
+    assert orders == conversations, f"{orders} orders stored"
+    assert pizzas == conversations * 2, f"{pizzas} pizzas ordered"
+    assert log_rows == conversations * len(TURNS), f"{log_rows} log rows written"
+    assert stats['deduplicated'] == conversations * len(TURNS) * (attempts - 1)
+    print("OK: every retried message was processed once, and gets its response as sent")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/check_menu_matching.py
+"""
+Regression check for menu item matching
+
+Ordinary words must not be matched to a menu item: "price" is close to
+"rice", "roast" to "toast" and "green" to "greek". Checks MenuIndex.search
+with the spelling corrector of the intent classifier, that real item
+mentions (exact, plural, misspelt and partial) are still found, and that
+none of these phrases puts anything in the cart of an ordering
+conversation.
+
+Run from the backend directory:
+    python benchmarks/check_menu_matching.py
+"""
+import contextlib
+import io
+import os
+import tempfile
+
+from common import BACKEND_DIR, load_menu
+
+from agent.intent_classifier import IntentClassifier
+from agent.menu_index import MenuIndex
+from agent.menu_snapshot import MenuSnapshot
+
+NO_MATCH = [
+    "what's the price",
+    "how much is the price",
+    "roast beef",
+    "green tea",
+    "red wine",
+    "a coffee please",
+]
+EXPECTED = {
+    "2 margherita pizza and a caprese salad": ['Margherita Pizza', 'Caprese Salad'],
+    "some pizzas": ['Margherita Pizza'],
+    "piza": ['Margherita Pizza'],
+    "mushroom risoto": ['Mushroom Risotto'],
+    "lasagne": ['Vegetarian Lasagna'],
+    "ravio": ['Spinach and Ricotta Ravioli'],
+    "brushetta": ['Bruschetta'],
+    "avocado tost": ['Avocado Toast'],
+    "chickpea curry with rice": ['Chickpea Curry with Rice'],
+}
+
+
+def check_index():
+    menu = MenuSnapshot.from_dicts(load_menu())
+    classifier = IntentClassifier()
+    classifier.set_menu_items(menu)
+    index = MenuIndex(menu, classifier.spell_corrector)
+
+    for message in NO_MATCH:
+        found = [item.name for item, _, _ in index.search(message)]
+        print(f"  {message!r}: {found}")
+        assert not found, f"{message!r} matched {found}"
+    for message, expected in EXPECTED.items():
+        found = [item.name for item, _, _ in index.search(message)]
+        print(f"  {message!r}: {found}")
+        assert found == expected, f"{message!r} matched {found}, expected {expected}"
+
+
+def check_conversation():
+    """Send each phrase while ordering, then check the cart"""
+    carts = {}
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as app_module
+            client = app_module.app.test_client()
+            for n, message in enumerate(NO_MATCH):
+                session_id = f"menu-matching-{n}"
+                client.post('/api/chat', json={'message': 'I want to order food', 'session_id': session_id})
+                assert app_module.agent.get_or_create_conversation(session_id).state == 'ordering'
+                client.post('/api/chat', json={'message': message, 'session_id': session_id})
+                conversation = app_module.agent.get_or_create_conversation(session_id)
+                carts[message] = [item['name'] for item in conversation.ordering.items] if conversation.ordering else []
+        app_module.agent.log_writer.close()
+        os.chdir(BACKEND_DIR)
+
+    for message, cart in carts.items():
+        print(f"  {message!r} while ordering: cart {cart}")
+        assert not cart, f"{message!r} put {cart} in the cart"
+
+
+def main():
+    print("MenuIndex.search:")
+    check_index()
+    print("conversation:")
+    check_conversation()
+    print("OK: ordinary words match no menu item, and item mentions still do")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/check_menu_queries.py
+"""
+Check that chat turns do not query the menu
+
+The agent loads the menu once into a MenuSnapshot. Plays a complete order
+conversation through RestaurantAgent against a scratch SQLite file, with
+a look at the menu first, and counts the statements of every turn with a
+before_cursor_execute listener. No turn may query menu_items, including
+the one that stores the order.
+
+Run from the backend directory:
+    python benchmarks/check_menu_queries.py [conversations]
+"""
+import collections
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+
+from common import ORDER_TURNS, RESTAURANT_INFO, create_database
+
+from sqlalchemy import event
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from agent import RestaurantAgent
+from models import Order
+
+TURNS = ["what do you serve"] + ORDER_TURNS
+LOG_WRITER_THREAD = 'conversation-log-writer'
+
+
+def main():
+    conversations = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database(os.path.join(directory, 'menu-queries.db'))
+        registry = scoped_session(sessionmaker(bind=engine))
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = RestaurantAgent(registry, RESTAURANT_INFO)
+        registry.remove()
+
+        statements = collections.defaultdict(list)
+        turn = {'message': None}
+
+        @event.listens_for(engine, 'before_cursor_execute')
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            # The log writer batches rows on its own thread, outside of the turns
+            if threading.current_thread().name != LOG_WRITER_THREAD:
+                statements[turn['message']].append(statement)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            for n in range(conversations):
+                for message in TURNS:
+                    turn['message'] = message
+                    agent.process_message(message, f"menu-queries-{n}")
+                    registry.remove()
+            turn['message'] = None
+            agent.log_writer.close()
+
+        session = registry()
+        orders = session.query(Order).count()
+        registry.remove()
+        engine.dispose()
+
+    print(f"{conversations} conversations of {len(TURNS)} turns, statements per turn:")
+    menu_queries = 0
+    for message in TURNS:
+        executed = statements.get(message, [])
+        on_menu = [statement for statement in executed if 'menu_items' in statement]
+        menu_queries += len(on_menu)
+        print(f"  {message!r:<48} {len(executed) / conversations:4.1f} statements, "
+              f"{len(on_menu) / conversations:.1f} on menu_items")
+
+    assert orders == conversations, f"{orders} orders stored"
+    assert menu_queries == 0, f"chat turns ran {menu_queries} menu_items queries"
+    print("OK: no chat turn queried menu_items")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+# benchmarks/check_multiworker_sessions.py
+"""
+Multi-process check for the shared SQLite conversation store
+
+Starts several worker processes, each with its own RestaurantAgent and
+database connection, sharing a scratch database and a SQLite conversation
+store. Every turn of every conversation is sent to a different worker than
+the previous one, and the cart built up over the turns is checked at the end.
+
+Run from the backend directory:
+    python benchmarks/check_multiworker_sessions.py [workers] [sessions]
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from common import RESTAURANT_INFO, create_database
+
+TURNS = [
+    "I would like to order food",
+    "2 margherita pizza",
+    "and a caprese salad",
+    "add one more margherita pizza",
+]
+EXPECTED_CART = {'Margherita Pizza': 3, 'Caprese Salad': 1}
+
+
+def worker(worker_id, db_path, state_path, tasks, results):
+    """Serve turns from the task queue until it receives None"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from agent import RestaurantAgent
+    from agent.conversation_store import SQLiteConversationStore
+
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"timeout": 30})
+    session = sessionmaker(bind=engine)()
+    agent = RestaurantAgent(
+        session,
+        RESTAURANT_INFO,
+        conversation_store=SQLiteConversationStore(state_path)
+    )
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        session_id, message = task
+        # The agent prints debug output for every turn
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent.process_message(message, session_id)
+        results.put((worker_id, session_id))
+
+    # Processes exit without running atexit handlers
+    agent.log_writer.close()
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'restaurant.db')
+        state_path = os.path.join(directory, 'conversation_state.db')
+        create_database(db_path).dispose()
+
+        # Create the store file before the workers race to do it
+        from agent.conversation_store import SQLiteConversationStore
+        store = SQLiteConversationStore(state_path)
+
+        task_queues = [multiprocessing.Queue() for _ in range(workers)]
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(i, db_path, state_path, task_queues[i], results))
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        session_ids = [f"session-{i}" for i in range(sessions)]
+        served_by = {session_id: [] for session_id in session_ids}
+        started = time.perf_counter()
+        for turn, message in enumerate(TURNS):
+            # Turns of a conversation are processed in order; the sessions of
+            # one round are spread over all workers at once
+            for i, session_id in enumerate(session_ids):
+                task_queues[(i + turn) % workers].put((session_id, message))
+            for _ in session_ids:
+                worker_id, session_id = results.get(timeout=60)
+                served_by[session_id].append(worker_id)
+        elapsed = time.perf_counter() - started
+
+        for queue in task_queues:
+            queue.put(None)
+        for process in processes:
+            process.join()
+
+        failures = 0
+        for session_id in session_ids:
+            conversation = store.get(session_id)
+            cart = {item['name']: item['quantity'] for item in conversation.ordering.items}
+            assert len(set(served_by[session_id])) == min(workers, len(TURNS)), served_by[session_id]
+            if conversation.state != 'ordering' or cart != EXPECTED_CART:
+                failures += 1
+                print(f"{session_id}: state {conversation.state!r}, cart {cart}")
+
+        print(f"{workers} workers, {sessions} sessions x {len(TURNS)} turns in {elapsed:.2f}s "
+              f"({sessions * len(TURNS) / elapsed:.0f} turns/s)")
+        print(f"store: {store.stats()}")
+        assert failures == 0, f"{failures} sessions lost state across workers"
+        print("OK: every session continued correctly across workers")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+# benchmarks/check_pagination.py
+"""
+Check for the paginated admin lists, GET /api/orders and GET /api/bookings
+
+Imports the app with a scratch database (the working directory is switched
+to a temporary directory first), fills it with orders and bookings, and
+walks every page of both lists with Flask's test client:
+
+- each page runs the same number of queries, whatever its size or depth
+  and however many items its orders have
+- the pages together return every matching row exactly once, in order
+- the status and date filters return the same rows as a direct query
+
+The previous orders handler, which loaded the whole table and lazy-loaded
+the items of every order, is registered under a benchmark-only URL to
+compare query counts and time.
+
+Run from the backend directory:
+    python benchmarks/check_pagination.py [orders] [bookings]
+"""
+import contextlib
+import datetime
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import BACKEND_DIR
+
+# Queries per page: orders, then their items joined to the menu items
+ORDER_PAGE_QUERIES = 2
+BOOKING_PAGE_QUERIES = 1
+
+
+def seed(session, menu_ids, orders, bookings, rng):
+    from models import Order, OrderItem, TableBooking
+
+    now = datetime.datetime.utcnow()
+    for n in range(orders):
+        order = Order(customer_name=f"Customer {n}", total_amount=0,
+                      status=rng.choice(['confirmed', 'delivered', 'cancelled']),
+                      order_date=now - datetime.timedelta(hours=rng.randrange(24 * 30)))
+        session.add(order)
+        session.flush()
+        for item_id in rng.sample(menu_ids, rng.randint(1, 6)):
+            session.add(OrderItem(order_id=order.id, menu_item_id=item_id, quantity=1, price=1.0))
+    today = datetime.date.today()
+    for n in range(bookings):
+        date = today + datetime.timedelta(days=rng.randrange(30))
+        session.add(TableBooking(customer_name=f"Guest {n}", date=date.strftime('%Y-%m-%d'),
+                                 time='7:00 PM', guests=2,
+                                 status=rng.choice(['confirmed', 'cancelled'])))
+    session.commit()
+
+
+def walk(client, url, key, counter, expected_queries, params=''):
+    """Fetch every page of a list, checking the queries of each page"""
+    rows, pages, cursor = [], 0, None
+    while True:
+        page_url = f"{url}?{params}" + (f"&cursor={cursor}" if cursor else '')
+        counter[0] = 0
+        response = client.get(page_url)
+        assert response.status_code == 200, response.get_json()
+        assert counter[0] == expected_queries, f"{page_url}: {counter[0]} queries, expected {expected_queries}"
+        body = response.get_json()
+        rows.extend(body[key])
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return rows, pages
+
+
+def main():
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    bookings = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(3)
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            import app as app_module
+        from flask import jsonify
+        from sqlalchemy import event
+        from models import MenuItem, Order, TableBooking
+
+        app = app_module.app
+        session = app_module.Session()
+        menu_ids = [item_id for item_id, in session.query(MenuItem.id)]
+        seed(session, menu_ids, orders, bookings, rng)
+        app_module.remove_session()
+
+        def get_orders_unpaginated():
+            session = app_module.get_session()
+            return jsonify({'orders': [order.to_dict() for order in session.query(Order).all()]})
+
+        app.add_url_rule('/bench/orders-all', 'bench_orders_all', get_orders_unpaginated)
+        client = app.test_client()
+
+        counter = [0]
+
+        def count(conn, cursor, statement, parameters, context, executemany):
+            counter[0] += 1
+
+        event.listen(app_module.engine, 'before_cursor_execute', count)
+
+        # Every order, newest first, at several page sizes
+        session = app_module.Session()
+        all_orders = [order_id for order_id, in session.query(Order.id).order_by(Order.id.desc())]
+        all_bookings = [booking_id for booking_id, in
+                        session.query(TableBooking.id).order_by(TableBooking.date, TableBooking.id)]
+        app_module.remove_session()
+
+        for limit in (10, 50, 200):
+            started = time.perf_counter()
+            rows, pages = walk(client, '/api/orders', 'orders', counter, ORDER_PAGE_QUERIES, f"limit={limit}")
+            elapsed = time.perf_counter() - started
+            assert [row['id'] for row in rows] == all_orders, f"limit={limit}: orders missing, repeated or out of order"
+            assert all(row['items'] and row['items'][0]['menu_item_name'] for row in rows)
+            print(f"orders   limit {limit:>3}: {pages:>3} pages, {ORDER_PAGE_QUERIES} queries each, "
+                  f"{elapsed / pages * 1000:6.2f} ms per page")
+
+            rows, pages = walk(client, '/api/bookings', 'bookings', counter, BOOKING_PAGE_QUERIES, f"limit={limit}")
+            assert [row['id'] for row in rows] == all_bookings, f"limit={limit}: bookings missing, repeated or out of order"
+            print(f"bookings limit {limit:>3}: {pages:>3} pages, {BOOKING_PAGE_QUERIES} query each")
+
+        # Filters match a direct query
+        date_from = (datetime.datetime.utcnow() - datetime.timedelta(days=7)).strftime('%Y-%m-%d')
+        date_to = (datetime.date.today() + datetime.timedelta(days=7)).strftime('%Y-%m-%d')
+        session = app_module.Session()
+        expected_orders = [order_id for order_id, in session.query(Order.id).filter(
+            Order.status == 'delivered',
+            Order.order_date >= datetime.datetime.strptime(date_from, '%Y-%m-%d')
+        ).order_by(Order.id.desc())]
+        expected_bookings = [booking_id for booking_id, in session.query(TableBooking.id).filter(
+            TableBooking.status == 'confirmed', TableBooking.date <= date_to
+        ).order_by(TableBooking.date, TableBooking.id)]
+        app_module.remove_session()
+
+        rows, _ = walk(client, '/api/orders', 'orders', counter, ORDER_PAGE_QUERIES,
+                       f"limit=25&status=delivered&from={date_from}")
+        assert [row['id'] for row in rows] == expected_orders, "order filters"
+        rows, _ = walk(client, '/api/bookings', 'bookings', counter, BOOKING_PAGE_QUERIES,
+                       f"limit=25&status=confirmed&to={date_to}")
+        assert [row['id'] for row in rows] == expected_bookings, "booking filters"
+        print(f"filters: {len(expected_orders)} delivered orders since {date_from}, "
+              f"{len(expected_bookings)} confirmed bookings until {date_to}")
+
+        # The page size is capped, and bad parameters are rejected
+        body = client.get('/api/orders?limit=100000').get_json()
+        assert len(body['orders']) == app_module.config.ADMIN_PAGE_SIZE_MAX
+        for url in ('/api/orders?limit=0', '/api/orders?cursor=nope', '/api/bookings?from=tomorrow'):
+            assert client.get(url).status_code == 400, url
+
+        # So are cursors that decode but are not a sort key of the list
+        encode = app_module.encode_cursor
+        for url in ('/api/orders?cursor=MQ==', f"/api/orders?cursor={encode(['1'])}",
+                    f"/api/orders?cursor={encode([True])}", f"/api/orders?cursor={encode([1, 2])}",
+                    f"/api/bookings?cursor={encode([1])}", f"/api/bookings?cursor={encode(['2026-01-01', '3'])}",
+                    f"/api/bookings?cursor={encode({'date': '2026-01-01'})}"):
+            assert client.get(url).status_code == 400, url
+
+        counter[0] = 0
+        started = time.perf_counter()
+        response = client.get('/bench/orders-all')
+        elapsed = time.perf_counter() - started
+        print(f"unpaginated orders: {counter[0]} queries, {elapsed * 1000:.0f} ms, {len(response.data)} bytes")
+
+        event.remove(app_module.engine, 'before_cursor_execute', count)
+        app_module.agent.log_writer.close()
+        os.chdir(BACKEND_DIR)
+
+    print("OK: constant queries per page, every row exactly once, filters match")
+
+
+if __name__ == '__main__':
+    main()
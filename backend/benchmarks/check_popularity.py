@@ -0,0 +1,140 @@
+# benchmarks/check_popularity.py
+"""
+Check for the popularity-ranked menu suggestions
+
+Seeds a scratch database with a history of orders, builds the ranking from
+order_items, then places more orders through OrderHandler.create_order.
+After each phase the incremental ranking is compared with a full recount
+of the database, with and without time decay. Also checks that
+suggestions run no queries and measures how long they take.
+
+Run from the backend directory:
+    python benchmarks/check_popularity.py [history orders] [new orders]
+"""
+import calendar
+import collections
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import create_database, load_menu
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from agent.menu_snapshot import MenuSnapshot
+from agent.order_handler import OrderHandler
+from agent.popularity import PopularityRanking
+from models import Order, OrderItem
+
+HALF_LIFE = 7 * 86400
+
+
+def add_history(engine, history, menu_ids, rng):
+    """Add a skewed order history over the last 60 days"""
+    session = sessionmaker(bind=engine)()
+    today = datetime.datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+    weights = [1.0 / (rank + 1) for rank in range(len(menu_ids))]
+    for _ in range(history):
+        order = Order(customer_name='History', total_amount=0, status='confirmed',
+                      order_date=today - datetime.timedelta(days=rng.randrange(60)))
+        session.add(order)
+        session.flush()
+        for item_id in set(rng.choices(menu_ids, weights=weights, k=rng.randint(1, 4))):
+            session.add(OrderItem(order_id=order.id, menu_item_id=item_id, quantity=rng.randint(1, 3), price=1.0))
+    session.commit()
+    session.close()
+
+
+def recount(session, half_life, epoch):
+    """Scores computed from scratch, the way the ranking should see them"""
+    scores = collections.defaultdict(float)
+    for item_id, quantity, order_date in session.query(
+            OrderItem.menu_item_id, OrderItem.quantity, Order.order_date
+    ).join(Order, Order.id == OrderItem.order_id):
+        weight = 1.0
+        if half_life:
+            # History is stored at midday, where the seed counts it
+            timestamp = calendar.timegm(order_date.timetuple())
+            weight = 2.0 ** ((timestamp - epoch) / half_life)
+        scores[item_id] += quantity * weight
+    return scores
+
+
+def check_ranking(name, ranking, session, menu_ids):
+    scores = recount(session, ranking.half_life, ranking._epoch)
+    ranked = ranking.top(len(menu_ids))
+    ranked_scores = [scores.get(item_id, 0.0) for item_id in ranked]
+    in_order = all(a >= b * (1 - 1e-6) for a, b in zip(ranked_scores, ranked_scores[1:]))
+    expected = sorted(menu_ids, key=lambda item_id: -scores.get(item_id, 0.0))[:5]
+    print(f"  {name}: top 5 {ranked[:5]}, recount {expected}")
+    assert in_order, f"{name}: ranking is not sorted by the recounted scores"
+
+
+def main():
+    history = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    new_orders = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rng = random.Random(7)
+
+    menu_ids = [item['id'] for item in load_menu()]
+    rng.shuffle(menu_ids)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_database(os.path.join(directory, 'popularity.db'))
+        add_history(engine, history, menu_ids, rng)
+        session = sessionmaker(bind=engine)()
+        menu = MenuSnapshot.from_session(session)
+
+        for half_life in (None, HALF_LIFE):
+            label = 'decayed' if half_life else 'counts'
+            print(f"{label}:")
+            ranking = PopularityRanking.from_session(session, half_life=half_life)
+            handler = OrderHandler(session, menu, popularity=ranking)
+            check_ranking('seeded', ranking, session, menu_ids)
+
+            # New orders favour the items that sold least so far
+            reversed_weights = [rank + 1.0 for rank in range(len(menu_ids))]
+            for _ in range(new_orders):
+                chosen = set(rng.choices(menu_ids, weights=reversed_weights, k=rng.randint(1, 4)))
+                items = [{'id': item_id, 'price': menu.by_id[item_id].price, 'quantity': rng.randint(1, 3)}
+                         for item_id in chosen]
+                handler.create_order({'name': 'Guest'}, items)
+            check_ranking(f'after {new_orders} orders', ranking, session, menu_ids)
+
+            statements = [0]
+
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements[0] += 1
+
+            event.listen(engine, 'before_cursor_execute', count)
+            started = time.perf_counter()
+            for _ in range(10000):
+                handler.get_menu_suggestions(max_items=5)
+                handler.get_menu_suggestions(keywords=['pizza'], max_items=5)
+            elapsed = time.perf_counter() - started
+            event.remove(engine, 'before_cursor_execute', count)
+            print(f"  suggestions: {elapsed / 20000 * 1e6:.1f} us each, {statements[0]} queries")
+            assert statements[0] == 0, "suggestions ran queries"
+
+        session.close()
+
+    # With decay a recent best seller overtakes one that sold more long ago
+    ranking = PopularityRanking(half_life=HALF_LIFE, now=0)
+    ranking.record([{'id': 1, 'quantity': 10}], timestamp=0)
+    ranking.record([{'id': 2, 'quantity': 4}], timestamp=14 * 86400)
+    assert ranking.top(2) == [2, 1], ranking.top(2)
+
+    # Rescaling keeps the order when the weights grow large
+    ranking = PopularityRanking(half_life=1.0, now=0)
+    ranking.record([{'id': 1, 'quantity': 3}], timestamp=0)
+    ranking.record([{'id': 2, 'quantity': 1}], timestamp=1)
+    ranking.record([{'id': 3, 'quantity': 1}], timestamp=1000)
+    assert ranking.rescaled == 1 and ranking.top(3) == [3, 1, 2], (ranking.rescaled, ranking.top(3))
+    print("OK: the incremental ranking matches a recount and suggestions run no queries")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+# benchmarks/check_session_locks.py
+"""
+Check for the striped per-session locks
+
+Many sessions each receive several "1 margherita pizza" turns at the same
+time, the way the frontend's retry loop can resend a message while the
+first request is still running. Every turn waits a few milliseconds inside
+the agent, standing in for database work. The conversation state lives in
+the SQLite store, so every turn loads its own copy and a turn that overlaps
+another one of the same session overwrites its cart.
+
+The run is repeated without locks, with one global lock and with the lock
+table. It reports how many turns of one session overlapped, how many turns
+of different sessions overlapped, the elapsed time and the lost cart items.
+
+Run from the backend directory:
+    python benchmarks/check_session_locks.py [sessions] [duplicate turns per session]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from common import RESTAURANT_INFO, create_database
+
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from agent import RestaurantAgent
+from agent.conversation_store import SQLiteConversationStore
+from agent.session_locks import SessionLockTable
+
+TURN_DELAY = 0.005
+
+
+class NoLocks(SessionLockTable):
+    """Lock table that lets every turn through"""
+
+    @contextlib.contextmanager
+    def hold(self, session_id):
+        yield
+
+
+class GlobalLock(SessionLockTable):
+    """Lock table with a single stripe, so every turn waits for every other"""
+
+    def __init__(self):
+        super().__init__(stripes=1)
+
+
+def run(name, session_locks, sessions, duplicates, directory):
+    engine = create_database(os.path.join(directory, f'{name}.db'))
+    registry = scoped_session(sessionmaker(bind=engine))
+    store = SQLiteConversationStore(os.path.join(directory, f'{name}-state.db'))
+    agent = RestaurantAgent(registry, RESTAURANT_INFO, conversation_store=store, session_locks=session_locks)
+    registry.remove()
+
+    # Track the turns inside the agent, per session and overall
+    in_flight = {}
+    overlap = {'same_session': 0, 'all': 0}
+    probe_lock = threading.Lock()
+    handle_intent = agent.handle_intent
+
+    def probed_handle_intent(intent, entities, conversation):
+        with probe_lock:
+            in_flight[conversation.session_id] = in_flight.get(conversation.session_id, 0) + 1
+            overlap['same_session'] = max(overlap['same_session'], in_flight[conversation.session_id])
+            overlap['all'] = max(overlap['all'], sum(in_flight.values()))
+        try:
+            time.sleep(TURN_DELAY)
+            return handle_intent(intent, entities, conversation)
+        finally:
+            with probe_lock:
+                in_flight[conversation.session_id] -= 1
+
+    agent.handle_intent = probed_handle_intent
+
+    session_ids = [f"{name}-{i}" for i in range(sessions)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        for session_id in session_ids:
+            agent.process_message("I would like to order food", session_id)
+            registry.remove()
+
+        barrier = threading.Barrier(sessions * duplicates)
+
+        def send(session_id):
+            barrier.wait()
+            agent.process_message("1 margherita pizza", session_id)
+            registry.remove()
+
+        threads = [threading.Thread(target=send, args=(session_id,))
+                   for session_id in session_ids for _ in range(duplicates)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        agent.log_writer.close()
+
+    lost = 0
+    for session_id in session_ids:
+        cart = store.get(session_id).ordering
+        quantity = sum(item['quantity'] for item in cart.items if item['name'] == 'Margherita Pizza') if cart else 0
+        lost += duplicates - quantity
+    engine.dispose()
+
+    print(f"{name:>12}: {elapsed:6.3f}s, at most {overlap['same_session']} turns of one session "
+          f"and {overlap['all']} turns overall at once, {lost} of {sessions * duplicates} items lost")
+    return overlap, lost, elapsed
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    duplicates = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    with tempfile.TemporaryDirectory() as directory:
+        run('no locks', NoLocks(), sessions, duplicates, directory)
+        _, _, global_elapsed = run('global lock', GlobalLock(), sessions, duplicates, directory)
+        session_locks = SessionLockTable()
+        overlap, lost, elapsed = run('striped', session_locks, sessions, duplicates, directory)
+
+    print(f"striped locks: {global_elapsed / elapsed:.1f}x faster than one global lock")
+    print(f"lock stats: {session_locks.stats()}")
+    assert overlap['same_session'] == 1, "turns of one session overlapped"
+    assert overlap['all'] > 1, "turns of different sessions did not run in parallel"
+    assert lost == 0, f"{lost} cart items lost"
+    print("OK: turns of one session were serialized and different sessions ran in parallel")
+
+
+if __name__ == '__main__':
+    main()
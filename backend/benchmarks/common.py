@@ -0,0 +1,83 @@
+# benchmarks/common.py
+"""
+Shared setup of the benchmark and check scripts
+
+Scratch restaurant databases with the real menu, the restaurant info the
+agent is built with, and the conversations the scripts play. Scripts run
+from the backend directory import it as a sibling module:
+
+    from common import BACKEND_DIR, RESTAURANT_INFO, create_database
+"""
+import datetime
+import json
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+RESTAURANT_INFO = {'name': 'Test', 'address': '', 'phone': '', 'email': '', 'hours': {}}
+
+# A complete order conversation: one order of 2 margherita pizzas
+ORDER_TURNS = [
+    "I want to order food",
+    "2 margherita pizza",
+    "that's all",
+    "yes",
+    "my name is Jane Doe, email jane@example.com",
+]
+
+# A complete booking conversation: a table for 2 tomorrow at 7:00 PM
+BOOKING_TURNS = [
+    "I want to book a table",
+    "tomorrow",
+    "7:00",
+    "2",
+    "yes",
+    "my name is Jane Doe, email jane@example.com",
+]
+
+# The slot BOOKING_TURNS books
+BOOKING_TIME = '7:00 PM'
+
+
+def tomorrow():
+    """Get tomorrow's date as YYYY-MM-DD, the day BOOKING_TURNS books"""
+    return (datetime.date.today() + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+
+
+def load_menu():
+    """Get the items of data/menu.json"""
+    with open(os.path.join(BACKEND_DIR, 'data', 'menu.json'), 'r') as f:
+        return json.load(f)
+
+
+def create_database(path, free_tables=None, **engine_options):
+    """
+    Create a scratch restaurant database with the real menu
+
+    Args:
+        path (str): SQLite file to create
+        free_tables (int): Free tables to give the BOOKING_TURNS slot, or None
+        engine_options: create_engine() options; connections can be shared
+                        between threads and wait up to 30 s for locks by default
+
+    Returns:
+        Engine: Engine of the database
+    """
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from models import Base, MenuItem, TableAvailability
+
+    engine_options.setdefault('connect_args', {"check_same_thread": False, "timeout": 30})
+    engine = create_engine(f"sqlite:///{path}", **engine_options)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    for item in load_menu():
+        session.add(MenuItem(id=item['id'], name=item['name'], price=item['price']))
+    if free_tables is not None:
+        session.add(TableAvailability(date=tomorrow(), time=BOOKING_TIME, available=free_tables))
+    session.commit()
+    session.close()
+    return engine
@@ -0,0 +1,99 @@
+# benchmarks/stress_bookings.py
+"""
+Multi-threaded booking stress test
+
+Many threads book the same slot at once through BookingHandler.create_booking,
+each with its own session, against a scratch SQLite database. Checks that the
+slot is never oversold and reports the booking throughput.
+
+Run from the backend directory:
+    python benchmarks/stress_bookings.py [threads] [attempts per thread]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import common  # noqa: F401  (puts the backend directory on sys.path)
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from agent.booking_handler import BookingHandler
+from models import Base, TableAvailability, TableBooking
+
+DATE = '2030-01-01'
+TIME = '7:00 PM'
+CAPACITY = 100
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    attempts = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(directory, 'stress.db')}",
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+
+        session = Session()
+        session.add(TableAvailability(date=DATE, time=TIME, available=CAPACITY))
+        session.commit()
+        session.close()
+
+        results = {'booked': 0, 'rejected': 0, 'errors': 0}
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(threads)
+
+        def worker(worker_id):
+            session = Session()
+            handler = BookingHandler(session)
+            start_barrier.wait()
+            for attempt in range(attempts):
+                # Parties of 1 to 8 guests need 1 or 2 tables
+                guests = 1 + (worker_id + attempt) % 8
+                try:
+                    handler.create_booking({'name': f'Guest {worker_id}'},
+                                           {'date': DATE, 'time': TIME, 'guests': guests})
+                    outcome = 'booked'
+                except ValueError:
+                    outcome = 'rejected'
+                except Exception:
+                    outcome = 'errors'
+                with lock:
+                    results[outcome] += 1
+            session.close()
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        session = Session()
+        remaining = session.query(TableAvailability.available).filter(
+            TableAvailability.date == DATE, TableAvailability.time == TIME
+        ).scalar()
+        bookings = session.query(TableBooking).all()
+        tables_booked = sum((booking.guests + 3) // 4 for booking in bookings)
+        session.close()
+
+        print(f"{threads} threads x {attempts} attempts in {elapsed:.2f}s "
+              f"({threads * attempts / elapsed:.0f} attempts/s)")
+        print(f"booked {results['booked']}, rejected {results['rejected']}, errors {results['errors']}")
+        print(f"tables booked {tables_booked} of {CAPACITY}, remaining {remaining}")
+
+        assert remaining >= 0, "slot oversold"
+        assert tables_booked + remaining == CAPACITY, "booked tables and remaining availability disagree"
+        assert len(bookings) == results['booked']
+        print("OK: no overselling")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# compression.py
+import zlib
+
+# zlib window bits of each content coding: gzip adds the gzip header and
+# trailer, and HTTP's "deflate" is the zlib format
+ENCODINGS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS
+}
+
+# Response types worth compressing
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+def choose_encoding(accept_encodings):
+    """
+    Pick the content coding for a request, preferring gzip
+
+    Args:
+        accept_encodings: The request's parsed Accept-Encoding header
+
+    Returns:
+        str: 'gzip', 'deflate', or None to send the body as is
+    """
+    return accept_encodings.best_match(tuple(ENCODINGS))
+
+def is_compressible(mimetype):
+    """Check whether a response type is text that compresses well"""
+    return bool(mimetype) and mimetype.startswith(COMPRESSIBLE_MIMETYPES)
+
+def compress(data, encoding, level=6):
+    """
+    Compress a whole body
+
+    Args:
+        data (bytes): Body
+        encoding (str): 'gzip' or 'deflate'
+        level (int): zlib compression level, 1 (fastest) to 9 (smallest)
+
+    Returns:
+        bytes: Compressed body
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+    return compressor.compress(data) + compressor.flush()
+
+def compress_stream(chunks, encoding, level=6):
+    """
+    Compress a streamed body chunk by chunk
+
+    Output is yielded whenever zlib has some, so memory stays flat. The
+    source is closed when the stream ends or is abandoned, so that its
+    cleanup (such as stream_with_context's teardown) still runs.
+
+    Args:
+        chunks: Iterable of str or bytes chunks
+        encoding (str): 'gzip' or 'deflate'
+        level (int): zlib compression level
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, ENCODINGS[encoding])
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
@@ -23,5 +23,41 @@ RESTAURANT_HOURS = {
     "Sunday": "10:00 AM - 9:00 PM"
 }
 
+# Booking configuration
+BOOKING_DAYS_AHEAD = int(os.environ.get('BOOKING_DAYS_AHEAD') or 7)  # Days offered for reservations
+AVAILABILITY_CACHE_SIZE = int(os.environ.get('AVAILABILITY_CACHE_SIZE') or 512)  # Dates kept in the availability cache
+AVAILABILITY_CACHE_TTL = float(os.environ.get('AVAILABILITY_CACHE_TTL') or 60)  # Seconds before a cached date is reloaded
+BOOKING_MAX_DAYS_AHEAD = int(os.environ.get('BOOKING_MAX_DAYS_AHEAD') or 90)  # Most days /api/availability looks ahead
+
+# Admin list configuration
+ADMIN_PAGE_SIZE = int(os.environ.get('ADMIN_PAGE_SIZE') or 50)  # Rows per page of /api/orders and /api/bookings
+ADMIN_PAGE_SIZE_MAX = int(os.environ.get('ADMIN_PAGE_SIZE_MAX') or 200)  # Largest page a client can ask for
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE') or 500)  # Rows read per query by the /api/export streams
+
+# Response compression configuration
+COMPRESSION_LEVEL = int(os.environ.get('COMPRESSION_LEVEL') or 6)  # zlib level for gzip/deflate responses; 0 disables compression
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE') or 1024)  # Bytes below which responses are sent uncompressed
+
+# Menu endpoint configuration
+MENU_CACHE_MAX_AGE = int(os.environ.get('MENU_CACHE_MAX_AGE') or 60)  # Seconds clients reuse /api/menu before revalidating; 0 always revalidates
+
+# Menu suggestion configuration
+POPULARITY_HALF_LIFE_DAYS = float(os.environ.get('POPULARITY_HALF_LIFE_DAYS') or 30)  # Days for a sale to count half; 0 disables decay
+
+# Conversation state configuration
+CONVERSATION_STORE = os.environ.get('CONVERSATION_STORE') or 'memory'  # 'memory', or 'sqlite' for several worker processes
+CONVERSATION_STORE_PATH = os.environ.get('CONVERSATION_STORE_PATH') or 'conversation_state.db'  # File of the 'sqlite' store
+CONVERSATION_MAX_SESSIONS = int(os.environ.get('CONVERSATION_MAX_SESSIONS') or 10000)  # Conversations kept
+CONVERSATION_IDLE_TTL = float(os.environ.get('CONVERSATION_IDLE_TTL') or 1800)  # Seconds before an idle conversation is dropped
+CONVERSATION_MEMORY_BUDGET = int(os.environ.get('CONVERSATION_MEMORY_BUDGET') or 64 * 1024 * 1024)  # Bytes, 'memory' store only
+SESSION_LOCK_STRIPES = int(os.environ.get('SESSION_LOCK_STRIPES') or 1024)  # Locks that serialize turns of one session
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE') or 10000)  # Responses kept for retried messages
+IDEMPOTENCY_TTL = float(os.environ.get('IDEMPOTENCY_TTL') or 300)  # Seconds a retry gets the stored response
+
+# Conversation log configuration
+CONVERSATION_LOG_BATCH_SIZE = int(os.environ.get('CONVERSATION_LOG_BATCH_SIZE') or 200)  # Rows per transaction
+CONVERSATION_LOG_FLUSH_MS = int(os.environ.get('CONVERSATION_LOG_FLUSH_MS') or 50)  # Max delay before rows are written
+CONVERSATION_LOG_QUEUE_SIZE = int(os.environ.get('CONVERSATION_LOG_QUEUE_SIZE') or 10000)  # Pending rows before chat turns block
+
 # CORS configuration
 CORS_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000', 'http://localhost:5173', 'http://127.0.0.1:5173']
\ No newline at end of file
@@ -1,19 +1,77 @@
 # database.py
 import json
 import os
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.pool import QueuePool
 from models import Base, MenuItem, TableAvailability
 
+# Connections kept open. Overflow connections are closed when they are
+# returned, so the request threads that run at once should fit in the pool.
+POOL_SIZE = 32
+MAX_OVERFLOW = 16
+
 # Create database engine with connect_args to make it thread-safe
 DATABASE_URL = "sqlite:///restaurant.db"
 engine = create_engine(
     DATABASE_URL, 
-    connect_args={"check_same_thread": False},  # This is the critical fix
+    connect_args={"check_same_thread": False, "timeout": 30},  # This is the critical fix
+    poolclass=QueuePool,  # SQLite files default to NullPool, which reconnects on every request
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
     pool_pre_ping=True,  # This helps with connection validation
     pool_recycle=3600    # Recycle connections every hour
 )
 
+@event.listens_for(engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Let readers run while a request or the log writer commits"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+def serialize_writes(engine):
+    """
+    Let the connections of an engine write one at a time, in turn
+    
+    SQLite has a single writer. A connection that finds the file locked
+    sleeps in the busy handler (1, 2, 5 ... up to 100 ms) and tries again,
+    so with many request threads most of a turn is spent asleep after the
+    lock was already free. Here a connection takes a process-wide lock
+    before its first write statement and gives it back when it returns to
+    the pool, after its commit or rollback; the next writer is woken
+    right away. Reads do not take the lock, and other processes still
+    wait in the busy handler.
+    
+    Args:
+        engine (Engine): Engine of a SQLite file
+        
+    Returns:
+        threading.Lock: The write lock
+    """
+    write_lock = threading.Lock()
+    owner = {'info': None}  # info of the connection holding the lock
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def acquire_write_lock(conn, cursor, statement, parameters, context, executemany):
+        if owner['info'] is not conn.info and statement.lstrip()[:7].upper().startswith(WRITE_STATEMENTS):
+            write_lock.acquire()
+            owner['info'] = conn.info
+    
+    @event.listens_for(engine, "checkin")
+    def release_write_lock(dbapi_connection, connection_record):
+        if owner['info'] is connection_record.info:
+            owner['info'] = None
+            write_lock.release()
+    
+    return write_lock
+
+serialize_writes(engine)
+
 # Create session factory
 session_factory = sessionmaker(bind=engine)
 Session = scoped_session(session_factory)  # scoped_session handles thread-local sessions
@@ -23,6 +81,11 @@ def init_db():
     # Create tables
     Base.metadata.create_all(engine)
     
+    # create_all skips indexes of tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    
     # Seed database with initial data if tables are empty
     session = Session()
     try:
@@ -81,5 +144,9 @@ def load_table_data(session):
         raise
 
 def get_session():
-    """Get a database session"""
-    return Session()
\ No newline at end of file
+    """Get the database session of the current thread"""
+    return Session()
+
+def remove_session(exception=None):
+    """Close the session of the current thread and return its connection to the pool"""
+    Session.remove()
\ No newline at end of file
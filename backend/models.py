@@ -24,7 +24,7 @@ class TableAvailability(Base):
     __tablename__ = 'table_availability'
     
     id = Column(Integer, primary_key=True)
-    date = Column(String(10), nullable=False)  # Format: YYYY-MM-DD
+    date = Column(String(10), nullable=False, index=True)  # Format: YYYY-MM-DD
     time = Column(String(10), nullable=False)  # Format: HH:MM AM/PM
     available = Column(Integer, nullable=False, default=0)
     
@@ -44,7 +44,7 @@ class Order(Base):
     customer_email = Column(String(100))
     customer_phone = Column(String(20))
     total_amount = Column(Float, nullable=False)
-    order_date = Column(DateTime, default=datetime.datetime.utcnow)
+    order_date = Column(DateTime, default=datetime.datetime.utcnow, index=True)
     status = Column(String(20), default='pending')  # pending, confirmed, delivered, cancelled
     
     items = relationship("OrderItem", back_populates="order")
@@ -89,7 +89,7 @@ class TableBooking(Base):
     customer_name = Column(String(100), nullable=False)
     customer_email = Column(String(100))
     customer_phone = Column(String(20))
-    date = Column(String(10), nullable=False)  # Format: YYYY-MM-DD
+    date = Column(String(10), nullable=False, index=True)  # Format: YYYY-MM-DD
     time = Column(String(10), nullable=False)  # Format: HH:MM AM/PM
     guests = Column(Integer, nullable=False)
     special_requests = Column(Text)
@@ -114,7 +114,7 @@ class Conversation(Base):
     __tablename__ = 'conversations'
     
     id = Column(Integer, primary_key=True)
-    session_id = Column(String(50), nullable=False)
+    session_id = Column(String(50), nullable=False, index=True)
     user_message = Column(Text, nullable=False)
     bot_response = Column(Text, nullable=False)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
@@ -46,21 +46,57 @@ apiClient.interceptors.response.use(
   }
 );
 
+// Unique key for a chat message; every retry of the message sends the same key
+const createIdempotencyKey = () => {
+  if (window.crypto && window.crypto.randomUUID) {
+    return window.crypto.randomUUID();
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+};
+
+// Blobs (menu, available dates and times) from chat responses, by field.
+// The backend leaves out a blob whose version we already hold, and it is
+// put back from here, so the response always looks complete to callers.
+const heldBlobs = {};
+
+const heldVersions = () => Object.fromEntries(
+  Object.entries(heldBlobs).map(([name, blob]) => [name, blob.version])
+);
+
+const restoreBlobs = (data) => {
+  Object.entries(data.versions || {}).forEach(([name, version]) => {
+    if (name in data) {
+      heldBlobs[name] = { version, value: data[name] };
+    } else if (heldBlobs[name] && heldBlobs[name].version === version) {
+      data[name] = heldBlobs[name].value;
+    }
+  });
+  return data;
+};
+
 const apiService = {
   // Chat related endpoints
   chat: {
     sendMessage: async (message, sessionId = null) => {
       try {
-        // Add retry logic
+        // Add retry logic; the backend answers a retry of a message it
+        // already processed with the stored response
         let retries = 3;
         let lastError = null;
+        const idempotencyKey = createIdempotencyKey();
         
         while (retries > 0) {
           try {
             const response = await apiClient.post('/chat', { 
               message, 
-              session_id: sessionId 
+              session_id: sessionId,
+              versions: heldVersions()
+            }, {
+              headers: { 'Idempotency-Key': idempotencyKey }
             });
+            if (response.data && response.data.response) {
+              restoreBlobs(response.data.response);
+            }
             return response;
           } catch (err) {
             lastError = err;